@@ -0,0 +1,74 @@
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from .ipc import create_server, send_request
+
+logger = logging.getLogger(__name__)
+
+
+class KeyAgent:
+    """
+    Holds derived encryption keys in memory for a limited time, similar to ssh-agent.
+
+    Keys are never written to disk. Each key expires ttl seconds after it was added, after
+    which the next peepdb invocation has to derive it from the password again.
+    """
+
+    def __init__(self, socket_path: str, ttl: float = 3600):
+        self.socket_path = socket_path
+        self.ttl = ttl
+        self._keys: Dict[str, Tuple[str, float]] = {}
+        self._lock = threading.Lock()
+        self._server = None
+
+    def handle(self, request: Dict[str, Any]) -> Any:
+        action = request.get('action')
+        with self._lock:
+            now = time.monotonic()
+            self._keys = {key_id: entry for key_id, entry in self._keys.items() if entry[1] > now}
+            if action == 'ping':
+                return {'pid': os.getpid(), 'keys': len(self._keys)}
+            elif action == 'get':
+                entry = self._keys.get(request['key_id'])
+                return entry[0] if entry else None
+            elif action == 'add':
+                self._keys[request['key_id']] = (request['key'], now + self.ttl)
+                return True
+            elif action == 'remove':
+                return self._keys.pop(request['key_id'], None) is not None
+            elif action == 'remove_all':
+                count = len(self._keys)
+                self._keys.clear()
+                return count
+        raise ValueError(f"Unknown agent action: {action}")
+
+    def serve_forever(self) -> None:
+        self._server = create_server(self.socket_path, self.handle)
+        logger.info(f"peepdb agent listening on {self.socket_path}")
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+            if os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+            with self._lock:
+                self._keys.clear()
+
+    def shutdown(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+
+
+def get_agent_key(socket_path: str, key_id: str) -> Optional[str]:
+    return send_request(socket_path, {'action': 'get', 'key_id': key_id})
+
+
+def add_agent_key(socket_path: str, key_id: str, key: str) -> None:
+    send_request(socket_path, {'action': 'add', 'key_id': key_id, 'key': key})
+
+
+def remove_agent_key(socket_path: str, key_id: str) -> None:
+    send_request(socket_path, {'action': 'remove', 'key_id': key_id})
@@ -0,0 +1,83 @@
+from datetime import date, time
+from decimal import Decimal
+from typing import Any, Dict, List, Sequence
+
+ARROW_FORMATS = ['arrow', 'feather', 'parquet']
+# Formats that can only be written to a file, not to stdout
+ARROW_FILE_FORMATS = ['feather', 'parquet']
+
+
+def import_pyarrow():
+    try:
+        import pyarrow
+    except ImportError:
+        raise ImportError("Arrow results require pyarrow. Install it with: pip install peepdb[parquet]")
+    return pyarrow
+
+
+def arrow_value(value: Any) -> Any:
+    # Types pyarrow cannot infer, such as MongoDB ObjectId, are written as strings
+    if value is None or isinstance(value, (str, int, float, bool, bytes, date, time, Decimal, dict, list)):
+        return value
+    return str(value)
+
+
+def column_array(values: Sequence[Any]):
+    """
+    Builds one Arrow array from the values of a column, converting them only when pyarrow
+    cannot infer their type.
+    """
+    pa = import_pyarrow()
+    try:
+        return pa.array(values)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        pass
+    try:
+        return pa.array([arrow_value(value) for value in values])
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # Values of mixed types, e.g. in schemaless collections, are kept as text
+        return pa.array([None if value is None else str(value) for value in values], type=pa.string())
+
+
+def columns_to_arrow(names: List[str], rows: Sequence[Sequence[Any]]):
+    """
+    Builds a pyarrow.Table from rows given as tuples in the order of names.
+    """
+    pa = import_pyarrow()
+    columns = list(zip(*rows)) if rows else [()] * len(names)
+    return pa.table({name: column_array(values) for name, values in zip(names, columns)})
+
+
+def rows_to_arrow(rows: List[Dict[str, Any]]):
+    """
+    Builds a pyarrow.Table from rows given as dicts. Keys missing from some rows, as in
+    schemaless MongoDB or Firebase collections, become nulls.
+    """
+    pa = import_pyarrow()
+    if not rows:
+        return pa.table({})
+    names = list(rows[0].keys())
+    for row in rows:
+        if row.keys() != rows[0].keys():
+            names.extend(key for key in row if key not in names)
+    return pa.table({name: column_array([row.get(name) for row in rows]) for name in names})
+
+
+def write_arrow(table, format: str, output: Any) -> int:
+    """
+    Writes a pyarrow.Table as an Arrow IPC stream ('arrow'), a Feather (Arrow IPC) file or a
+    Parquet file. output is a path or a binary stream. Returns the number of rows written.
+    """
+    pa = import_pyarrow()
+    if format == 'arrow':
+        with pa.ipc.new_stream(output, table.schema) as writer:
+            writer.write_table(table)
+    elif format == 'feather':
+        import pyarrow.feather as feather
+        feather.write_feather(table, output)
+    elif format == 'parquet':
+        import pyarrow.parquet as pq
+        pq.write_table(table, output)
+    else:
+        raise ValueError(f"Unsupported Arrow format: {format}")
+    return table.num_rows
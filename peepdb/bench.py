@@ -0,0 +1,164 @@
+import io
+import os
+import platform
+import sqlite3
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from importlib.metadata import PackageNotFoundError, version
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from .core import connect_to_database, format_as_table, format_columns, format_value
+from .db.base import encode_cursor
+from .json_output import write_json
+
+BENCH_TABLE = 'bench'
+DEFAULT_ROWS = 100000
+DEFAULT_WIDTH = 8
+DEFAULT_PAGE_SIZE = 100
+DEFAULT_REPEAT = 5
+
+
+def create_fixture(path: str, rows: int = DEFAULT_ROWS, width: int = DEFAULT_WIDTH) -> str:
+    """
+    Creates a SQLite database with a table of rows rows and width columns of mixed types
+    (integers, floats, text and timestamps) and returns the table name.
+    """
+    if os.path.exists(path):
+        os.remove(path)
+    types = ['INTEGER', 'REAL', 'TEXT', 'TEXT']
+    columns = [(f"c{index}", types[index % len(types)]) for index in range(width)]
+    conn = sqlite3.connect(path)
+    try:
+        column_sql = ', '.join(f"{name} {column_type}" for name, column_type in columns)
+        conn.execute(f"CREATE TABLE {BENCH_TABLE} (id INTEGER PRIMARY KEY, {column_sql})")
+
+        def values(row_id: int) -> Tuple[Any, ...]:
+            row = [row_id]
+            for index in range(width):
+                kind = index % len(types)
+                if kind == 0:
+                    row.append(row_id * 7919 % 10000000)
+                elif kind == 1:
+                    row.append(row_id * 1.5)
+                elif kind == 2:
+                    row.append(f"value {row_id} of column {index}")
+                else:
+                    row.append(f"2024-01-01T00:00:{row_id % 60:02d}")
+            return tuple(row)
+
+        placeholders = ', '.join(['?'] * (width + 1))
+        conn.executemany(f"INSERT INTO {BENCH_TABLE} VALUES ({placeholders})", (values(i) for i in range(1, rows + 1)))
+        conn.commit()
+    finally:
+        conn.close()
+    return BENCH_TABLE
+
+
+def measure(function: Callable[[], Any], repeat: int = DEFAULT_REPEAT) -> Dict[str, float]:
+    """
+    Runs function repeat times and returns the fastest and mean wall time in seconds, and the
+    peak memory allocated by Python during one more traced run in KiB.
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        'min': min(timings),
+        'mean': sum(timings) / len(timings),
+        'peak_kib': peak / 1024
+    }
+
+
+def run_benchmarks(connection: Tuple[str, str, str, str, str], table: str, page_size: int = DEFAULT_PAGE_SIZE,
+                   repeat: int = DEFAULT_REPEAT) -> Dict[str, Dict[str, float]]:
+    """
+    Benchmarks connecting, listing tables, fetching the first and a deep page of table and
+    formatting and encoding a page, on the database described by connection.
+    """
+    results = {}
+
+    def connect():
+        db = connect_to_database(*connection)
+        db.connect()
+        db.disconnect()
+
+    results['connect'] = measure(connect, repeat)
+
+    db = connect_to_database(*connection)
+    db.connect()
+    try:
+        results['fetch_tables'] = measure(db.fetch_tables, repeat)
+        total_rows, _ = db.count_rows(table)
+        last_page = max(1, (total_rows + page_size - 1) // page_size)
+        results['fetch_data_first_page'] = measure(lambda: db.fetch_data(table, 1, page_size), repeat)
+        results['fetch_data_deep_page'] = measure(lambda: db.fetch_data(table, last_page, page_size), repeat)
+        if db.supports_keyset:
+            # The cursor of the page before the last, so the seek query starts as deep as OFFSET did
+            cursor = deep_cursor(db, table, page_size, last_page)
+            results['fetch_data_deep_keyset'] = measure(
+                lambda: db.fetch_data(table, 1, page_size, after=cursor, keyset=cursor is None), repeat)
+        page = db.fetch_data(table, 1, page_size)
+    finally:
+        db.disconnect()
+
+    rows = page['data']
+    results['format_value'] = measure(
+        lambda: [format_value(value, False, 'table') for row in rows for value in row.values()], repeat)
+    results['format_columns'] = measure(lambda: format_columns([dict(row) for row in rows], False, 'table'), repeat)
+    results['format_as_table'] = measure(lambda: format_as_table({table: dict(page, data=rows)}), repeat)
+    results['json_encode'] = measure(lambda: write_json({table: page}, io.BytesIO()), repeat)
+    return results
+
+
+def deep_cursor(db, table: str, page_size: int, last_page: int) -> Optional[str]:
+    """
+    Returns the keyset cursor pointing at the start of the last page, or None when the table
+    has a single page.
+    """
+    if last_page <= 1:
+        return None
+    key_columns = db.fetch_primary_key(table)
+    last_row = db.fetch_data(table, last_page - 1, page_size)['data'][-1]
+    return encode_cursor(key_columns, [last_row[column] for column in key_columns])
+
+
+def bench_report(results: Dict[str, Dict[str, float]], parameters: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Wraps benchmark results with the parameters and environment they were measured with.
+    """
+    try:
+        peepdb_version = version('peepdb')
+    except PackageNotFoundError:
+        peepdb_version = None
+    return {
+        'created': datetime.now(timezone.utc).isoformat(),
+        'peepdb_version': peepdb_version,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'parameters': parameters,
+        'results': results
+    }
+
+
+def compare_results(current: Dict[str, Any], baseline: Dict[str, Any]) -> List[Tuple[str, float, float, float]]:
+    """
+    Returns (name, baseline seconds, current seconds, ratio) of each benchmark found in both
+    reports, using the fastest run. A ratio above 1 means the current run is slower.
+    """
+    comparison = []
+    for name, timing in current['results'].items():
+        before = baseline['results'].get(name)
+        if before is None:
+            continue
+        ratio = timing['min'] / before['min'] if before['min'] else float('inf')
+        comparison.append((name, before['min'], timing['min'], ratio))
+    return comparison
@@ -0,0 +1,261 @@
+import curses
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+from .core import fetch_options, format_columns, format_page_info
+from .db.base import BaseDatabase
+from .render import truncate
+
+DEFAULT_WINDOW_SIZE = 500
+DEFAULT_MAX_WINDOWS = 4
+DEFAULT_MAX_COL_WIDTH = 30
+
+
+class TableBrowser:
+    """
+    Virtual scrolling over one table, fetched in windows of window_size rows.
+
+    Windows are read with keyset pagination where the backend supports it and the table has a
+    primary key or unique index, and by page number otherwise. All database calls run in order on a single worker thread, so the window after
+    the visible rows can be prefetched while the user reads them. At most max_windows windows
+    are kept in memory; windows far from the visible rows are dropped and fetched again when
+    they are scrolled back into view.
+    """
+
+    def __init__(self, db: BaseDatabase, table: str, window_size: int = DEFAULT_WINDOW_SIZE,
+                 columns: Optional[List[str]] = None, filters: Optional[List[Any]] = None,
+                 max_windows: int = DEFAULT_MAX_WINDOWS, scientific: bool = False):
+        self.db = db
+        self.table = table
+        self.window_size = window_size
+        self.columns = columns
+        self.filters = filters
+        # The visible window and the prefetched one must both fit
+        self.max_windows = max(2, max_windows)
+        self.scientific = scientific
+        self.keyset = db.supports_keyset
+        self.windows: 'OrderedDict[int, List[Dict[str, Any]]]' = OrderedDict()
+        self.pending: Dict[int, Future] = {}
+        # Keyset cursor of each window reached so far, the first window starts without one
+        self.cursors: List[Optional[str]] = [None]
+        self.last_window: Optional[int] = None
+        self.known_rows = 0
+        self.first_result: Optional[Dict[str, Any]] = None
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=1)
+
+    def open(self) -> Dict[str, Any]:
+        """
+        Connects and fetches the first window, with a row count from planner statistics.
+        """
+        try:
+            self.executor.submit(self.db.connect).result()
+            if self.keyset:
+                self.keyset = self.executor.submit(self._has_key).result()
+            self.first_result = self._submit(0, 'estimate').result()
+        except BaseException:
+            try:
+                self.close()
+            except Exception:
+                self.executor.shutdown(wait=False)
+            raise
+        return self.first_result
+
+    def _has_key(self) -> bool:
+        """
+        Whether the table has a primary key or unique index to page by, tables without one are
+        read in page-number windows.
+        """
+        try:
+            if self.db.metadata:
+                return bool(self.db.metadata.primary_key(self.db, self.table))
+            return bool(self.db.fetch_primary_key(self.table))
+        except NotImplementedError:
+            # The backend pages by a key of its own, e.g. MongoDB's _id
+            return True
+
+    def close(self) -> None:
+        for future in list(self.pending.values()):
+            future.cancel()
+        self.executor.submit(self.db.disconnect).result()
+        self.executor.shutdown()
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def at_end(self, position: int) -> bool:
+        return self.last_window is not None and position >= self.known_rows
+
+    def rows(self, start: int, count: int) -> List[Dict[str, Any]]:
+        """
+        Returns up to count rows from position start, waiting for windows that are not loaded,
+        and prefetches the window after the last returned row.
+        """
+        rows = []
+        position = start
+        while len(rows) < count and not self.at_end(position):
+            index, offset = divmod(position, self.window_size)
+            window = self._window(index)
+            if offset >= len(window):
+                break
+            taken = window[offset:offset + count - len(rows)]
+            rows.extend(taken)
+            position += len(taken)
+        self._prefetch(max(start, position - 1) // self.window_size + 1)
+        return rows
+
+    def _window(self, index: int) -> List[Dict[str, Any]]:
+        with self.lock:
+            window = self.windows.get(index)
+            if window is not None:
+                self.windows.move_to_end(index)
+                return window
+        if self.keyset:
+            # A keyset window can only be reached from the cursor at the end of the one before it
+            for previous in range(len(self.cursors) - 1, index):
+                self._window(previous)
+            if self.at_end(index * self.window_size):
+                return []
+        future = self.pending.get(index) or self._submit(index)
+        future.result()
+        with self.lock:
+            return self.windows.get(index, [])
+
+    def _prefetch(self, index: int) -> None:
+        if index in self.windows or index in self.pending:
+            return
+        if self.last_window is not None and index > self.last_window:
+            return
+        if self.keyset and index >= len(self.cursors):
+            return
+        self._submit(index)
+
+    def _submit(self, index: int, count: str = 'none') -> Future:
+        future = self.executor.submit(self._fetch_window, index, count)
+        self.pending[index] = future
+        return future
+
+    def _fetch_window(self, index: int, count: str) -> Dict[str, Any]:
+        try:
+            if self.keyset:
+                options = fetch_options(self.db, after=self.cursors[index], keyset=True, count=count,
+                                        columns=self.columns, filters=self.filters)
+                result = self.db.fetch_data(self.table, 1, self.window_size, **options)
+            else:
+                options = fetch_options(self.db, count=count, columns=self.columns, filters=self.filters)
+                result = self.db.fetch_data(self.table, index + 1, self.window_size, **options)
+
+            rows = result['data']
+            format_columns(rows, self.scientific, output_format='table')
+            if self.keyset:
+                if len(self.cursors) == index + 1:
+                    self.cursors.append(result.get('next_cursor'))
+                if not result.get('next_cursor'):
+                    self.last_window = index
+            elif len(rows) < self.window_size:
+                self.last_window = index
+            with self.lock:
+                self.known_rows = max(self.known_rows, index * self.window_size + len(rows))
+                self.windows[index] = rows
+                self._evict(index)
+            return result
+        finally:
+            self.pending.pop(index, None)
+
+    def _evict(self, current: int) -> None:
+        # Drop the windows furthest from the one just loaded
+        while len(self.windows) > self.max_windows:
+            farthest = max(self.windows, key=lambda index: abs(index - current))
+            del self.windows[farthest]
+
+
+def column_layout(rows: List[Dict[str, Any]], max_col_width: int) -> List[Tuple[str, int]]:
+    """
+    Returns the (name, width) of each column, measured on the given rows only.
+    """
+    if not rows:
+        return []
+    layout = []
+    for key in rows[0].keys():
+        width = max([len(str(key))] + [len(str(row.get(key, ''))) for row in rows])
+        layout.append((key, min(width, max_col_width)))
+    return layout
+
+
+def format_line(values: List[Any], layout: List[Tuple[str, int]]) -> str:
+    cells = []
+    for value, (_, width) in zip(values, layout):
+        text = '' if value is None else str(value).replace('\n', ' ')
+        cells.append(truncate(text, width).ljust(width))
+    return ' │ '.join(cells)
+
+
+def run_browser(stdscr, browser: TableBrowser, max_col_width: int = DEFAULT_MAX_COL_WIDTH) -> None:
+    """
+    Curses main loop. Only the rows that fit on the screen are fetched from the browser and
+    rendered on each key press.
+    """
+    curses.curs_set(0)
+    top = 0
+    cursor = 0
+    first_column = 0
+    info = format_page_info(browser.first_result)
+
+    while True:
+        height, width = stdscr.getmaxyx()
+        body_height = max(1, height - 2)
+        visible = browser.rows(top, body_height)
+        layout = column_layout(visible, max_col_width)
+        first_column = min(first_column, max(0, len(layout) - 1))
+        shown = layout[first_column:]
+
+        stdscr.erase()
+        stdscr.addnstr(0, 0, format_line([name for name, _ in shown], shown).ljust(width), width - 1,
+                       curses.A_REVERSE)
+        for line, row in enumerate(visible):
+            attribute = curses.A_BOLD if top + line == cursor else curses.A_NORMAL
+            stdscr.addnstr(line + 1, 0, format_line([row.get(name) for name, _ in shown], shown), width - 1,
+                           attribute)
+        status = f" {browser.table} | row {cursor + 1} | {info} | q quit, arrows/PgUp/PgDn/Home scroll"
+        stdscr.addnstr(height - 1, 0, status.ljust(width), width - 1, curses.A_REVERSE)
+        stdscr.refresh()
+
+        key = stdscr.getch()
+        if key in (ord('q'), 27):
+            return
+        elif key in (curses.KEY_DOWN, ord('j')):
+            cursor += 1
+        elif key in (curses.KEY_UP, ord('k')):
+            cursor -= 1
+        elif key in (curses.KEY_NPAGE, ord(' ')):
+            cursor += body_height
+        elif key == curses.KEY_PPAGE:
+            cursor -= body_height
+        elif key in (curses.KEY_HOME, ord('g')):
+            cursor = 0
+        elif key in (curses.KEY_RIGHT, ord('l')):
+            first_column += 1
+        elif key in (curses.KEY_LEFT, ord('h')):
+            first_column = max(0, first_column - 1)
+
+        cursor = max(0, cursor)
+        # Fetches the window under the cursor, the end of the table is only known once it is read
+        if not browser.rows(cursor, 1):
+            cursor = max(0, browser.known_rows - 1)
+        if cursor < top:
+            top = cursor
+        elif cursor >= top + body_height:
+            top = cursor - body_height + 1
+
+
+def browse_table(db: BaseDatabase, table: str, window_size: int = DEFAULT_WINDOW_SIZE,
+                 columns: Optional[List[str]] = None, filters: Optional[List[Any]] = None,
+                 max_windows: int = DEFAULT_MAX_WINDOWS, max_col_width: int = DEFAULT_MAX_COL_WIDTH,
+                 scientific: bool = False) -> None:
+    with TableBrowser(db, table, window_size, columns, filters, max_windows, scientific) as browser:
+        curses.wrapper(run_browser, browser, max_col_width)
@@ -1,18 +1,26 @@
+import contextlib
+import os
+import sys
+import tempfile
 import click
-from .core import peep_db
-from .config import get_connection, save_connection, list_connections, remove_connection, remove_all_connections
+from .core import fetch_connections_concurrently, fetch_results, format_page_info, iter_table_output, \
+    label_connection_results
+from .config import AGENT_SOCKET_FILE, get_connection, save_connection, list_connections, match_connections, remove_connection, remove_all_connections
+from .core import connect_to_database
+from .export import EXPORT_FORMATS, BINARY_FORMATS, export_partitioned, export_table
+from .jobs import DEFAULT_RETRIES, RESUMABLE_FORMATS, ExportJob, run_export_job
+from .daemon import SOCKET_PATH, PeepDBDaemon, request_daemon
+from .agent import KeyAgent
+from .ipc import send_request
+from .exceptions import DaemonError, ExportError
+from .db.base import parse_filter, parse_sample
+from .metadata import MetadataCache, clear_metadata_caches
+from .result_cache import ResultCache, prefetch_in_background
+from .arrow import ARROW_FILE_FORMATS, ARROW_FORMATS, write_arrow
+from .json_output import write_json
+from .render import render_grid
+from .timings import phase, record_timings
 import json
-from decimal import Decimal
-from datetime import date
-
-
-class CustomEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, Decimal):
-            return float(obj)
-        elif isinstance(obj, date):
-            return obj.isoformat()
-        return super(CustomEncoder, self).default(obj)
 
 
 @click.group()
@@ -44,42 +52,701 @@ def cli():
 
 
 @cli.command()
-@click.argument('connection_name')
+@click.argument('connection_name', required=False)
+@click.option('--connections', 'connection_patterns', multiple=True,
+              help='Query these saved connections concurrently: comma-separated names or globs like "shard*"')
+@click.option('--merge', is_flag=True, help='With --connections, combine the rows of all connections in one table')
+@click.option('--workers', type=click.IntRange(min=1), default=8,
+              help='Number of connections queried at the same time with --connections')
+@click.option('--timeout', type=click.FloatRange(min=0, min_open=True), default=30,
+              help='Seconds after which the --connections that have not answered are reported as failed')
 @click.option('--table', help='Specific table to view')
-@click.option('--format', type=click.Choice(['table', 'json']), default='table', help='Output format')
+@click.option('--format', type=click.Choice(['table', 'json', 'ndjson'] + ARROW_FORMATS), default='table',
+              help='Output format (ndjson writes one row per line; arrow, feather and parquet are columnar)')
+@click.option('--compact', is_flag=True, help='Write JSON without indentation')
+@click.option('--output', '-o', type=click.Path(dir_okay=False),
+              help='File to write arrow, feather or parquet output to (arrow defaults to stdout)')
 @click.option('--page', type=int, default=1, help='Page number for pagination')
 @click.option('--page-size', type=int, default=100, help='Number of rows per page')
 @click.option('--scientific', is_flag=True, help='Display numbers in scientific notation')
-def view(connection_name, table, format, page, page_size, scientific):
+@click.option('--keyset', is_flag=True, help='Paginate by primary key instead of OFFSET')
+@click.option('--after', help='Cursor token of the previous keyset page (implies --keyset)')
+@click.option('--count', type=click.Choice(['exact', 'estimate', 'none']), default='exact',
+              help='How to count total rows: COUNT(*), planner statistics, or not at all')
+@click.option('--parallel', type=click.IntRange(min=1), default=1,
+              help='Number of tables to fetch concurrently when viewing all tables')
+@click.option('--no-daemon', is_flag=True, help='Connect directly even when a peepdb daemon is running')
+@click.option('--max-col-width', type=click.IntRange(min=1), help='Truncate table cells longer than this many characters')
+@click.option('--columns', help='Comma-separated list of columns to fetch')
+@click.option('--cache', is_flag=True, help='Cache fetched pages locally and prefetch the next page')
+@click.option('--where', '--filter', 'filters', multiple=True,
+              help='Filter rows, e.g. "age >= 30" or "name = \'Alice\'" (repeat to combine with AND)')
+@click.option('--sample', help='Show a random sample instead of a page: a number of rows or a percentage like 1%')
+@click.option('--timings', is_flag=True, help='Print the time spent in each phase to stderr')
+@click.option('--otel-file', type=click.Path(dir_okay=False),
+              help='Also write the phases as OpenTelemetry spans to this file (needs opentelemetry-sdk)')
+def view(connection_name, connection_patterns, merge, workers, timeout, table, format, compact, output, page, page_size,
+         scientific, keyset, after, count, parallel, no_daemon, max_col_width, columns, cache, filters, sample, timings,
+         otel_file):
     """
     View database tables.
 
-    CONNECTION_NAME is the name of the saved database connection to use.
+    CONNECTION_NAME is the name of the saved database connection to use, or use --connections to
+    query the same table on several saved connections at once.
 
     Examples:
     peepdb view mydb
     peepdb view mydb --table users --page 2 --page-size 50
     peepdb view mydb --format json
+    peepdb view mydb --table events --format ndjson
+    peepdb view mydb --table events --format parquet --output events.parquet
+    peepdb view mydb --table events --keyset --page-size 500
+    peepdb view mydb --table events --count estimate
+    peepdb view mydb --parallel 8
+    peepdb view mydb --table documents --max-col-width 40
+    peepdb view mydb --table users --columns id,name --where "age >= 30"
+    peepdb view mydb --table events --cache
+    peepdb view mydb --table events --sample 1000
+    peepdb view mydb --table events --timings
+    peepdb view --connections "shard*" --table events --count estimate
     """
-    connection = get_connection(connection_name)
-    if not connection:
-        click.echo(f"Error: No saved connection found with name '{connection_name}'.")
+    def run():
+        if not connection_patterns:
+            show_view(connection_name, table, format, compact, output, page, page_size, scientific, keyset, after, count,
+                      parallel, no_daemon, max_col_width, columns, cache, filters, sample)
+        elif connection_name:
+            click.echo("Error: Give either CONNECTION_NAME or --connections, not both.")
+        else:
+            show_connections_view(connection_patterns, merge, workers, timeout, table, format, compact, output, page,
+                                  page_size, scientific, keyset, after, count, no_daemon, max_col_width, columns, cache,
+                                  filters, sample)
+
+    if not (timings or otel_file):
+        run()
         return
 
-    db_type, host, user, password, database = connection
-    result = peep_db(db_type, host, user, password, database, table, format=format, page=page, page_size=page_size, scientific=scientific)
+    try:
+        with record_timings(otel_file) as recorded:
+            run()
+    except ImportError as e:
+        click.echo(f"Error: {e}")
+        return
+    if timings:
+        click.echo("", err=True)
+        for line in render_grid(recorded.rows(), max_col_width=80):
+            click.echo(line, err=True)
+        click.echo(f"Total: {recorded.total_seconds * 1000:.3f} ms", err=True)
+
+
+def parse_view_options(table, keyset, after, columns, filters, sample):
+    """
+    Checks the options of view and returns the parsed columns and filters, or None after
+    reporting an invalid combination.
+    """
+    if after and not table:
+        click.echo("Error: --after requires --table.")
+        return None
+    if sample:
+        if not table:
+            click.echo("Error: --sample requires --table.")
+            return None
+        if keyset or after:
+            click.echo("Error: --sample cannot be combined with --keyset or --after.")
+            return None
+        try:
+            parse_sample(sample)
+        except ValueError as e:
+            click.echo(f"Error: {e}")
+            return None
+    if (columns or filters) and not table:
+        click.echo("Error: --columns and --where require --table.")
+        return None
+    columns = [column.strip() for column in columns.split(',') if column.strip()] if columns else None
+    try:
+        for expression in filters:
+            parse_filter(expression)
+    except ValueError as e:
+        click.echo(f"Error: {e}")
+        return None
+    return columns, [expression for expression in filters] or None
+
+
+def show_view(connection_name, table, format, compact, output, page, page_size, scientific, keyset, after, count, parallel, no_daemon,
+              max_col_width, columns, cache, filters, sample=None):
+    if not connection_name:
+        click.echo("Error: Missing argument 'CONNECTION_NAME'.")
+        return
+    options = parse_view_options(table, keyset, after, columns, filters, sample)
+    if options is None:
+        return
+    columns, filters = options
+
+    if format in ARROW_FORMATS:
+        write_arrow_view(connection_name, table, format, output, page, page_size, keyset or after, count, columns,
+                         filters, sample)
+        return
+
+    request = {'table': table, 'page': page, 'page_size': page_size, 'after': after, 'keyset': keyset,
+               'count': count, 'columns': columns, 'filters': filters}
+    if sample:
+        request['sample'] = sample
+    # Every sample is drawn anew, caching one would keep showing the same rows
+    result_cache = ResultCache() if cache and not sample else None
+    result = None
+    if result_cache:
+        result = result_cache.get(connection_name, ResultCache.key(connection_name, **request))
+
+    if result is None:
+        try:
+            result = fetch_view_result(connection_name, not no_daemon, dict(request, parallel=parallel))
+        except (DaemonError, NotImplementedError) as e:
+            # Options the backend does not support, e.g. --sample on Firebase
+            click.echo(f"Error: {e}")
+            return
+        if result is None:
+            click.echo(f"Error: No saved connection found with name '{connection_name}'.")
+            return
+        if result_cache:
+            result_cache.put(connection_name, ResultCache.key(connection_name, **request), result)
+    next_cursor = result[table].get('next_cursor') if table else None
+    cache_option = " --cache" if cache else ""
 
     if format == 'table':
-        click.echo(result)
-        if table:
+        # Print each line as soon as it is rendered instead of building the whole output first
+        with phase('render') as attributes:
+            size = 0
+            for line in iter_table_output(result, scientific, max_col_width):
+                click.echo(line)
+                size += len(line) + 1
+            attributes['bytes'] = size
+        if table and sample:
+            click.echo(f"\nAnother sample: peepdb view {connection_name} --table {table} --sample {sample}")
+        elif table and (keyset or after):
+            click.echo("\nNavigation:")
+            if next_cursor:
+                click.echo(
+                    f"Next Page: peepdb view {connection_name} --table {table} --after {next_cursor} --page-size {page_size}{cache_option}")
+            else:
+                click.echo("Last page reached.")
+            click.echo(
+                f"First Page: peepdb view {connection_name} --table {table} --keyset --page-size {page_size}{cache_option}")
+        elif table:
             click.echo("\nNavigation:")
             click.echo(f"Current Page: {page}")
             click.echo(
-                f"Next Page: peepdb view {connection_name} --table {table} --page {page + 1} --page-size {page_size}")
+                f"Next Page: peepdb view {connection_name} --table {table} --page {page + 1} --page-size {page_size}{cache_option}")
             click.echo(
-                f"Previous Page: peepdb view {connection_name} --table {table} --page {max(1, page - 1)} --page-size {page_size}")
+                f"Previous Page: peepdb view {connection_name} --table {table} --page {max(1, page - 1)} --page-size {page_size}{cache_option}")
+    else:
+        # Values are converted by the encoder and rows are written out as they are encoded
+        style = 'ndjson' if format == 'ndjson' else 'compact' if compact else 'pretty'
+        sys.stdout.flush()
+        with phase('json_encode') as attributes:
+            attributes['bytes'] = write_json(result, sys.stdout.buffer, style)
+        sys.stdout.buffer.flush()
+
+    # Started once the page is out, so loading the next one does not delay it
+    if result_cache and table:
+        prefetch_next_page(result_cache, connection_name, not no_daemon, request, result[table])
+
+
+def show_connections_view(connection_patterns, merge, workers, timeout, table, format, compact, output, page, page_size,
+                          scientific, keyset, after, count, no_daemon, max_col_width, columns, cache, filters, sample):
+    """
+    Fetches the same view from every matching saved connection concurrently and prints the
+    results labelled by connection, or merged with --merge.
+    """
+    patterns = [pattern.strip() for value in connection_patterns for pattern in value.split(',') if pattern.strip()]
+    names = match_connections(patterns)
+    if not names:
+        click.echo(f"Error: No saved connection matches {', '.join(patterns)}.")
+        return
+    if format in ARROW_FORMATS or output:
+        click.echo(f"Error: --connections does not support --format {format} or --output.")
+        return
+    if after or cache:
+        click.echo("Error: --connections cannot be combined with --after or --cache.")
+        return
+    if merge and not table:
+        click.echo("Error: --merge requires --table.")
+        return
+    options = parse_view_options(table, keyset, after, columns, filters, sample)
+    if options is None:
+        return
+    columns, filters = options
+
+    request = {'table': table, 'page': page, 'page_size': page_size, 'keyset': keyset, 'count': count,
+               'columns': columns, 'filters': filters, 'parallel': 1}
+    if sample:
+        request['sample'] = sample
+    use_daemon = not no_daemon and request_daemon({'action': 'ping'}) is not None
+    if not use_daemon:
+        # Decrypt up front, so a password prompt for the key is not raised by several workers at once
+        for name in names:
+            get_connection(name)
+
+    def fetch(name):
+        result = fetch_view_result(name, use_daemon, request)
+        if result is None:
+            raise ValueError(f"No saved connection found with name '{name}'.")
+        return result
+
+    results = fetch_connections_concurrently(names, fetch, parallel=workers, timeout=timeout)
+    result = label_connection_results(results, page, merge)
+    failed = sum(isinstance(value, Exception) for value in results.values())
+
+    if format == 'table':
+        with phase('render') as attributes:
+            size = 0
+            for line in iter_table_output(result, scientific, max_col_width):
+                click.echo(line)
+                size += len(line) + 1
+            attributes['bytes'] = size
+        click.echo(f"\nQueried {len(names)} connection(s), {failed} failed.")
+    else:
+        style = 'ndjson' if format == 'ndjson' else 'compact' if compact else 'pretty'
+        sys.stdout.flush()
+        with phase('json_encode') as attributes:
+            attributes['bytes'] = write_json(result, sys.stdout.buffer, style)
+        sys.stdout.buffer.flush()
+
+
+def write_arrow_view(connection_name, table, format, output, page, page_size, keyset, count, columns, filters,
+                     sample=None):
+    """
+    Writes one page of a table in a columnar format, read directly from the database.
+    """
+    if not table:
+        click.echo(f"Error: --format {format} requires --table.")
+        return
+    if format in ARROW_FILE_FORMATS and not output:
+        click.echo(f"Error: --output is required for {format} output.")
+        return
+    if keyset:
+        click.echo(f"Error: --format {format} does not support keyset pagination.")
+        return
+    connection = get_connection(connection_name)
+    if not connection:
+        click.echo(f"Error: No saved connection found with name '{connection_name}'.")
+        return
+
+    try:
+        # Keep progress messages out of binary data written to stdout
+        with contextlib.redirect_stdout(sys.stderr if not output else sys.stdout):
+            result = fetch_results(*connection, table, page=page, page_size=page_size, count=count,
+                                   columns=columns, filters=filters, metadata=MetadataCache(connection_name),
+                                   columnar=True, sample=sample)
+    except (ImportError, NotImplementedError) as e:
+        click.echo(f"Error: {e}")
+        return
+    with phase('write_arrow'):
+        if output:
+            rows = write_arrow(result[table]['data'], format, output)
+        else:
+            sys.stdout.flush()
+            rows = write_arrow(result[table]['data'], format, sys.stdout.buffer)
+            sys.stdout.buffer.flush()
+    click.echo(f"Wrote {rows} rows of '{table}' ({format_page_info(dict(result[table], data=range(rows)))}).",
+               err=True)
+
+
+def fetch_view_result(connection_name, use_daemon, request):
+    """
+    Fetches a view result from a running daemon, or directly when there is none.
+
+    Returns None when no connection with that name is saved.
+    """
+    if use_daemon:
+        # A running 'peepdb serve' daemon answers from its warm connection pool
+        with phase('daemon_request'):
+            result = request_daemon({'action': 'view', 'connection': connection_name, **request})
+        if result is not None:
+            return result
+
+    connection = get_connection(connection_name)
+    if not connection:
+        return None
+    return fetch_results(*connection, metadata=MetadataCache(connection_name), **request)
+
+
+def prefetch_next_page(result_cache, connection_name, use_daemon, request, table_result):
+    """
+    Loads the page after table_result into the result cache in the background.
+    """
+    if table_result.get('error') or len(table_result['data']) < request['page_size']:
+        return
+    if table_result['page'] is None:
+        if not table_result.get('next_cursor'):
+            return
+        next_request = dict(request, after=table_result['next_cursor'])
+    else:
+        next_request = dict(request, page=request['page'] + 1)
+
+    key = ResultCache.key(connection_name, **next_request)
+    if result_cache.get(connection_name, key) is not None:
+        return
+    prefetch_in_background(connection_name, key, dict(next_request, parallel=1), use_daemon, result_cache.directory)
+
+
+@cli.command()
+@click.argument('connection_name')
+@click.option('--table', required=True, help='Table to browse')
+@click.option('--window-size', type=click.IntRange(min=1), default=500,
+              help='Number of rows fetched per round trip')
+@click.option('--max-windows', type=click.IntRange(min=2), default=4,
+              help='Number of fetched windows kept in memory')
+@click.option('--max-col-width', type=click.IntRange(min=1), default=30, help='Truncate cells longer than this')
+@click.option('--scientific', is_flag=True, help='Display numbers in scientific notation')
+@click.option('--columns', help='Comma-separated list of columns to fetch')
+@click.option('--where', '--filter', 'filters', multiple=True,
+              help='Filter rows, e.g. "age >= 30" (repeat to combine with AND)')
+def browse(connection_name, table, window_size, max_windows, max_col_width, scientific, columns, filters):
+    """
+    Scroll through a table in a full-screen viewer.
+
+    One connection is kept open for the whole session. Rows are fetched in windows (by primary
+    key where the database supports it) and the next window is prefetched in the background,
+    so only a few windows are held in memory however large the table is.
+
+    Keys: arrows or j/k to move, PgUp/PgDn or space to page, Home or g for the first row,
+    left/right or h/l to scroll columns, q to quit.
+
+    CONNECTION_NAME is the name of the saved database connection to use.
+
+    Examples:
+    peepdb browse mydb --table events
+    peepdb browse mydb --table users --columns id,name --where "age >= 30"
+    """
+    from .browse import browse_table
+
+    columns = [column.strip() for column in columns.split(',') if column.strip()] if columns else None
+    try:
+        filters = [parse_filter(expression) for expression in filters] or None
+    except ValueError as e:
+        click.echo(f"Error: {e}")
+        return
+
+    connection = get_connection(connection_name)
+    if not connection:
+        click.echo(f"Error: No saved connection found with name '{connection_name}'.")
+        return
+
+    db = connect_to_database(*connection)
+    db.metadata = MetadataCache(connection_name)
+    try:
+        browse_table(db, table, window_size, columns, filters, max_windows, max_col_width, scientific)
+    except Exception as e:
+        click.echo(f"Error: {e}")
+
+
+@cli.command()
+@click.argument('connection_name', required=False)
+@click.option('--table', help='Table to export')
+@click.option('--format', type=click.Choice(EXPORT_FORMATS), default='ndjson', help='Output format')
+@click.option('--output', '-o', type=click.Path(dir_okay=False), help='Output file (default: stdout)')
+@click.option('--batch-size', type=click.IntRange(min=1), default=1000, help='Number of rows fetched per round trip')
+@click.option('--partitions', type=click.IntRange(min=1), default=1,
+              help='Split the table into this many key ranges exported concurrently by worker processes')
+@click.option('--shards', is_flag=True, help='With --partitions, keep one output file per key range')
+@click.option('--checkpoint', is_flag=True,
+              help='Save progress after every batch under ~/.peepdb/jobs so an interrupted export can be resumed')
+@click.option('--resume', 'job_id', help='Resume the checkpointed export job with this id')
+@click.option('--retries', type=click.IntRange(min=0), default=DEFAULT_RETRIES,
+              help='With --checkpoint or --resume, retries after a transient error, with exponential backoff')
+def export(connection_name, table, format, output, batch_size, partitions, shards, checkpoint, job_id, retries):
+    """
+    Export a whole table as NDJSON, CSV or Parquet.
+
+    Rows are streamed from a server-side cursor straight to the output, so memory use
+    stays constant regardless of the size of the table.
+
+    CONNECTION_NAME is the name of the saved database connection to use.
+
+    Examples:
+    peepdb export mydb --table events > events.ndjson
+    peepdb export mydb --table events --format csv --output events.csv
+    peepdb export mydb --table events --format parquet --output events.parquet
+    peepdb export mydb --table events --partitions 8 --output events.ndjson
+    peepdb export mydb --table events --checkpoint --output events.ndjson
+    peepdb export --resume mydb-events-20260101-120000-3f9a1c
+    """
+    if job_id:
+        resume_export(job_id, retries)
+        return
+    if not connection_name or not table:
+        click.echo("Error: CONNECTION_NAME and --table are required unless --resume is used.")
+        return
+    if checkpoint and (not output or format not in RESUMABLE_FORMATS or partitions > 1):
+        click.echo(f"Error: --checkpoint requires --output, a {' or '.join(RESUMABLE_FORMATS)} format "
+                   f"and no --partitions.")
+        return
+    if format in BINARY_FORMATS and not output:
+        click.echo(f"Error: --output is required for {format} export.")
+        return
+    if shards and not output:
+        click.echo("Error: --shards requires --output.")
+        return
+
+    connection = get_connection(connection_name)
+    if not connection:
+        click.echo(f"Error: No saved connection found with name '{connection_name}'.")
+        return
+
+    if partitions > 1:
+        export_partitions(connection, table, format, output, batch_size, partitions, shards)
+        return
+    if checkpoint:
+        job = ExportJob.create(connection_name, table, format, output, batch_size)
+        click.echo(f"Export job '{job.job_id}' started.", err=True)
+        run_checkpointed_export(job, connection, retries)
+        return
+
+    db_type, host, user, password, database = connection
+    try:
+        if format in BINARY_FORMATS:
+            count = export_table(db_type, host, user, password, database, table, format, output, batch_size)
+        elif output:
+            with open(output, 'w', newline='', encoding='utf-8') as f:
+                count = export_table(db_type, host, user, password, database, table, format, f, batch_size)
+        else:
+            count = export_table(db_type, host, user, password, database, table, format,
+                                 sys.stdout, batch_size)
+    except ImportError as e:
+        click.echo(f"Error: {e}")
+        return
+    click.echo(f"Exported {count} rows from '{table}'.", err=True)
+
+
+def resume_export(job_id, retries):
+    job = ExportJob.load(job_id)
+    if not job:
+        click.echo(f"Error: No export job found with id '{job_id}'.")
+        return
+    if job.status == 'done':
+        click.echo(f"Export job '{job_id}' already finished with {job.rows} rows in {job.output}.")
+        return
+    connection = get_connection(job.connection)
+    if not connection:
+        click.echo(f"Error: No saved connection found with name '{job.connection}'.")
+        return
+    click.echo(f"Resuming export job '{job_id}' after {job.rows} rows.", err=True)
+    run_checkpointed_export(job, connection, retries)
+
+
+def run_checkpointed_export(job, connection, retries):
+    resume_hint = f"Resume it with: peepdb export --resume {job.job_id}"
+    try:
+        count = run_export_job(job, connection, retries)
+    except KeyboardInterrupt:
+        click.echo(f"\nExport job '{job.job_id}' interrupted after {job.rows} rows. {resume_hint}", err=True)
+        return
+    except Exception as e:
+        click.echo(f"Error: {e}")
+        click.echo(f"Export job '{job.job_id}' stopped after {job.rows} rows. {resume_hint}", err=True)
+        return
+    click.echo(f"Exported {count} rows from '{job.table}' to {job.output}.", err=True)
+
+
+def export_partitions(connection, table, format, output, batch_size, partitions, shards):
+    try:
+        if shards or format in BINARY_FORMATS or not output:
+            count, paths = export_partitioned(connection, table, format, output or sys.stdout, partitions, batch_size,
+                                              shards)
+        else:
+            with open(output, 'w', newline='', encoding='utf-8') as f:
+                count, paths = export_partitioned(connection, table, format, f, partitions, batch_size)
+    except (ImportError, ValueError, ExportError) as e:
+        click.echo(f"Error: {e}")
+        if isinstance(e, ExportError) and output and os.path.exists(output):
+            # Nothing was merged into the output, do not leave an empty file that looks like an export
+            os.remove(output)
+        return
+    click.echo(f"Exported {count} rows from '{table}' in {partitions} partitions.", err=True)
+    for path in paths:
+        if os.path.exists(path):
+            click.echo(f"  {path}", err=True)
+
+
+@cli.command()
+@click.option('--connection', 'connection_name', help='Benchmark a saved connection instead of a generated SQLite database')
+@click.option('--table', help='Table of the saved connection to benchmark')
+@click.option('--rows', type=click.IntRange(min=1), default=100000, help='Rows of the generated table')
+@click.option('--width', type=click.IntRange(min=1), default=8, help='Columns of the generated table')
+@click.option('--page-size', type=click.IntRange(min=1), default=100, help='Rows per fetched page')
+@click.option('--repeat', type=click.IntRange(min=1), default=5, help='Number of timed runs per benchmark')
+@click.option('--output', '-o', type=click.Path(dir_okay=False), help='Write the results as JSON to this file')
+@click.option('--compare', type=click.Path(exists=True, dir_okay=False),
+              help='JSON results of an earlier run to compare against')
+def bench(connection_name, table, rows, width, page_size, repeat, output, compare):
+    """
+    Benchmark connecting, fetching, formatting and JSON encoding.
+
+    By default a SQLite database with a table of --rows rows and --width columns is generated
+    in a temporary directory. Server backends are benchmarked with --connection and --table,
+    e.g. against a local database server. Each benchmark reports its fastest and mean time
+    and its peak Python memory use.
+
+    Examples:
+    peepdb bench --rows 1000000 --output before.json
+    peepdb bench --rows 1000000 --compare before.json
+    peepdb bench --connection local_postgres --table events
+    """
+    from .bench import bench_report, compare_results, create_fixture, run_benchmarks
+
+    if connection_name:
+        if not table:
+            click.echo("Error: --connection requires --table.")
+            return
+        connection = get_connection(connection_name)
+        if not connection:
+            click.echo(f"Error: No saved connection found with name '{connection_name}'.")
+            return
+        parameters = {'connection': connection_name, 'db_type': connection[0], 'table': table,
+                      'page_size': page_size, 'repeat': repeat}
+        results = run_benchmarks(connection, table, page_size, repeat)
+    else:
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'bench.db')
+            click.echo(f"Generating {rows} rows x {width} columns...", err=True)
+            table = create_fixture(path, rows, width)
+            parameters = {'db_type': 'sqlite', 'rows': rows, 'width': width, 'page_size': page_size,
+                          'repeat': repeat}
+            results = run_benchmarks(('sqlite', path, '', '', ''), table, page_size, repeat)
+
+    report = bench_report(results, parameters)
+    lines = [{'benchmark': name, 'min ms': round(timing['min'] * 1000, 3),
+              'mean ms': round(timing['mean'] * 1000, 3), 'peak KiB': round(timing['peak_kib'], 1)}
+             for name, timing in results.items()]
+    if compare:
+        with open(compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        ratios = {name: (before, ratio) for name, before, _, ratio in compare_results(report, baseline)}
+        for line in lines:
+            before, ratio = ratios.get(line['benchmark'], (None, None))
+            line['baseline ms'] = None if before is None else round(before * 1000, 3)
+            line['change'] = None if ratio is None else f"{(ratio - 1) * 100:+.1f}%"
+    for line in render_grid(lines):
+        click.echo(line)
+
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        click.echo(f"Results written to {output}.", err=True)
+
+
+@cli.command()
+@click.option('--socket', 'socket_path', type=click.Path(dir_okay=False), default=SOCKET_PATH,
+              help='Unix socket to listen on')
+@click.option('--max-size', type=click.IntRange(min=1), default=4, help='Maximum connections per saved connection')
+@click.option('--idle-timeout', type=click.FloatRange(min=1), default=300,
+              help='Seconds after which an unused connection is closed')
+@click.option('--health-check-interval', type=click.FloatRange(min=0), default=30,
+              help='Seconds a connection may sit idle before it is checked again on reuse')
+def serve(socket_path, max_size, idle_timeout, health_check_interval):
+    """
+    Run a daemon that keeps warm database connections.
+
+    While the daemon runs, 'peepdb view' sends its requests over a local Unix socket and
+    reuses pooled connections instead of connecting and authenticating on every call.
+    Stop it with Ctrl+C.
+
+    Example:
+    peepdb serve --max-size 8 --idle-timeout 600
+    """
+    daemon = PeepDBDaemon(socket_path, max_size=max_size, idle_timeout=idle_timeout,
+                          health_check_interval=health_check_interval)
+    click.echo(f"peepdb daemon listening on {socket_path}")
+    try:
+        daemon.serve_forever()
+    except DaemonError as e:
+        click.echo(f"Error: {e}")
+    except KeyboardInterrupt:
+        click.echo("peepdb daemon stopped.")
+
+
+@cli.command()
+@click.option('--ttl', type=click.FloatRange(min=1), default=3600, help='Seconds a key is remembered')
+@click.option('--forget', is_flag=True, help='Make the running agent forget all keys')
+def agent(ttl, forget):
+    """
+    Run an agent that remembers the encryption key in memory.
+
+    In 'password' key mode, every command otherwise asks for the password and spends a
+    PBKDF2 key derivation on it. While the agent runs, the derived key is kept in memory
+    (never on disk) for --ttl seconds and later commands skip both. Stop it with Ctrl+C.
+
+    Examples:
+    peepdb agent --ttl 1800
+    peepdb agent --forget
+    """
+    if forget:
+        count = send_request(AGENT_SOCKET_FILE, {'action': 'remove_all'})
+        if count is None:
+            click.echo("No peepdb agent is running.")
+        else:
+            click.echo(f"{count} key(s) forgotten.")
+        return
+
+    key_agent = KeyAgent(AGENT_SOCKET_FILE, ttl=ttl)
+    click.echo(f"peepdb agent listening on {AGENT_SOCKET_FILE}")
+    try:
+        key_agent.serve_forever()
+    except DaemonError as e:
+        click.echo(f"Error: {e}")
+    except KeyboardInterrupt:
+        click.echo("peepdb agent stopped.")
+
+
+@cli.group()
+def cache():
+    """
+    Manage cached metadata and result pages.
+
+    Table lists, columns, primary keys and row estimates are cached per saved connection
+    under ~/.peepdb/metadata and are fetched again when the schema changes or after a day.
+    Pages viewed with --cache are kept under ~/.peepdb/results for five minutes.
+    """
+
+
+@cache.command('refresh')
+@click.argument('connection_name')
+def cache_refresh(connection_name):
+    """
+    Fetch the metadata of a saved connection again.
+
+    Example:
+    peepdb cache refresh mydb
+    """
+    connection = get_connection(connection_name)
+    if not connection:
+        click.echo(f"Error: No saved connection found with name '{connection_name}'.")
+        return
+
+    with connect_to_database(*connection) as db:
+        tables = MetadataCache(connection_name).refresh(db)
+    click.echo(f"Cached metadata of {len(tables)} table(s) for '{connection_name}'.")
+
+
+@cache.command('clear')
+@click.argument('connection_name', required=False)
+def cache_clear(connection_name):
+    """
+    Remove the cached metadata and result pages of one or all saved connections.
+
+    Examples:
+    peepdb cache clear mydb
+    peepdb cache clear
+    """
+    pages = ResultCache().clear(connection_name)
+    if connection_name:
+        if MetadataCache(connection_name).clear():
+            click.echo(f"Metadata cache of '{connection_name}' cleared.")
+        else:
+            click.echo(f"No cached metadata for '{connection_name}'.")
     else:
-        click.echo(json.dumps(result, indent=2, cls=CustomEncoder))
+        count = clear_metadata_caches()
+        click.echo(f"{count} metadata cache(s) cleared.")
+    click.echo(f"{pages} cached page(s) removed.")
 
 
 @cli.command()
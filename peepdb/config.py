@@ -1,16 +1,18 @@
 import base64
+import fnmatch
 import json
 import os
 from dataclasses import dataclass
 import logging
 
 import click
-import keyring
 from cachetools import TTLCache, cached
 from cryptography.fernet import Fernet, InvalidToken
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+from .agent import add_agent_key, get_agent_key, remove_agent_key
 from .exceptions import InvalidPassword
+from .timings import phase
 
 @dataclass
 class KeySecurity():
@@ -21,11 +23,20 @@ class KeySecurity():
 CONFIG_DIR = os.path.expanduser("~/.peepdb")
 CONFIG_FILE = os.path.join(CONFIG_DIR, "config.json")
 SECURITY_CONFIG_FILE = os.path.join(CONFIG_DIR, "security_config.json")
+AGENT_SOCKET_FILE = os.path.join(CONFIG_DIR, "agent.sock")
 KEYRING_USERNAME = "PEEP_DB_KEY"
 KEYRING_SERVICE_NAME = "PEEP_DB"
 
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
+
+# Process-wide caches: the parsed config file with the modification time it was read at,
+# connections that were already decrypted, and the Fernet instance built from the key
+_config_cache = None
+_connection_cache = {}
+_fernet = None
+
+
 @cached(cache=TTLCache(maxsize=1024, ttl=600))
 def generate_key_from_password(salt):
     password = click.prompt("Please entry the password to encrpyt/decrpty DB passwords",
@@ -42,6 +53,8 @@ def generate_key_from_password(salt):
 
 @cached(cache=TTLCache(maxsize=1024, ttl=600))
 def fetch_key_from_keyring():
+    # keyring discovers its backends through entry points, which is slow, so it is only imported when needed
+    import keyring
     key = keyring.get_password(KEYRING_SERVICE_NAME, KEYRING_USERNAME)
     if not key:
         key = Fernet.generate_key().decode("utf-8")
@@ -67,17 +80,73 @@ def get_key():
         # Fetching encryption key from keyring
         key = fetch_key_from_keyring()
     else:
-        # Dynamically generating encryption key from users input
-        key = generate_key_from_password(key_security_config['salt'])
+        salt = key_security_config['salt']
+        # A running 'peepdb agent' remembers the derived key, which skips the prompt and PBKDF2
+        key = get_agent_key(AGENT_SOCKET_FILE, salt)
+        if key is None:
+            # Dynamically generating encryption key from users input
+            key = generate_key_from_password(salt)
+            add_agent_key(AGENT_SOCKET_FILE, salt, key)
     return key
 
 
+def get_fernet() -> Fernet:
+    global _fernet
+    if _fernet is None:
+        _fernet = Fernet(get_key())
+    return _fernet
+
+
+def forget_key():
+    """
+    Drops every cached copy of the encryption key, e.g. after a wrong password was entered.
+    """
+    global _fernet
+    _fernet = None
+    _connection_cache.clear()
+    generate_key_from_password.cache.clear()
+    if os.path.exists(SECURITY_CONFIG_FILE):
+        key_security_config = get_key_security_config()
+        if key_security_config['type'] == KeySecurity.PASSWORD:
+            remove_agent_key(AGENT_SOCKET_FILE, key_security_config['salt'])
+
+
 def encrypt(message: str) -> str:
-    return Fernet(get_key()).encrypt(message.encode()).decode()
+    return get_fernet().encrypt(message.encode()).decode()
 
 
 def decrypt(token: str) -> str:
-    return Fernet(get_key()).decrypt(token.encode()).decode()
+    return get_fernet().decrypt(token.encode()).decode()
+
+
+def _config_mtime():
+    try:
+        return os.stat(CONFIG_FILE).st_mtime_ns
+    except OSError:
+        return None
+
+
+def load_config():
+    """
+    Returns the parsed connection config. The file is only parsed again when it changed on disk.
+    """
+    global _config_cache
+    mtime = _config_mtime()
+    if _config_cache is None or _config_cache[0] != mtime:
+        config = {}
+        if os.path.exists(CONFIG_FILE):
+            with open(CONFIG_FILE, "r") as f:
+                config = json.load(f)
+        _config_cache = (mtime, config)
+        _connection_cache.clear()
+    return _config_cache[1]
+
+
+def _write_config(config):
+    global _config_cache
+    with open(CONFIG_FILE, "w") as f:
+        json.dump(config, f)
+    _config_cache = None
 
 
 def save_connection(name, db_type, host, user, password, database):
@@ -107,23 +176,28 @@ def save_connection(name, db_type, host, user, password, database):
             "database": encrypt(database)
         }
 
-    with open(CONFIG_FILE, "w") as f:
-        json.dump(config, f)
+    _write_config(config)
     
     logger.debug("Connection saved successfully")
 
 
 def get_connection(name):
-    if not os.path.exists(CONFIG_FILE):
-        return None
-
-    with open(CONFIG_FILE, "r") as f:
-        config = json.load(f)
-
-    if name not in config:
-        return None
-
-    conn = config[name]
+    with phase('get_connection'):
+        config = load_config()
+        if name not in config:
+            return None
+
+        if name not in _connection_cache:
+            with phase('decrypt'):
+                _connection_cache[name] = decrypt_connection(config[name])
+        return _connection_cache[name]
+
+
+def decrypt_connection(conn):
+    """
+    Resolves a saved connection into (db_type, host, user, password, database), decrypting
+    all of its fields with the same key.
+    """
     try:
         if conn["db_type"] in ['sqlite', 'firebase']:
             return (
@@ -142,17 +216,12 @@ def get_connection(name):
                 decrypt(conn["database"])
             )
     except InvalidToken:
+        forget_key()
         raise InvalidPassword("Password is invalid !!!")
 
 
 def list_connections():
-    if not os.path.exists(CONFIG_FILE):
-        print("No saved connections.")
-        return
-
-    with open(CONFIG_FILE, "r") as f:
-        config = json.load(f)
-
+    config = load_config()
     if not config:
         print("No saved connections.")
         return
@@ -163,6 +232,14 @@ def list_connections():
         print(f"- {name} ({db_type})")
 
 
+def match_connections(patterns):
+    """
+    Returns the names of saved connections matching any of patterns, which are names or glob
+    patterns such as "shard*", in the order the connections were saved.
+    """
+    return [name for name in load_config() if any(fnmatch.fnmatchcase(name, pattern) for pattern in patterns)]
+
+
 def remove_connection(name):
     if not os.path.exists(CONFIG_FILE):
         return False
@@ -175,13 +252,13 @@ def remove_connection(name):
 
     del config[name]
 
-    with open(CONFIG_FILE, "w") as f:
-        json.dump(config, f)
+    _write_config(config)
 
     return True
 
 
 def remove_all_connections():
+    global _config_cache
     if not os.path.exists(CONFIG_FILE):
         return 0
 
@@ -192,12 +269,14 @@ def remove_all_connections():
             count = len(config)
 
         os.remove(CONFIG_FILE)
+        _config_cache = None
     except FileNotFoundError:
         # File was deleted between check and remove
         pass
     except json.JSONDecodeError:
         # File exists but is not valid JSON
         os.remove(CONFIG_FILE)
+        _config_cache = None
 
     return count
 
@@ -1,9 +1,24 @@
-from tabulate import tabulate
+import contextvars
+import json
 import logging
-from typing import Dict, Any
+import threading
+from functools import partial
+from time import monotonic
+from typing import TYPE_CHECKING, Callable, Dict, Any, Iterator, List, Optional, Tuple, Union
 from datetime import date, time, datetime
 from decimal import Decimal
-from .db import MySQLDatabase, PostgreSQLDatabase, MariaDBDatabase, MongoDBDatabase, SQLiteDatabase, FirebaseDatabase
+from .db import get_async_backend, get_backend
+from .db.base import BaseDatabase, parse_filter, parse_sample
+from .pool import ConnectionPool
+from .metadata import MetadataCache
+from .arrow import rows_to_arrow
+from .json_output import json_default
+from .render import render_grid
+from .timings import phase, timed
+
+if TYPE_CHECKING:
+    # asyncio and the async backends are only imported by the async API
+    from .db.async_base import AsyncBaseDatabase
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
@@ -15,75 +30,427 @@ console_handler.setLevel(logging.DEBUG)
 logger.addHandler(console_handler)
 
 
+class CustomEncoder(json.JSONEncoder):
+    def default(self, obj):
+        try:
+            return json_default(obj)
+        except TypeError:
+            return super(CustomEncoder, self).default(obj)
+
+
+@timed('connect_to_database')
 def connect_to_database(db_type: str, host: str, user: str, password: str, database: str, **kwargs):
-    if db_type == 'mysql':
-        return MySQLDatabase(host, user, password, database, **kwargs)
-    elif db_type == 'postgres':
-        return PostgreSQLDatabase(host, user, password, database, **kwargs)
-    elif db_type == 'mariadb':
-        return MariaDBDatabase(host, user, password, database, **kwargs)
-    elif db_type == 'mongodb':
-        return MongoDBDatabase(host, user, password, database, **kwargs)
-    elif db_type == 'sqlite':
-        return SQLiteDatabase(host, user, password, database, **kwargs)
-    elif db_type == 'firebase':
+    backend = get_backend(db_type)
+    if db_type == 'firebase':
         # For Firebase, 'host' will be the path to the service account key
-        return FirebaseDatabase(host, **kwargs)
-    else:
-        raise ValueError("Unsupported database type")
+        return backend(host, **kwargs)
+    return backend(host, user, password, database, **kwargs)
+
+
+def fetch_results(db_type: str, host: str, user: str, password: str, database: str, table: str = None, page: int = 1,
+                  page_size: int = 100, after: str = None, keyset: bool = False,
+                  count: str = 'exact', parallel: int = 1, columns: List[str] = None,
+                  filters: List[Union[str, Tuple[str, str, Any]]] = None,
+                  metadata: Optional[MetadataCache] = None, columnar: bool = False,
+                  sample: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Connects to the database and returns the raw fetch_data result of each requested table.
+
+    When all tables are fetched and parallel is greater than 1, tables are fetched concurrently
+    by that many workers, each on its own pooled connection. columns limits the returned columns
+    and filters, given as strings like "age >= 30" or parsed tuples, are evaluated by the database.
+    Table lists, primary keys and row estimates are read from metadata when given. With columnar,
+    the results of fetch_arrow are returned instead, each page as a pyarrow.Table. sample, a number
+    of rows like "500" or a percentage like "1%", returns a random sample of table instead of a page.
+    """
+    factory = partial(connect_to_database, db_type, host, user, password, database)
+    if metadata is not None:
+        factory = partial(with_metadata, factory, metadata)
+    with phase('fetch'), ConnectionPool(factory, max_size=parallel) as pool:
+        return fetch_from_pool(pool, table, page=page, page_size=page_size, after=after, keyset=keyset,
+                               count=count, parallel=parallel, columns=columns, filters=filters,
+                               metadata=metadata, columnar=columnar, sample=sample)
+
+
+def with_metadata(factory: Callable[[], BaseDatabase], metadata: MetadataCache) -> BaseDatabase:
+    db = factory()
+    db.metadata = metadata
+    return db
 
 
-def peep_db(db_type: str, host: str, user: str, password: str, database: str, table: str = None, format: str = 'table', page: int = 1, page_size: int = 100, scientific: bool = False) -> Any:
-    print(f"peep_db called with: db_type={db_type}, host={host}, database={database}, table={table}, scientific={scientific}")
-    db = connect_to_database(db_type, host, user, password, database)
-    db.connect()
-    try:
+def fetch_options(db: Union[BaseDatabase, 'AsyncBaseDatabase'], after: str = None, keyset: bool = False, count: str = 'exact',
+                  columns: List[str] = None, filters: List[Union[str, Tuple[str, str, Any]]] = None) -> Dict[str, Any]:
+    # Only pass optional arguments when requested so backends keep their plain fetch_data call
+    options = {}
+    if keyset or after:
+        if not db.supports_keyset:
+            raise ValueError(f"Keyset pagination is not supported by {db.__class__.__name__}")
+        options.update(after=after, keyset=True)
+    if count != 'exact':
+        options['count'] = count
+    if columns:
+        options['columns'] = list(columns)
+    if filters:
+        options['filters'] = [parse_filter(f) if isinstance(f, str) else tuple(f) for f in filters]
+    return options
+
+
+def fetch_from_pool(pool: ConnectionPool, table: str = None, page: int = 1, page_size: int = 100, after: str = None,
+                    keyset: bool = False, count: str = 'exact', parallel: int = 1, columns: List[str] = None,
+                    filters: List[Union[str, Tuple[str, str, Any]]] = None,
+                    metadata: Optional[MetadataCache] = None, columnar: bool = False,
+                    sample: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Same as fetch_results, but takes its connections from an existing pool.
+    """
+    if sample:
+        return fetch_sample_from_pool(pool, table, sample, keyset or after, columns, filters, columnar)
+    if columnar and (keyset or after):
+        raise ValueError("Keyset pagination is not supported for columnar results")
+    method = 'fetch_arrow' if columnar else 'fetch_data'
+    with pool.connection() as db:
+        options = fetch_options(db, after, keyset, count, columns, filters)
         if table:
-            print(f"Fetching data for table: {table}")
-            result = {table: db.fetch_data(table, page, page_size)}
-        else:
-            print("Fetching all tables")
-            tables = db.fetch_tables()
-            print(f"Tables fetched: {tables}")
-            result = {table: db.fetch_data(table, page, page_size) for table in tables}
-
-        if format == 'table':
-            # Apply formatting to data for table output to adapt with scientific notation
-            for table_name in result:
-                for row in result[table_name]['data']:
-                    for key in row:
-                        row[key] = format_value(row[key], scientific, output_format='table')
-            return format_as_table(result)
+            logger.debug(f"Fetching data for table: {table}")
+            return {table: getattr(db, method)(table, page, page_size, **options)}
+        logger.debug("Fetching all tables")
+        tables = metadata.tables(db) if metadata is not None else db.fetch_tables()
+        logger.debug(f"Tables fetched: {tables}")
+        if parallel <= 1:
+            return {table: getattr(db, method)(table, page, page_size, **options) for table in tables}
+    return fetch_tables_concurrently(pool, tables, page, page_size, parallel, method=method, **options)
+
+
+def fetch_sample_from_pool(pool: ConnectionPool, table: str, sample: str, keyset: bool = False,
+                           columns: List[str] = None, filters: List[Union[str, Tuple[str, str, Any]]] = None,
+                           columnar: bool = False) -> Dict[str, Any]:
+    if not table:
+        raise ValueError("Sampling requires a table")
+    if keyset:
+        raise ValueError("Keyset pagination cannot be combined with sampling")
+    size, percent = parse_sample(sample)
+    with pool.connection() as db:
+        options = fetch_options(db, columns=columns, filters=filters)
+        result = db.fetch_sample(table, size, percent, **options)
+    if columnar:
+        result['data'] = rows_to_arrow(result['data'])
+    return {table: result}
+
+
+def fetch_tables_concurrently(pool: ConnectionPool, tables: List[str], page: int, page_size: int, parallel: int,
+                              method: str = 'fetch_data', **options) -> Dict[str, Any]:
+    """
+    Fetches tables with a bounded pool of workers, each on its own pooled connection.
+
+    Results keep the order of tables. A table that fails to fetch is reported with an
+    'error' entry instead of aborting the other tables.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    def fetch(table_name: str) -> Dict[str, Any]:
+        with pool.connection() as worker_db:
+            return getattr(worker_db, method)(table_name, page, page_size, **options)
+
+    with ThreadPoolExecutor(max_workers=parallel) as executor:
+        # Workers run in a copy of the caller's context so they report to the same --timings
+        futures = [(table_name, executor.submit(contextvars.copy_context().run, fetch, table_name))
+                   for table_name in tables]
+
+    result = {}
+    for table_name, future in futures:
+        try:
+            result[table_name] = future.result()
+        except Exception as e:
+            logger.error(f"Failed to fetch table '{table_name}': {e}")
+            result[table_name] = table_error(page, e)
+    return result
+
+
+def fetch_connections_concurrently(names: List[str], fetch: Callable[[str], Dict[str, Any]], parallel: int = 8,
+                                   timeout: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Calls fetch(name) for each connection name, at most parallel at a time, and returns the
+    results by name in the order of names.
+
+    A call that raises is returned as its exception instead of aborting the others. timeout
+    bounds the whole command: every connection without a result timeout seconds after the
+    call started, whether it is still running or still queued behind the worker limit, is
+    returned as a TimeoutError. Calls run in daemon threads, so a call that timed out is
+    abandoned rather than waited for, its late result is dropped and queued calls that had
+    not started are skipped.
+    """
+    slots = threading.BoundedSemaphore(parallel)
+    condition = threading.Condition()
+    finished = threading.Event()
+    results = {}
+    deadline = monotonic() + timeout if timeout is not None else None
+
+    def run(name: str) -> None:
+        with slots:
+            if finished.is_set():
+                return
+            try:
+                value = fetch(name)
+            except Exception as e:
+                logger.error(f"Failed to fetch from connection '{name}': {e}")
+                value = e
+            with condition:
+                # A connection that already timed out keeps its TimeoutError
+                results.setdefault(name, value)
+                condition.notify_all()
+
+    for name in names:
+        # Each thread runs in a copy of the caller's context so it reports to the same --timings
+        threading.Thread(target=contextvars.copy_context().run, args=(run, name), daemon=True).start()
+
+    with condition:
+        while any(name not in results for name in names):
+            remaining = deadline - monotonic() if deadline is not None else None
+            if remaining is not None and remaining <= 0:
+                for name in names:
+                    results.setdefault(name, TimeoutError(f"No result from '{name}' within {timeout:g} seconds"))
+                break
+            condition.wait(remaining)
+        finished.set()
+        return {name: results[name] for name in names}
+
+
+def label_connection_results(results: Dict[str, Any], page: int = 1, merge: bool = False) -> Dict[str, Any]:
+    """
+    Combines the results of fetch_connections_concurrently into one result.
+
+    Tables are labelled "<connection>/<table>". With merge, the rows of each table are instead
+    concatenated into one table with a leading "_connection" column; connections that failed
+    are listed as separate error entries.
+    """
+    combined = {}
+    merged = {}
+    for name, result in results.items():
+        if isinstance(result, Exception):
+            combined[name] = table_error(page, result)
+            continue
+        for table_name, table_result in result.items():
+            if not merge or table_result.get('error'):
+                combined[f"{name}/{table_name}"] = table_result
+                continue
+            merged.setdefault(table_name, []).append((name, table_result))
+
+    for table_name, parts in merged.items():
+        totals = [table_result['total_rows'] for _, table_result in parts]
+        total_pages = [table_result['total_pages'] for _, table_result in parts]
+        table = {
+            'data': [{'_connection': name, **row} for name, table_result in parts for row in table_result['data']],
+            'page': parts[0][1]['page'],
+            # Page n of the merged table is page n of every connection
+            'total_pages': None if None in total_pages else max(total_pages),
+            'total_rows': None if None in totals else sum(totals),
+            'approximate': any(table_result.get('approximate') for _, table_result in parts)
+        }
+        if parts[0][1].get('sample'):
+            table['sample'] = True
+        combined[table_name] = table
+    return combined
+
+
+def table_error(page: int, error: Exception) -> Dict[str, Any]:
+    return {
+        'data': [],
+        'page': page,
+        'total_pages': None,
+        'total_rows': None,
+        'error': str(error)
+    }
+
+
+def format_result(result: Dict[str, Any], format: str = 'table', scientific: bool = False,
+                  max_col_width: Optional[int] = None) -> Any:
+    if format == 'table':
+        return "\n".join(iter_table_output(result, scientific, max_col_width))
+    # For JSON output, only convert date/time and Decimal types
+    for table_name in result:
+        rows = result[table_name].get('data') or []
+        with phase('format', rows=len(rows)):
+            format_columns(rows, scientific, output_format='json')
+    return result
+
+
+def iter_table_output(result: Dict[str, Any], scientific: bool = False,
+                      max_col_width: Optional[int] = None) -> Iterator[str]:
+    """
+    Formats and renders the tables of a result one line at a time, so output can start before
+    the whole result has been rendered.
+    """
+    for index, table_name in enumerate(result):
+        if index:
+            yield ""  # Add an empty line between tables
+        # Apply formatting to data for table output to adapt with scientific notation
+        rows = result[table_name].get('data') or []
+        with phase('format', rows=len(rows)):
+            format_columns(rows, scientific, output_format='table')
+        yield from iter_table_lines(table_name, result[table_name], max_col_width)
+
+
+def format_columns(rows: List[Dict[str, Any]], scientific: bool, output_format: str) -> None:
+    """
+    Formats rows in place one column at a time, giving the same values as format_value per cell.
+
+    The types present in a column are collected once and a single formatter is picked for the
+    whole column, so columns that need no conversion (e.g. text in JSON output) are skipped.
+    """
+    if not rows:
+        return
+    columns = rows[0].keys()
+    if any(row.keys() != columns for row in rows):
+        # Documents from MongoDB/Firebase may not share the same fields
+        for row in rows:
+            for key in row:
+                row[key] = format_value(row[key], scientific, output_format)
+        return
+
+    for key in list(columns):
+        values = [row[key] for row in rows]
+        types = set(map(type, values))
+        formatter = column_formatter(types, scientific, output_format)
+        if formatter is None:
+            continue
+        if type(None) in types:
+            formatted = [None if value is None else formatter(value) for value in values]
         else:
-            # For JSON output, only convert date/time and Decimal types
-            for table_name in result:
-                for row in result[table_name]['data']:
-                    for key in row:
-                        if isinstance(row[key], (date, time, datetime)):
-                            row[key] = row[key].isoformat()
-                        elif isinstance(row[key], Decimal):
-                            row[key] = float(row[key])
-            return result
-    finally:
-        db.disconnect()
-
-
-def format_as_table(data: Dict[str, Any]) -> str:
+            formatted = list(map(formatter, values))
+        for row, value in zip(rows, formatted):
+            row[key] = value
+
+
+def column_formatter(types: set, scientific: bool, output_format: str):
+    """
+    Returns a function formatting every non-null value of a column with the given value types,
+    or None when the values are left unchanged.
+    """
+    types = types - {type(None)}
+    if not types:
+        return None
+    if all(issubclass(value_type, (date, time)) for value_type in types):
+        return lambda value: value.isoformat()
+    if output_format == 'json':
+        if types == {Decimal}:
+            return float
+        if any(issubclass(value_type, (date, time, Decimal)) for value_type in types):
+            return partial(format_value, scientific=scientific, output_format=output_format)
+        return None
+
+    if len(types) == 1:
+        value_type = next(iter(types))
+        if issubclass(value_type, Decimal):
+            number_formatter = column_formatter({float}, scientific, output_format)
+            return lambda value: number_formatter(float(value))
+        if scientific and issubclass(value_type, (int, float)):
+            return lambda value: f"{value:.6e}"
+        if issubclass(value_type, int):
+            return lambda value: f"{value:,}" if abs(value) >= 1e6 else str(value)
+        if issubclass(value_type, float):
+            return lambda value: f"{value:,.2f}" if abs(value) >= 1e6 else str(value)
+        if issubclass(value_type, (str, bytes)):
+            return None
+    return partial(format_value, scientific=scientific, output_format=output_format)
+
+
+def peep_db(db_type: str, host: str, user: str, password: str, database: str, table: str = None, format: str = 'table', page: int = 1, page_size: int = 100, scientific: bool = False, after: str = None, keyset: bool = False, count: str = 'exact', parallel: int = 1, columns: List[str] = None, filters: List[Union[str, Tuple[str, str, Any]]] = None, sample: Optional[str] = None) -> Any:
+    logger.debug(f"peep_db called with: db_type={db_type}, host={host}, database={database}, table={table}, scientific={scientific}")
+    result = fetch_results(db_type, host, user, password, database, table, page=page, page_size=page_size,
+                           after=after, keyset=keyset, count=count, parallel=parallel, columns=columns,
+                           filters=filters, sample=sample)
+    return format_result(result, format, scientific)
+
+
+async def async_fetch_results(db_type: str, host: str, user: str, password: str, database: str, table: str = None,
+                              page: int = 1, page_size: int = 100, count: str = 'exact', concurrency: int = 4,
+                              columns: List[str] = None,
+                              filters: List[Union[str, Tuple[str, str, Any]]] = None) -> Dict[str, Any]:
+    """
+    asyncio version of fetch_results using the native async drivers.
+
+    When all tables are fetched, up to concurrency tables are fetched at the same time on one
+    event loop. Results keep the order of the tables, and a table that fails to fetch is
+    reported with an 'error' entry. Keyset pagination is not available.
+    """
+    import asyncio
+
+    backend = get_async_backend(db_type)
+    async with backend(host, user, password, database, max_connections=concurrency) as db:
+        options = fetch_options(db, count=count, columns=columns, filters=filters)
+        if table:
+            return {table: await db.fetch_data(table, page, page_size, **options)}
+        tables = await db.fetch_tables()
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def fetch(table_name: str) -> Dict[str, Any]:
+            async with semaphore:
+                return await db.fetch_data(table_name, page, page_size, **options)
+
+        results = await asyncio.gather(*(fetch(table_name) for table_name in tables), return_exceptions=True)
+
+    result = {}
+    for table_name, table_result in zip(tables, results):
+        if isinstance(table_result, Exception):
+            logger.error(f"Failed to fetch table '{table_name}': {table_result}")
+            table_result = table_error(page, table_result)
+        result[table_name] = table_result
+    return result
+
+
+async def async_peep_db(db_type: str, host: str, user: str, password: str, database: str, table: str = None,
+                        format: str = 'table', page: int = 1, page_size: int = 100, scientific: bool = False,
+                        count: str = 'exact', concurrency: int = 4, columns: List[str] = None,
+                        filters: List[Union[str, Tuple[str, str, Any]]] = None) -> Any:
+    """
+    asyncio version of peep_db, for embedding peepdb in async applications.
+    """
+    result = await async_fetch_results(db_type, host, user, password, database, table, page=page,
+                                       page_size=page_size, count=count, concurrency=concurrency,
+                                       columns=columns, filters=filters)
+    return format_result(result, format, scientific)
+
+
+def format_as_table(data: Dict[str, Any], max_col_width: Optional[int] = None) -> str:
     formatted_result = []
     for table_name, table_data in data.items():
-        formatted_result.append(f"Table: {table_name}")
-        if table_data['data']:
-            headers = table_data['data'][0].keys()
-            table_rows = [list(row.values()) for row in table_data['data']]
-            formatted_result.append(tabulate(table_rows, headers=headers, tablefmt='grid'))
-        else:
-            formatted_result.append("No data")
-        formatted_result.append(
-            f"Page {table_data['page']} of {table_data['total_pages']} (Total rows: {table_data['total_rows']})")
+        formatted_result.extend(iter_table_lines(table_name, table_data, max_col_width))
         formatted_result.append("")  # Add an empty line between tables
     return "\n".join(formatted_result).strip()
 
 
+def iter_table_lines(table_name: str, table_data: Dict[str, Any], max_col_width: Optional[int] = None) -> Iterator[str]:
+    yield f"Table: {table_name}"
+    if table_data.get('error'):
+        yield f"Error: {table_data['error']}"
+        return
+    if table_data['data']:
+        yield from render_grid(table_data['data'], max_col_width)
+    else:
+        yield "No data"
+    yield format_page_info(table_data)
+
+
+def format_page_info(table_data: Dict[str, Any]) -> str:
+    total_rows = table_data['total_rows']
+    total_pages = table_data['total_pages']
+    if total_rows is None:
+        total = "Total rows: unknown"
+        total_pages = "?"
+    elif table_data.get('approximate'):
+        total = f"Estimated total rows: ~{total_rows}"
+        total_pages = f"~{total_pages}"
+    else:
+        total = f"Total rows: {total_rows}"
+
+    if table_data.get('sample'):
+        return f"Random sample of {len(table_data['data'])} rows ({total})"
+    if table_data['page'] is None:
+        # Keyset pages have no page number, only a cursor to the next page
+        return f"Showing {len(table_data['data'])} rows ({total})"
+    return f"Page {table_data['page']} of {total_pages} ({total})"
+
+
 def format_value(value, scientific: bool, output_format: str):
     if isinstance(value, (date, time, datetime)):
         return value.isoformat()
@@ -0,0 +1,103 @@
+import logging
+import os
+import threading
+from functools import partial
+from typing import Any, Dict, Optional
+
+from .config import CONFIG_DIR, get_connection
+from .core import CustomEncoder, connect_to_database, fetch_from_pool, with_metadata
+from .ipc import create_server, send_request
+from .metadata import MetadataCache
+from .pool import ConnectionPool
+
+logger = logging.getLogger(__name__)
+
+SOCKET_PATH = os.path.join(CONFIG_DIR, "peepdb.sock")
+# Arguments of fetch_from_pool that clients may send with a 'view' request
+VIEW_ARGUMENTS = {'table', 'page', 'page_size', 'after', 'keyset', 'count', 'parallel', 'columns', 'filters',
+                  'sample'}
+
+
+def request_daemon(payload: Dict[str, Any], socket_path: str = SOCKET_PATH) -> Optional[Any]:
+    """
+    Sends a request to a running peepdb daemon and returns its result, or None when no daemon is running.
+    """
+    return send_request(socket_path, payload)
+
+
+class PeepDBDaemon:
+    """
+    Keeps warm connection pools per saved connection name and serves requests over a Unix socket.
+    """
+
+    def __init__(self, socket_path: str = SOCKET_PATH, max_size: int = 4, idle_timeout: float = 300,
+                 health_check_interval: float = 30):
+        self.socket_path = socket_path
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.health_check_interval = health_check_interval
+        self.pools: Dict[str, ConnectionPool] = {}
+        self.metadata: Dict[str, MetadataCache] = {}
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._server = None
+
+    def get_pool(self, connection_name: str) -> ConnectionPool:
+        with self._lock:
+            if connection_name not in self.pools:
+                connection = get_connection(connection_name)
+                if not connection:
+                    raise ValueError(f"No saved connection found with name '{connection_name}'.")
+                self.metadata[connection_name] = MetadataCache(connection_name)
+                self.pools[connection_name] = ConnectionPool(
+                    partial(with_metadata, partial(connect_to_database, *connection), self.metadata[connection_name]),
+                    max_size=self.max_size,
+                    idle_timeout=self.idle_timeout,
+                    health_check_interval=self.health_check_interval
+                )
+            return self.pools[connection_name]
+
+    def handle(self, request: Dict[str, Any]) -> Any:
+        action = request.get('action')
+        if action == 'ping':
+            return {'pid': os.getpid()}
+        elif action == 'status':
+            with self._lock:
+                return {name: pool.stats() for name, pool in self.pools.items()}
+        elif action == 'view':
+            pool = self.get_pool(request['connection'])
+            arguments = {key: value for key, value in request.items() if key in VIEW_ARGUMENTS}
+            arguments['parallel'] = min(arguments.get('parallel', 1), self.max_size)
+            return fetch_from_pool(pool, metadata=self.metadata[request['connection']], **arguments)
+        raise ValueError(f"Unknown daemon action: {action}")
+
+    def _evict_idle_connections(self) -> None:
+        interval = max(1.0, min(self.idle_timeout, 60) / 2)
+        while not self._stopped.wait(interval):
+            with self._lock:
+                pools = list(self.pools.items())
+            for name, pool in pools:
+                evicted = pool.evict_idle()
+                if evicted:
+                    logger.info(f"Closed {evicted} idle connection(s) for '{name}'")
+
+    def serve_forever(self) -> None:
+        # Only the owner can reach the socket, the daemon holds decrypted credentials
+        self._server = create_server(self.socket_path, self.handle, encoder=CustomEncoder)
+        threading.Thread(target=self._evict_idle_connections, daemon=True).start()
+        logger.info(f"peepdb daemon listening on {self.socket_path}")
+        try:
+            self._server.serve_forever()
+        finally:
+            self._stopped.set()
+            self._server.server_close()
+            if os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+            with self._lock:
+                for pool in self.pools.values():
+                    pool.close()
+                self.pools.clear()
+
+    def shutdown(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
@@ -1,6 +1,52 @@
-from .mysql import MySQLDatabase
-from .postgresql import PostgreSQLDatabase
-from .mariadb import MariaDBDatabase
-from .mongodb import MongoDBDatabase
-from .sqlite import SQLiteDatabase
-from .firebase import FirebaseDatabase
\ No newline at end of file
+import importlib
+import sys
+
+# Maps each db_type to the module and class of its backend. Backend modules import their
+# driver (mysql.connector, psycopg2, pymongo, firebase_admin, ...) at import time, so they
+# are only imported when first used.
+BACKENDS = {
+    'mysql': ('.mysql', 'MySQLDatabase'),
+    'postgres': ('.postgresql', 'PostgreSQLDatabase'),
+    'mariadb': ('.mariadb', 'MariaDBDatabase'),
+    'mongodb': ('.mongodb', 'MongoDBDatabase'),
+    'sqlite': ('.sqlite', 'SQLiteDatabase'),
+    'firebase': ('.firebase', 'FirebaseDatabase'),
+}
+# asyncio backends on native async drivers (asyncpg, aiomysql, motor, aiosqlite)
+ASYNC_BACKENDS = {
+    'mysql': ('.async_mysql', 'AsyncMySQLDatabase'),
+    'postgres': ('.async_postgresql', 'AsyncPostgreSQLDatabase'),
+    'mariadb': ('.async_mysql', 'AsyncMariaDBDatabase'),
+    'mongodb': ('.async_mongodb', 'AsyncMongoDBDatabase'),
+    'sqlite': ('.async_sqlite', 'AsyncSQLiteDatabase'),
+}
+_BACKEND_MODULES = {class_name: module for module, class_name in [*BACKENDS.values(), *ASYNC_BACKENDS.values()]}
+
+__all__ = list(_BACKEND_MODULES) + ['ASYNC_BACKENDS', 'BACKENDS', 'get_async_backend', 'get_backend']
+
+
+def __getattr__(name):
+    if name in _BACKEND_MODULES:
+        backend = getattr(importlib.import_module(_BACKEND_MODULES[name], __name__), name)
+        globals()[name] = backend
+        return backend
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def get_backend(db_type: str):
+    """
+    Returns the backend class for a database type, importing its driver on first use.
+    """
+    if db_type not in BACKENDS:
+        raise ValueError("Unsupported database type")
+    # Looked up on the module so that patched backends are honoured
+    return getattr(sys.modules[__name__], BACKENDS[db_type][1])
+
+
+def get_async_backend(db_type: str):
+    """
+    Returns the asyncio backend class for a database type, importing its driver on first use.
+    """
+    if db_type not in ASYNC_BACKENDS:
+        raise ValueError(f"Asynchronous access is not supported for database type '{db_type}'")
+    return getattr(sys.modules[__name__], ASYNC_BACKENDS[db_type][1])
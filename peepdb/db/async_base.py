@@ -0,0 +1,88 @@
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from typing import List, Dict, Any, Optional, Tuple
+from .base import QueryBuilder
+
+
+class AsyncBaseDatabase(QueryBuilder, ABC):
+    """
+    asyncio counterpart of BaseDatabase for native async drivers.
+
+    Backends keep a pool of up to max_connections connections, so several fetch_data calls can
+    run concurrently on one instance. Pagination is offset based; keyset pagination, streaming
+    and the metadata cache are only available through the synchronous backends.
+    """
+
+    def __init__(self, host: str, user: str, password: str, database: str, port: int = None,
+                 max_connections: int = 4, **kwargs):
+        self.host = host
+        self.user = user
+        self.password = password
+        self.database = database
+        self.port = port
+        self.max_connections = max_connections
+        self.extra_params = kwargs
+        self.pool = None
+        self.connection = None
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+    @abstractmethod
+    async def connect(self) -> None:
+        pass
+
+    @abstractmethod
+    async def disconnect(self) -> None:
+        pass
+
+    @abstractmethod
+    async def fetch_tables(self) -> List[str]:
+        pass
+
+    @abstractmethod
+    async def _query(self, sql: str, params: Optional[List[Any]] = None) -> List[Dict[str, Any]]:
+        """
+        Runs a query on a pooled connection and returns its rows as dicts.
+        """
+        pass
+
+    def _table_sql(self, table: str) -> str:
+        return table
+
+    async def count_rows(self, table: str, count: str = 'exact',
+                         filters: Optional[List[Tuple[str, str, Any]]] = None) -> Tuple[Optional[int], bool]:
+        """
+        Same as BaseDatabase.count_rows.
+        """
+        if count == 'none' or (count == 'estimate' and filters):
+            return None, False
+        if count == 'estimate':
+            return await self._count_estimate(table), True
+        where, params = self._where_sql(filters)
+        rows = await self._query(f"SELECT COUNT(*) AS total FROM {self._table_sql(table)}{where}", params)
+        return rows[0]['total'], False
+
+    async def _count_estimate(self, table: str) -> Optional[int]:
+        # Backends without planner statistics fall back to an exact count
+        total, _ = await self.count_rows(table)
+        return total
+
+    async def fetch_data(self, table: str, page: int = 1, page_size: int = 100, count: str = 'exact',
+                         columns: Optional[List[str]] = None,
+                         filters: Optional[List[Tuple[str, str, Any]]] = None) -> Dict[str, Any]:
+        offset = (page - 1) * page_size
+        where, params = self._where_sql(filters)
+        query = f"{self._select_sql(self._table_sql(table), columns)}{where} LIMIT {page_size} OFFSET {offset}"
+        # The page and its row count are read on two pooled connections at the same time
+        rows, (total_rows, approximate) = await asyncio.gather(
+            self._query(query, params),
+            self.count_rows(table, count, filters)
+        )
+        return self._page_result(rows, page, page_size, total_rows, approximate)
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.disconnect()
@@ -0,0 +1,91 @@
+import asyncio
+import pymongo.errors
+from motor.motor_asyncio import AsyncIOMotorClient
+from .async_base import AsyncBaseDatabase
+from .mongodb import MongoDBDatabase
+import typing as t
+from urllib.parse import quote_plus
+
+
+class AsyncMongoDBDatabase(AsyncBaseDatabase):
+    async def connect(self) -> None:
+        try:
+            user = quote_plus(self.user)
+            pwd = quote_plus(self.password)
+            port = self.port or 27017
+            mongo_uri = "mongodb://{}:{}@{}:{}/{}".format(
+                user, pwd, self.host, port, self.database
+            )
+
+            if self.extra_params:
+                params = '&'.join(
+                    [f"{k}={v}" for k, v in self.extra_params.items()]
+                )
+
+                mongo_uri = f"{mongo_uri}?{params}"
+
+            self.connection = AsyncIOMotorClient(
+                mongo_uri,
+                maxPoolSize=self.max_connections
+            )
+            self.db = self.connection[self.database]
+            self.logger.info(f"Connected to MongoDB database: {self.database}")
+        except pymongo.errors.PyMongoError as e:
+            self.logger.error(f"Error connecting to MongoDB database: {e}")
+            raise
+
+    async def disconnect(self) -> None:
+        if self.connection:
+            self.connection.close()
+            self.logger.info(
+                f"Disconnected from MongoDB database: {self.database}"
+            )
+
+    async def _query(
+        self,
+        sql: str,
+        params: t.Optional[t.List[t.Any]] = None
+    ) -> t.List[t.Dict[str, t.Any]]:
+        raise NotImplementedError("MongoDB does not run SQL queries")
+
+    async def fetch_tables(self) -> t.List[str]:
+        return await self.db.list_collection_names()
+
+    async def count_rows(
+        self,
+        table: str,
+        count: str = 'exact',
+        filters: t.Optional[t.List[t.Tuple[str, str, t.Any]]] = None
+    ) -> t.Tuple[t.Optional[int], bool]:
+        if count == 'none' or (count == 'estimate' and filters):
+            return None, False
+        collection = self.db[table]
+        if count == 'estimate':
+            return await collection.estimated_document_count(), True
+        filter_document = MongoDBDatabase._filter_document(filters)
+        return await collection.count_documents(filter_document), False
+
+    async def fetch_data(
+        self,
+        table: str,
+        page: int = 1,
+        page_size: int = 100,
+        count: str = 'exact',
+        columns: t.Optional[t.List[str]] = None,
+        filters: t.Optional[t.List[t.Tuple[str, str, t.Any]]] = None
+    ) -> t.Dict[str, t.Any]:
+        """
+        Fetches one page of documents and counts them concurrently.
+        """
+        offset = (page - 1) * page_size
+        cursor = self.db[table].find(
+            MongoDBDatabase._filter_document(filters),
+            MongoDBDatabase._projection(columns)
+        ).skip(offset).limit(page_size)
+        data, (total_rows, approximate) = await asyncio.gather(
+            cursor.to_list(length=page_size),
+            self.count_rows(table, count, filters)
+        )
+
+        data = [MongoDBDatabase._plain_document(document) for document in data]
+        return self._page_result(data, page, page_size, total_rows, approximate)
@@ -0,0 +1,53 @@
+import aiomysql
+from .async_base import AsyncBaseDatabase
+from typing import List, Dict, Any, Optional
+
+
+class AsyncMySQLDatabase(AsyncBaseDatabase):
+    quote_char = '`'
+
+    async def connect(self) -> None:
+        try:
+            self.pool = await aiomysql.create_pool(
+                host=self.host,
+                user=self.user,
+                password=self.password,
+                db=self.database,
+                port=self.port or 3306,
+                minsize=1,
+                maxsize=self.max_connections,
+                autocommit=True,
+                **self.extra_params
+            )
+            self.logger.info(f"Connected to MySQL database: {self.database}")
+        except (aiomysql.Error, OSError) as e:
+            self.logger.error(f"Error connecting to MySQL database: {e}")
+            raise
+
+    async def disconnect(self) -> None:
+        if self.pool:
+            self.pool.close()
+            await self.pool.wait_closed()
+            self.logger.info(f"Disconnected from MySQL database: {self.database}")
+
+    async def _query(self, sql: str, params: Optional[List[Any]] = None) -> List[Dict[str, Any]]:
+        async with self.pool.acquire() as connection:
+            async with connection.cursor(aiomysql.DictCursor) as cursor:
+                await cursor.execute(sql, params or None)
+                return list(await cursor.fetchall())
+
+    async def fetch_tables(self) -> List[str]:
+        return [list(table.values())[0] for table in await self._query("SHOW TABLES")]
+
+    async def _count_estimate(self, table: str) -> Optional[int]:
+        rows = await self._query(
+            "SELECT TABLE_ROWS FROM information_schema.TABLES "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+            [table]
+        )
+        return rows[0]['TABLE_ROWS'] if rows else None
+
+
+class AsyncMariaDBDatabase(AsyncMySQLDatabase):
+    # MariaDB speaks the MySQL protocol, aiomysql serves both
+    pass
@@ -0,0 +1,83 @@
+import itertools
+import re
+import uuid
+from datetime import date, datetime, time
+from decimal import Decimal
+import asyncpg
+from .async_base import AsyncBaseDatabase
+from typing import List, Dict, Any, Optional
+
+# asyncpg binds parameters with the type PostgreSQL infers for them and does not parse strings into
+# other types, as psycopg2's client-side literals let the server do. Filter values written as
+# strings, e.g. created_at > '2024-01-01', are converted for these parameter types.
+PARAMETER_CONVERTERS = {
+    'date': date.fromisoformat,
+    'timestamp': datetime.fromisoformat,
+    'timestamptz': datetime.fromisoformat,
+    'time': time.fromisoformat,
+    'numeric': Decimal,
+    'uuid': uuid.UUID,
+    'int2': int,
+    'int4': int,
+    'int8': int,
+    'float4': float,
+    'float8': float,
+}
+
+
+class AsyncPostgreSQLDatabase(AsyncBaseDatabase):
+    async def connect(self) -> None:
+        try:
+            self.pool = await asyncpg.create_pool(
+                host=self.host,
+                user=self.user,
+                password=self.password,
+                database=self.database,
+                port=self.port or 5432,
+                min_size=1,
+                max_size=self.max_connections,
+                **self.extra_params
+            )
+            self.logger.info(f"Connected to PostgreSQL database: {self.database}")
+        except (asyncpg.PostgresError, OSError) as e:
+            self.logger.error(f"Error connecting to PostgreSQL database: {e}")
+            raise
+
+    async def disconnect(self) -> None:
+        if self.pool:
+            await self.pool.close()
+            self.logger.info(f"Disconnected from PostgreSQL database: {self.database}")
+
+    async def _query(self, sql: str, params: Optional[List[Any]] = None) -> List[Dict[str, Any]]:
+        # asyncpg uses numbered $1, $2, ... placeholders
+        numbers = itertools.count(1)
+        sql = re.sub(r'%s', lambda _: f"${next(numbers)}", sql)
+        async with self.pool.acquire() as connection:
+            if not params:
+                records = await connection.fetch(sql)
+            else:
+                statement = await connection.prepare(sql)
+                records = await statement.fetch(*[
+                    self._convert_parameter(value, parameter.name)
+                    for value, parameter in zip(params, statement.get_parameters())
+                ])
+        return [dict(record) for record in records]
+
+    @staticmethod
+    def _convert_parameter(value: Any, type_name: str) -> Any:
+        converter = PARAMETER_CONVERTERS.get(type_name)
+        if converter is None or not isinstance(value, str):
+            return value
+        try:
+            return converter(value)
+        except (ValueError, ArithmeticError) as e:
+            raise ValueError(f"Invalid {type_name} value in filter: {value!r}") from e
+
+    async def fetch_tables(self) -> List[str]:
+        rows = await self._query("SELECT table_name FROM information_schema.tables WHERE table_schema = 'public'")
+        return [row['table_name'] for row in rows]
+
+    async def _count_estimate(self, table: str) -> Optional[int]:
+        rows = await self._query("SELECT reltuples::bigint AS estimate FROM pg_class WHERE oid = %s::regclass", [table])
+        # reltuples is -1 for tables that were never vacuumed or analyzed
+        return rows[0]['estimate'] if rows and rows[0]['estimate'] >= 0 else None
@@ -0,0 +1,40 @@
+import os
+import aiosqlite
+from .async_base import AsyncBaseDatabase
+from .sqlite import sqlite_uri
+from typing import List, Dict, Any, Optional
+
+
+class AsyncSQLiteDatabase(AsyncBaseDatabase):
+    placeholder = '?'
+
+    def __init__(self, *args, read_only: bool = True, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.read_only = read_only
+
+    async def connect(self) -> None:
+        try:
+            self.db_path = self.host if self.host.startswith('file:') else os.path.abspath(self.host)
+            # aiosqlite runs the connection on its own thread and queues queries in order
+            self.connection = await aiosqlite.connect(sqlite_uri(self.host, self.read_only), uri=True)
+            self.connection.row_factory = aiosqlite.Row
+            self.logger.info(f"Connected to SQLite database: {self.db_path}")
+        except aiosqlite.Error as e:
+            self.logger.error(f"Error connecting to SQLite database: {e}")
+            raise
+
+    async def disconnect(self) -> None:
+        if self.connection:
+            await self.connection.close()
+            self.logger.info(f"Disconnected from SQLite database: {self.db_path}")
+
+    def _table_sql(self, table: str) -> str:
+        return f"'{table}'"
+
+    async def _query(self, sql: str, params: Optional[List[Any]] = None) -> List[Dict[str, Any]]:
+        async with self.connection.execute(sql, params or []) as cursor:
+            return [dict(row) for row in await cursor.fetchall()]
+
+    async def fetch_tables(self) -> List[str]:
+        rows = await self._query("SELECT name FROM sqlite_master WHERE type='table'")
+        return [row['name'] for row in rows]
@@ -1,8 +1,212 @@
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+import base64
+import json
 import logging
+import random
+import re
+from ..arrow import rows_to_arrow
+from ..timings import instrument_method
+
+FILTER_OPERATORS = ('=', '!=', '<', '<=', '>', '>=')
+FILTER_PATTERN = re.compile(r'^\s*([^\s=!<>]+)\s*(!=|<>|<=|>=|=|<|>)\s*(.*?)\s*$')
+
+# Sampling: rounds of random probes made to replace rows that were hit twice, the number of
+# probes per query (SQLite allows at most 500 parts in a compound SELECT) and the probe key alias
+SAMPLE_PROBE_ROUNDS = 3
+PROBES_PER_QUERY = 250
+PROBE_KEY = '_peepdb_probe_key'
+
+# Backend methods whose calls are recorded by peepdb.timings while timings are recorded
+TIMED_METHODS = ('connect', 'disconnect', 'fetch_tables', 'fetch_data', 'fetch_arrow', 'fetch_sample', 'count_rows',
+                 'fetch_primary_key', 'fetch_columns', 'schema_version')
+
+
+def encode_cursor(key_columns: List[str], values: List[Any]) -> str:
+    """
+    Encodes the key columns and last seen key values of a page into an opaque cursor token.
+    """
+    payload = json.dumps({'k': key_columns, 'v': values}, default=str, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token: str) -> Tuple[List[str], List[Any]]:
+    """
+    Decodes a cursor token produced by encode_cursor back into key columns and values.
+    """
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return payload['k'], payload['v']
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError(f"Invalid pagination cursor: {token}") from e
+
+
+def parse_filter(expression: str) -> Tuple[str, str, Any]:
+    """
+    Parses a filter such as "age >= 30" or "name = 'Alice'" into a (column, operator, value) tuple.
+
+    Quoted values are strings, unquoted values are converted to int, float, bool or None
+    (null) where possible and are strings otherwise.
+    """
+    match = FILTER_PATTERN.match(expression)
+    if not match:
+        raise ValueError(f"Invalid filter: {expression!r}, expected <column> <operator> <value>")
+    column, operator, raw_value = match.groups()
+    operator = '!=' if operator == '<>' else operator
+
+    if len(raw_value) >= 2 and raw_value[0] == raw_value[-1] and raw_value[0] in ('"', "'"):
+        value = raw_value[1:-1]
+    elif raw_value.lower() == 'null':
+        value = None
+    elif raw_value.lower() in ('true', 'false'):
+        value = raw_value.lower() == 'true'
+    else:
+        value = raw_value
+        for convert in (int, float):
+            try:
+                value = convert(raw_value)
+                break
+            except ValueError:
+                pass
+    if value is None and operator not in ('=', '!='):
+        raise ValueError(f"Invalid filter: {expression!r}, null can only be compared with = or !=")
+    return column, operator, value
+
+
+def parse_sample(value: str) -> Tuple[Optional[int], Optional[float]]:
+    """
+    Parses a sample size such as "500" (rows) or "2.5%" (percent of the table) into a
+    (rows, percent) tuple with one of the two set.
+    """
+    text = str(value).strip()
+    try:
+        if text.endswith('%'):
+            percent = float(text[:-1])
+            if 0 < percent <= 100:
+                return None, percent
+        else:
+            rows = int(text)
+            if rows > 0:
+                return rows, None
+    except ValueError:
+        pass
+    raise ValueError(f"Invalid sample size: {value!r}, expected a number of rows or a percentage like 5%")
+
+
+class QueryBuilder:
+    """
+    Builds SQL and page results, shared by the synchronous and asynchronous backends.
+    """
+    quote_char = '"'
+    placeholder = '%s'
+
+    def quote_identifier(self, name: str) -> str:
+        return f"{self.quote_char}{name.replace(self.quote_char, self.quote_char * 2)}{self.quote_char}"
+
+    def _table_sql(self, table: str) -> str:
+        return table
+
+    def _select_sql(self, table_sql: str, columns: Optional[List[str]] = None) -> str:
+        column_sql = ', '.join(self.quote_identifier(column) for column in columns) if columns else '*'
+        return f"SELECT {column_sql} FROM {table_sql}"
+
+    def _where_sql(self, filters: Optional[List[Tuple[str, str, Any]]], condition: str = None,
+                   condition_params: Optional[List[Any]] = None) -> Tuple[str, List[Any]]:
+        """
+        Builds a parameterized WHERE clause from (column, operator, value) filters and an optional
+        extra condition, joined with AND. Returns an empty clause when there is nothing to filter.
+        """
+        conditions = []
+        params = []
+        for column, operator, value in filters or []:
+            if operator not in FILTER_OPERATORS:
+                raise ValueError(f"Unsupported filter operator: {operator}")
+            column_sql = self.quote_identifier(column)
+            if value is None:
+                # Comparing with NULL is never true in SQL
+                conditions.append(f"{column_sql} IS {'NOT ' if operator == '!=' else ''}NULL")
+            else:
+                conditions.append(f"{column_sql} {operator} {self.placeholder}")
+                params.append(value)
+        if condition:
+            conditions.append(condition)
+            params.extend(condition_params or [])
+        if not conditions:
+            return '', params
+        return ' WHERE ' + ' AND '.join(conditions), params
+
+    def _keyset_query(self, table_sql: str, key_columns: List[str], after_values: Optional[List[Any]],
+                      page_size: int, columns: Optional[List[str]] = None,
+                      filters: Optional[List[Tuple[str, str, Any]]] = None) -> Tuple[str, List[Any]]:
+        """
+        Builds a seek query returning the page of rows that follows after_values in key order.
+
+        The key columns are always selected, they are needed for the cursor of the next page.
+        """
+        key_sql = ', '.join(self.quote_identifier(column) for column in key_columns)
+        condition = None
+        if after_values is not None:
+            placeholders = ', '.join([self.placeholder] * len(key_columns))
+            condition = f"({key_sql}) > ({placeholders})"
+        if columns:
+            columns = list(columns) + [column for column in key_columns if column not in columns]
+        where, params = self._where_sql(filters, condition, list(after_values or []))
+        return f"{self._select_sql(table_sql, columns)}{where} ORDER BY {key_sql} LIMIT {page_size}", params
+
+    def _probe_query(self, table_sql: str, key_column: str, probes: List[Any], columns: Optional[List[str]] = None,
+                     filters: Optional[List[Tuple[str, str, Any]]] = None) -> Tuple[str, List[Any]]:
+        """
+        Builds one query returning, for each probe value, the first row whose key_column is at
+        least that value. Every probe is a single index seek.
+        """
+        key_sql = self.quote_identifier(key_column)
+        column_sql = ', '.join(self.quote_identifier(column) for column in columns) if columns else '*'
+        # The key is selected under its own name, e.g. SQLite's rowid is not part of *
+        select = f"SELECT {column_sql}, {key_sql} AS {self.quote_identifier(PROBE_KEY)} FROM {table_sql}"
+        parts = []
+        params = []
+        for index, probe in enumerate(probes):
+            where, probe_params = self._where_sql(filters, f"{key_sql} >= {self.placeholder}", [probe])
+            # Each probe is wrapped in a derived table, a compound SELECT cannot order its parts
+            parts.append(f"SELECT * FROM ({select}{where} ORDER BY {key_sql} LIMIT 1) AS probe{index}")
+            params.extend(probe_params)
+        return ' UNION ALL '.join(parts), params
+
+    @staticmethod
+    def _page_result(rows: List[Dict[str, Any]], page: Optional[int], page_size: int, total_rows: Optional[int],
+                     approximate: bool = False, **extra) -> Dict[str, Any]:
+        result = {
+            'data': rows,
+            'page': page,
+            'total_pages': None if total_rows is None else (total_rows + page_size - 1) // page_size,
+            'total_rows': total_rows,
+            'approximate': approximate
+        }
+        result.update(extra)
+        return result
+
+    def _keyset_result(self, rows: List[Dict[str, Any]], key_columns: List[str], page_size: int,
+                       total_rows: Optional[int], approximate: bool = False,
+                       columns: Optional[List[str]] = None) -> Dict[str, Any]:
+        next_cursor = None
+        if rows and len(rows) == page_size:
+            last_row = rows[-1]
+            next_cursor = encode_cursor(key_columns, [last_row[column] for column in key_columns])
+        if columns and any(column not in columns for column in key_columns):
+            # Drop key columns that were only selected for the cursor
+            rows = [{column: row[column] for column in columns} for row in rows]
+        return self._page_result(rows, None, page_size, total_rows, approximate, next_cursor=next_cursor)
+
+
+class BaseDatabase(QueryBuilder, ABC):
+    # Whether the backend supports keyset (seek) pagination through fetch_primary_key
+    supports_keyset = False
+    # Optional peepdb.metadata.MetadataCache of the saved connection this backend belongs to
+    metadata = None
+    # Driver errors after which reconnecting and trying again may succeed, e.g. a dropped connection
+    transient_errors: Tuple[type, ...] = (ConnectionError, TimeoutError)
 
-class BaseDatabase(ABC):
     def __init__(self, host: str, user: str, password: str, database: str, port: int = None, **kwargs):
         self.host = host
         self.user = user
@@ -14,6 +218,13 @@ class BaseDatabase(ABC):
         self.cursor = None
         self.logger = logging.getLogger(self.__class__.__name__)
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Instrument the methods each backend defines, so all of them report to --timings
+        for name in TIMED_METHODS:
+            if name in cls.__dict__:
+                setattr(cls, name, instrument_method(name, cls.__dict__[name]))
+
     @abstractmethod
     def connect(self) -> None:
         pass
@@ -28,11 +239,208 @@ class BaseDatabase(ABC):
 
     @abstractmethod
     def fetch_data(self, table: str, page: int = 1, page_size: int = 100) -> Dict[str, Any]:
+        """
+        Returns one page of rows. Backends may also accept columns (a projection) and filters,
+        a list of (column, operator, value) tuples as returned by parse_filter that are combined
+        with AND and evaluated by the database.
+        """
         pass
 
+    def is_transient(self, error: Exception) -> bool:
+        """
+        Returns whether error is worth retrying on a new connection.
+        """
+        return isinstance(error, self.transient_errors)
+
+    def ping(self) -> bool:
+        """
+        Checks that the connection is still usable, e.g. before a pooled connection is reused.
+        """
+        try:
+            self.cursor.execute("SELECT 1")
+            self.cursor.fetchall()
+            return True
+        except Exception as e:
+            self.logger.info(f"Connection health check failed: {e}")
+            return False
+
+    def reset(self) -> None:
+        """
+        Brings the connection back to a clean state before it is returned to a pool.
+        """
+        pass
+
+    def fetch_arrow(self, table: str, page: int = 1, page_size: int = 100, count: str = 'exact',
+                    columns: Optional[List[str]] = None,
+                    filters: Optional[List[Tuple[str, str, Any]]] = None) -> Dict[str, Any]:
+        """
+        Same as fetch_data with page numbers, but 'data' holds the page as a pyarrow.Table, one
+        array per column, instead of a list of dicts. Backends with a native columnar path
+        override this; the default converts the rows of fetch_data.
+        """
+        options = {}
+        if count != 'exact':
+            options['count'] = count
+        if columns:
+            options['columns'] = columns
+        if filters:
+            options['filters'] = filters
+        result = self.fetch_data(table, page, page_size, **options)
+        result['data'] = rows_to_arrow(result['data'])
+        return result
+
+    def fetch_sample(self, table: str, size: Optional[int] = None, percent: Optional[float] = None,
+                     columns: Optional[List[str]] = None,
+                     filters: Optional[List[Tuple[str, str, Any]]] = None) -> Dict[str, Any]:
+        """
+        Returns a random sample of size rows, or of percent of the table, read without scanning
+        the table. The result has the shape of a keyset page with 'sample' set. How random the
+        sample is depends on the backend and is described on its fetch_sample.
+        """
+        raise NotImplementedError(f"Sampling is not supported by {self.__class__.__name__}")
+
+    def _sample_size(self, table: str, size: Optional[int], percent: Optional[float]) -> Tuple[int, Optional[int]]:
+        """
+        Returns the number of rows to sample and the estimated number of rows of the table.
+        """
+        estimate = self.metadata.row_estimate(self, table) if self.metadata else self._count_estimate(table)
+        if size is None:
+            if estimate is None:
+                raise ValueError(f"The size of '{table}' is unknown, sample a number of rows instead of a percentage")
+            size = max(1, round(estimate * percent / 100))
+        return size, estimate
+
+    def _sample_result(self, rows: List[Dict[str, Any]], estimate: Optional[int],
+                       filters: Optional[List[Tuple[str, str, Any]]] = None) -> Dict[str, Any]:
+        # The estimate counts the whole table, for filtered samples the total is unknown
+        total_rows = None if filters else estimate
+        result = self._page_result(rows, None, max(1, len(rows)), total_rows, total_rows is not None, sample=True)
+        result['total_pages'] = None
+        return result
+
+    def _integer_key(self, table: str) -> Optional[str]:
+        """
+        Returns the primary key column when the table has a single-column integer primary key,
+        the only kind of key random probes can be drawn from.
+        """
+        key_columns = self.metadata.primary_key(self, table) if self.metadata else self.fetch_primary_key(table)
+        if len(key_columns) != 1:
+            return None
+        columns = dict(self.metadata.columns(self, table) if self.metadata else self.fetch_columns(table))
+        column_type = str(columns.get(key_columns[0], '')).lower()
+        return key_columns[0] if re.match(r'(tiny|small|medium|big)?int', column_type) else None
+
+    def _fetch_dicts(self) -> List[Dict[str, Any]]:
+        # Backends whose cursor returns tuples build the dicts themselves
+        return [dict(row) for row in self.cursor.fetchall()]
+
+    def _probe_sample(self, table_sql: str, key_column: str, low: int, high: int, size: int,
+                      columns: Optional[List[str]] = None,
+                      filters: Optional[List[Tuple[str, str, Any]]] = None) -> List[Dict[str, Any]]:
+        """
+        Samples up to size rows by seeking to random values of an integer key between low and
+        high. Each row costs one index seek, so the time does not depend on the size of the
+        table. Rows that follow a gap in the key values are proportionally more likely to be
+        picked; rows picked twice are replaced by new probes a few times.
+        """
+        rows = {}
+        for _ in range(SAMPLE_PROBE_ROUNDS):
+            missing = size - len(rows)
+            if missing <= 0:
+                break
+            probes = [random.randint(low, high) for _ in range(missing)]
+            for start in range(0, len(probes), PROBES_PER_QUERY):
+                query, params = self._probe_query(table_sql, key_column, probes[start:start + PROBES_PER_QUERY],
+                                                  columns, filters)
+                self.cursor.execute(query, params)
+                for row in self._fetch_dicts():
+                    rows.setdefault(row.pop(PROBE_KEY), row)
+        return list(rows.values())[:size]
+
+    def stream_rows(self, table: str, batch_size: int = 1000) -> Iterator[Dict[str, Any]]:
+        """
+        Yields every row of a table while holding at most batch_size rows in memory.
+        """
+        raise NotImplementedError(f"Streaming is not supported by {self.__class__.__name__}")
+
+    def partition_splits(self, table: str, partitions: int) -> Tuple[str, List[Any]]:
+        """
+        Returns a key column and up to partitions - 1 ascending split values, which divide the
+        table into disjoint key ranges: below the first split, between two splits and from the
+        last split on. The default splits the range between MIN and MAX of a single-column
+        integer primary key evenly.
+        """
+        if not self.supports_keyset:
+            raise ValueError(f"Partitioning is not supported by {self.__class__.__name__}")
+        key_column = self._integer_key(table)
+        if key_column is None:
+            raise ValueError(f"Table '{table}' has no single-column integer primary key to partition by")
+        key_sql = self.quote_identifier(key_column)
+        self.cursor.execute(f"SELECT MIN({key_sql}) AS low, MAX({key_sql}) AS high FROM {self._table_sql(table)}")
+        bounds = self._fetch_dicts()[0]
+        if bounds['low'] is None:
+            return key_column, []
+        low, span = bounds['low'], bounds['high'] - bounds['low'] + 1
+        splits = {low + span * index // partitions for index in range(1, partitions)}
+        return key_column, sorted(split for split in splits if split > low)
+
+    def fetch_primary_key(self, table: str) -> List[str]:
+        """
+        Returns the columns of the primary key, or of the first unique index, of a table.
+        """
+        raise NotImplementedError(f"Keyset pagination is not supported by {self.__class__.__name__}")
+
+    def fetch_columns(self, table: str) -> List[Tuple[str, str]]:
+        """
+        Returns the (name, type) of each column of a table, in table order.
+        """
+        raise NotImplementedError(f"Column information is not supported by {self.__class__.__name__}")
+
+    def schema_version(self) -> Optional[str]:
+        """
+        Returns a token that is cheap to query and changes when tables are created, altered or
+        dropped, used to invalidate cached metadata. None when the backend has no such token.
+        """
+        return None
+
+    def _resolve_keyset(self, table: str, after: Optional[str]) -> Tuple[List[str], Optional[List[Any]]]:
+        if after:
+            return decode_cursor(after)
+        key_columns = self.metadata.primary_key(self, table) if self.metadata else self.fetch_primary_key(table)
+        if not key_columns:
+            raise ValueError(f"Table '{table}' has no primary key or unique index; keyset pagination is unavailable")
+        return key_columns, None
+
+    def count_rows(self, table: str, count: str = 'exact',
+                   filters: Optional[List[Tuple[str, str, Any]]] = None) -> Tuple[Optional[int], bool]:
+        """
+        Returns the total number of rows of a table and whether that number is an estimate.
+
+        count is one of 'exact', 'estimate' (planner statistics, no table scan) or 'none'
+        (skip counting). A total of None means the row count is unknown. Only exact counts take
+        filters into account, an estimate for filtered rows is unknown.
+        """
+        if count == 'none' or (count == 'estimate' and filters):
+            return None, False
+        if count == 'estimate':
+            estimate = self.metadata.row_estimate(self, table) if self.metadata else self._count_estimate(table)
+            return estimate, True
+        return self._count_exact(table, filters), False
+
+    def _count_exact(self, table: str, filters: Optional[List[Tuple[str, str, Any]]] = None) -> int:
+        raise NotImplementedError(f"Row counting is not supported by {self.__class__.__name__}")
+
+    def _count_estimate(self, table: str) -> Optional[int]:
+        # Backends without planner statistics fall back to an exact count
+        return self._count_exact(table)
+
     def __enter__(self):
         self.connect()
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        self.disconnect()
\ No newline at end of file
+        self.disconnect()
+
+
+# Shared by the SQL backends, which do not define their own count_rows
+BaseDatabase.count_rows = instrument_method('count_rows', BaseDatabase.count_rows)
@@ -1,23 +1,101 @@
 import firebase_admin
 from firebase_admin import credentials, firestore
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 from .base import BaseDatabase
+from ..config import CONFIG_DIR
+import json
 import logging
+import os
+import threading
+import time
 
 logger = logging.getLogger(__name__)
 
+PAGE_CURSORS_FILE = os.path.join(CONFIG_DIR, "firebase_cursors.json")
+# Seconds after which a remembered page boundary is no longer trusted
+PAGE_CURSORS_TTL = 10 * 60
+# Serializes creating apps, so two threads connecting with the same credentials share one app
+_apps_lock = threading.Lock()
+FIRESTORE_OPERATORS = {'=': '==', '!=': '!=', '<': '<', '<=': '<=', '>': '>', '>=': '>='}
+
+
+class PageCursorCache:
+    """
+    Remembers the first and last document id of pages that were already read.
+
+    An adjacent page can then be read with a start_after cursor instead of an offset, which
+    Firestore bills as if every skipped document had been read. Entries are persisted because
+    every 'peepdb view' invocation runs in its own process, and ignored after ttl seconds, since
+    documents added or deleted since then shift the page boundaries.
+    """
+    max_pages = 1000
+
+    def __init__(self, path: str = PAGE_CURSORS_FILE, ttl: float = PAGE_CURSORS_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._entries = None
+
+    def _load(self) -> Dict[str, Dict[str, List[Any]]]:
+        if self._entries is None:
+            try:
+                with open(self.path, "r") as f:
+                    self._entries = json.load(f)
+            except (OSError, ValueError):
+                self._entries = {}
+        return self._entries
+
+    def get(self, key: str, page: int) -> Optional[Tuple[str, str]]:
+        bounds = self._load().get(key, {}).get(str(page))
+        # Entries without a store time were written before cursors expired
+        if not bounds or len(bounds) < 3 or time.time() - bounds[2] > self.ttl:
+            return None
+        return bounds[0], bounds[1]
+
+    def nearest_before(self, key: str, page: int) -> Tuple[int, Optional[str]]:
+        """
+        Returns the closest cached page before page and the id of its last document, or (0, None).
+        """
+        pages = [int(cached_page) for cached_page in self._load().get(key, {})
+                 if int(cached_page) < page and self.get(key, int(cached_page))]
+        if not pages:
+            return 0, None
+        nearest = max(pages)
+        return nearest, self.get(key, nearest)[1]
+
+    def put(self, key: str, page: int, first_id: str, last_id: str) -> None:
+        pages = self._load().setdefault(key, {})
+        pages.pop(str(page), None)
+        pages[str(page)] = [first_id, last_id, time.time()]
+        while len(pages) > self.max_pages:
+            del pages[next(iter(pages))]
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path + ".tmp", "w") as f:
+                json.dump(self._entries, f)
+            os.replace(self.path + ".tmp", self.path)
+        except OSError as e:
+            logger.warning(f"Could not save Firestore page cursors: {e}")
+
+
 class FirebaseDatabase(BaseDatabase):
     def __init__(self, service_account_path: str, **kwargs):
+        super().__init__(service_account_path, None, None, None, **kwargs)
         self.service_account_path = service_account_path
-        self.kwargs = kwargs
         self.db = None
+        self.page_cursors = PageCursorCache()
 
     def connect(self):
         try:
-            # Initialize Firebase Admin SDK
-            cred = credentials.Certificate(self.service_account_path)
-            firebase_admin.initialize_app(cred)
-            self.db = firestore.client()
+            # One app per service account, named after its path, so connections to different
+            # projects in the same process (daemon, --connections) do not share credentials
+            name = os.path.abspath(self.service_account_path)
+            with _apps_lock:
+                try:
+                    app = firebase_admin.get_app(name)
+                except ValueError:
+                    cred = credentials.Certificate(self.service_account_path)
+                    app = firebase_admin.initialize_app(cred, name=name)
+            self.db = firestore.client(app)
             logger.debug("Connected to Firebase Firestore")
         except Exception as e:
             logger.error(f"Failed to connect to Firebase: {e}")
@@ -27,6 +105,10 @@ class FirebaseDatabase(BaseDatabase):
         # Firebase Admin SDK does not provide a disconnect method
         pass
 
+    def ping(self) -> bool:
+        # Firestore requests are independent RPCs, there is no session that can go stale
+        return self.db is not None
+
     def fetch_tables(self) -> List[str]:
         try:
             # In Firestore, collections are equivalent to tables
@@ -36,25 +118,78 @@ class FirebaseDatabase(BaseDatabase):
             logger.error(f"Failed to fetch collections: {e}")
             raise e
 
-    def fetch_data(self, table_name: str, page: int = 1, page_size: int = 100) -> Dict[str, Any]:
+    def stream_rows(self, table_name: str, batch_size: int = 1000) -> Iterator[Dict[str, Any]]:
+        # Read the collection one query page at a time so only batch_size documents are held in memory
+        query = self.db.collection(table_name).order_by('__name__').limit(batch_size)
+        last_document = None
+        while True:
+            page_query = query.start_after(last_document) if last_document else query
+            documents = list(page_query.stream())
+            for document in documents:
+                yield document.to_dict()
+            if len(documents) < batch_size:
+                break
+            last_document = documents[-1]
+
+    def _query(self, table_name: str, columns: Optional[List[str]] = None,
+               filters: Optional[List[Tuple[str, str, Any]]] = None):
+        query = self.db.collection(table_name)
+        for column, operator, value in filters or []:
+            query = query.where(filter=firestore.FieldFilter(column, FIRESTORE_OPERATORS[operator], value))
+        if columns:
+            query = query.select(columns)
+        return query
+
+    def _count_exact(self, table_name: str, filters: Optional[List[Tuple[str, str, Any]]] = None) -> int:
+        # An aggregation query is billed per batch of index entries, not per document
+        result = self._query(table_name, filters=filters).count().get()
+        return result[0][0].value
+
+    def _fetch_page(self, table_name: str, page: int, page_size: int, columns: Optional[List[str]] = None,
+                    filters: Optional[List[Tuple[str, str, Any]]] = None) -> List[Any]:
+        query = self._query(table_name, columns, filters)
+        if any(operator != '=' for _, operator, _ in filters or []):
+            # Firestore orders by inequality fields first, so document id cursors do not apply
+            if page > 1:
+                query = query.offset((page - 1) * page_size)
+            return list(query.limit(page_size).stream())
+
+        cursor_key = f"{self.service_account_path}:{table_name}:{page_size}"
+        if filters:
+            cursor_key += f":{json.dumps(filters, default=str)}"
+        previous_page = self.page_cursors.get(cursor_key, page - 1)
+        next_page = self.page_cursors.get(cursor_key, page + 1)
+
+        if previous_page:
+            query = query.order_by('__name__').start_after({'__name__': previous_page[1]})
+            documents = list(query.limit(page_size).stream())
+        elif next_page:
+            # Read backwards from the first document of the following page
+            query = query.order_by('__name__', direction=firestore.Query.DESCENDING)
+            query = query.start_after({'__name__': next_page[0]})
+            documents = list(query.limit(page_size).stream())[::-1]
+        else:
+            # No adjacent page is known, skip ahead from the nearest page that is
+            nearest_page, last_id = self.page_cursors.nearest_before(cursor_key, page)
+            query = query.order_by('__name__')
+            if last_id:
+                query = query.start_after({'__name__': last_id})
+            skipped = (page - 1 - nearest_page) * page_size
+            if skipped:
+                query = query.offset(skipped)
+            documents = list(query.limit(page_size).stream())
+
+        if documents:
+            self.page_cursors.put(cursor_key, page, documents[0].id, documents[-1].id)
+        return documents
+
+    def fetch_data(self, table_name: str, page: int = 1, page_size: int = 100, count: str = 'exact',
+                   columns: Optional[List[str]] = None,
+                   filters: Optional[List[Tuple[str, str, Any]]] = None) -> Dict[str, Any]:
         try:
-            collection_ref = self.db.collection(table_name)
-            documents = collection_ref.stream()
-            data = [doc.to_dict() for doc in documents]
-
-            # Implement pagination manually
-            total_rows = len(data)
-            total_pages = (total_rows + page_size - 1) // page_size  # Ceiling division
-            start_index = (page - 1) * page_size
-            end_index = start_index + page_size
-            page_data = data[start_index:end_index]
-
-            return {
-                'data': page_data,
-                'page': page,
-                'total_pages': total_pages,
-                'total_rows': total_rows
-            }
+            documents = self._fetch_page(table_name, page, page_size, columns, filters)
+            total_rows, approximate = self.count_rows(table_name, count, filters)
+            return self._page_result([doc.to_dict() for doc in documents], page, page_size, total_rows, approximate)
         except Exception as e:
             logger.error(f"Failed to fetch data from '{table_name}': {e}")
-            raise e
\ No newline at end of file
+            raise e
@@ -1,8 +1,17 @@
 import pymysql
 from .base import BaseDatabase
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+
+# Error numbers after which a new connection may succeed: cannot connect (2002, 2003), server gone
+# or connection lost (2006, 2013), lock wait timeout (1205) and deadlock (1213)
+TRANSIENT_ERRNOS = {2002, 2003, 2006, 2013, 1205, 1213}
 
 class MariaDBDatabase(BaseDatabase):
+    supports_keyset = True
+    # PyMySQL raises InterfaceError when a closed connection is used
+    transient_errors = (pymysql.err.InterfaceError,)
+    quote_char = '`'
+
     def connect(self) -> None:
         try:
             self.connection = pymysql.connect(
@@ -27,21 +36,129 @@ class MariaDBDatabase(BaseDatabase):
             self.connection.close()
             self.logger.info(f"Disconnected from MariaDB database: {self.database}")
 
+    def is_transient(self, error: Exception) -> bool:
+        # OperationalError also covers killed queries and statement timeouts, so go by the error number
+        if isinstance(error, pymysql.err.OperationalError):
+            return bool(error.args) and error.args[0] in TRANSIENT_ERRNOS
+        return super().is_transient(error)
+
+    def reset(self) -> None:
+        # End the implicit transaction, a pooled connection would otherwise keep its REPEATABLE READ
+        # snapshot and show the data as it was when it was first leased
+        self.connection.rollback()
+
     def fetch_tables(self) -> List[str]:
         self.cursor.execute("SHOW TABLES")
         return [list(table.values())[0] for table in self.cursor.fetchall()]
 
-    def fetch_data(self, table: str, page: int = 1, page_size: int = 100) -> Dict[str, Any]:
-        offset = (page - 1) * page_size
-        self.cursor.execute(f"SELECT COUNT(*) as total FROM {table}")
-        total_rows = self.cursor.fetchone()['total']
+    def stream_rows(self, table: str, batch_size: int = 1000) -> Iterator[Dict[str, Any]]:
+        # SSDictCursor is unbuffered: rows stay on the server until fetched
+        cursor = self.connection.cursor(pymysql.cursors.SSDictCursor)
+        try:
+            cursor.execute(f"SELECT * FROM {table}")
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield from rows
+        finally:
+            cursor.close()
+
+    def fetch_primary_key(self, table: str) -> List[str]:
+        self.cursor.execute(
+            "SELECT INDEX_NAME, COLUMN_NAME, NULLABLE FROM information_schema.STATISTICS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND NON_UNIQUE = 0 "
+            "ORDER BY INDEX_NAME = 'PRIMARY' DESC, INDEX_NAME, SEQ_IN_INDEX",
+            (table,)
+        )
+        indexes = {}
+        for row in self.cursor.fetchall():
+            indexes.setdefault(row['INDEX_NAME'], []).append(row)
+        for rows in indexes.values():
+            # A unique index allows several NULLs, and (k) > (NULL) matches nothing, so nullable and
+            # functional (no COLUMN_NAME) indexes would end keyset paging early
+            if all(row['COLUMN_NAME'] and row['NULLABLE'] != 'YES' for row in rows):
+                return [row['COLUMN_NAME'] for row in rows]
+        return []
+
+    def fetch_columns(self, table: str) -> List[Tuple[str, str]]:
+        self.cursor.execute(
+            "SELECT COLUMN_NAME, COLUMN_TYPE FROM information_schema.COLUMNS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s ORDER BY ORDINAL_POSITION",
+            (table,)
+        )
+        return [(row['COLUMN_NAME'], row['COLUMN_TYPE']) for row in self.cursor.fetchall()]
 
-        self.cursor.execute(f"SELECT * FROM {table} LIMIT {page_size} OFFSET {offset}")
+    def schema_version(self) -> Optional[str]:
+        # CREATE_TIME only changes when ALTER TABLE rebuilds a table, not on instant ADD/DROP COLUMN,
+        # so the columns are counted too. UPDATE_TIME and TABLE_ROWS follow writes, which keeps
+        # the cached row estimates current.
+        self.cursor.execute(
+            "SELECT COUNT(*) AS tables, MAX(CREATE_TIME) AS created, MAX(UPDATE_TIME) AS updated, "
+            "SUM(TABLE_ROWS) AS row_estimate, "
+            "(SELECT COUNT(*) FROM information_schema.COLUMNS WHERE TABLE_SCHEMA = DATABASE()) AS column_count "
+            "FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE()"
+        )
+        row = self.cursor.fetchone()
+        return f"{row['tables']}:{row['column_count']}:{row['created']}:{row['updated']}:{row['row_estimate']}"
+
+    def _count_exact(self, table: str, filters: Optional[List[Tuple[str, str, Any]]] = None) -> int:
+        where, params = self._where_sql(filters)
+        self.cursor.execute(f"SELECT COUNT(*) as total FROM {table}{where}", params or None)
+        return self.cursor.fetchone()['total']
+
+    def _count_estimate(self, table: str) -> Optional[int]:
+        self.cursor.execute(
+            "SELECT TABLE_ROWS FROM information_schema.TABLES "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+            (table,)
+        )
+        row = self.cursor.fetchone()
+        return row['TABLE_ROWS'] if row else None
+
+    def fetch_data(self, table: str, page: int = 1, page_size: int = 100, after: str = None,
+                   keyset: bool = False, count: str = 'exact', columns: Optional[List[str]] = None,
+                   filters: Optional[List[Tuple[str, str, Any]]] = None) -> Dict[str, Any]:
+        total_rows, approximate = self.count_rows(table, count, filters)
+
+        if keyset or after:
+            key_columns, after_values = self._resolve_keyset(table, after)
+            query, params = self._keyset_query(table, key_columns, after_values, page_size, columns, filters)
+            self.cursor.execute(query, params or None)
+            return self._keyset_result(self.cursor.fetchall(), key_columns, page_size, total_rows, approximate,
+                                       columns)
+
+        offset = (page - 1) * page_size
+        where, params = self._where_sql(filters)
+        self.cursor.execute(f"{self._select_sql(table, columns)}{where} LIMIT {page_size} OFFSET {offset}",
+                            params or None)
         rows = self.cursor.fetchall()
 
-        return {
-            'data': rows,
-            'page': page,
-            'total_pages': (total_rows + page_size - 1) // page_size,
-            'total_rows': total_rows
-        }
\ No newline at end of file
+        return self._page_result(rows, page, page_size, total_rows, approximate)
+
+    def fetch_sample(self, table: str, size: Optional[int] = None, percent: Optional[float] = None,
+                     columns: Optional[List[str]] = None,
+                     filters: Optional[List[Tuple[str, str, Any]]] = None) -> Dict[str, Any]:
+        """
+        Samples rows by seeking to random values of an integer primary key between its MIN and
+        MAX, one index seek per row. Rows that follow a gap in the key (deleted rows, or rows
+        that do not match the filters) are more likely to be picked. With filters that no index
+        covers, finding the key range reads the table. Tables without a single-column integer
+        primary key fall back to ORDER BY RAND(), which reads the whole table.
+        """
+        size, estimate = self._sample_size(table, size, percent)
+        key_column = self._integer_key(table)
+        if key_column is None:
+            where, params = self._where_sql(filters)
+            self.cursor.execute(f"{self._select_sql(table, columns)}{where} ORDER BY RAND() LIMIT {size}",
+                                params or None)
+            return self._sample_result(self.cursor.fetchall(), estimate, filters)
+        key_sql = self.quote_identifier(key_column)
+        where, params = self._where_sql(filters)
+        self.cursor.execute(f"SELECT MIN({key_sql}) AS low, MAX({key_sql}) AS high FROM {table}{where}",
+                            params or None)
+        bounds = self.cursor.fetchone()
+        if bounds['low'] is None:
+            return self._sample_result([], estimate, filters)
+        rows = self._probe_sample(table, key_column, bounds['low'], bounds['high'], size, columns, filters)
+        return self._sample_result(rows, estimate, filters)
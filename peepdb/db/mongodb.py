@@ -1,11 +1,69 @@
+import json
+import re
+import uuid
+from datetime import datetime
 import pymongo
 import pymongo.errors
-from .base import BaseDatabase
+from bson import Binary, Decimal128, MaxKey, MinKey, ObjectId, Regex, Timestamp, json_util
+from cachetools import TTLCache
+from .base import BaseDatabase, decode_cursor, encode_cursor
+import threading
 import typing as t
 from urllib.parse import quote_plus
 
+MONGO_OPERATORS = {
+    '=': '$eq',
+    '!=': '$ne',
+    '<': '$lt',
+    '<=': '$lte',
+    '>': '$gt',
+    '>=': '$gte'
+}
+
+# Documents sent by the server per round trip, at most one page
+DEFAULT_BATCH_SIZE = 1000
+# _id values sampled per partition to find split values
+PARTITION_SAMPLE_SIZE = 100
+
+# $type aliases of the groups of _id types in BSON sort order. A range condition such as
+# {$gt: value} only matches values in the group of value.
+BSON_TYPE_GROUPS = [
+    ['minKey'], ['null'], ['number'], ['string', 'symbol'], ['object'], ['binData'],
+    ['objectId'], ['bool'], ['date'], ['timestamp'], ['regex'], ['maxKey']
+]
+_BSON_GROUP_TYPES = [
+    (MinKey, 0), (type(None), 1), (bool, 7), ((int, float, Decimal128), 2), (str, 3), (dict, 4),
+    ((bytes, Binary, uuid.UUID), 5), (ObjectId, 6), (datetime, 8), (Timestamp, 9), ((Regex, re.Pattern), 10),
+    (MaxKey, 11)
+]
+
+
+def bson_type_group(value: t.Any) -> int:
+    """
+    Returns the index in BSON_TYPE_GROUPS of the group a value sorts in.
+    """
+    for types, group in _BSON_GROUP_TYPES:
+        if isinstance(value, types):
+            return group
+    raise ValueError(f"Unsupported _id type: {type(value).__name__}")
+
+
+# Exact counts are remembered for a minute per process, count_documents reads every match
+COUNT_CACHE_TTL = 60
+_count_cache = TTLCache(maxsize=256, ttl=COUNT_CACHE_TTL)
+_count_cache_lock = threading.Lock()
+
 
 class MongoDBDatabase(BaseDatabase):
+    # Keyset pages seek past the last _id instead of skipping documents
+    supports_keyset = True
+    # AutoReconnect, NetworkTimeout and server selection timeouts
+    transient_errors = (pymongo.errors.ConnectionFailure,)
+
+    def __init__(self, *args, batch_size: int = DEFAULT_BATCH_SIZE, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.batch_size = batch_size
+
     def connect(self) -> None:
         try:
             user = quote_plus(self.user)
@@ -36,29 +94,200 @@ class MongoDBDatabase(BaseDatabase):
                 f"Disconnected from MongoDB database: {self.database}"
             )
 
+    def ping(self) -> bool:
+        try:
+            self.conection.admin.command('ping')
+            return True
+        except pymongo.errors.PyMongoError as e:
+            self.logger.info(f"Connection health check failed: {e}")
+            return False
+
     def fetch_tables(self) -> t.List[str]:
         return self.db.list_collection_names()
 
+    def stream_rows(
+        self,
+        table: str,
+        batch_size: int = 1000
+    ) -> t.Iterator[t.Dict[str, t.Any]]:
+        """
+        Streams every document of a collection, batch_size documents per getMore.
+        """
+        with self.db[table].find({}, batch_size=batch_size) as cursor:
+            for document in cursor:
+                yield self._plain_document(document)
+
+    @staticmethod
+    def _filter_document(
+        filters: t.Optional[t.List[t.Tuple[str, str, t.Any]]]
+    ) -> t.Dict[str, t.Any]:
+        """
+        Converts (column, operator, value) filters into a MongoDB query document.
+        """
+        conditions = [
+            {column: {MONGO_OPERATORS[operator]: value}}
+            for column, operator, value in filters or []
+        ]
+        if len(conditions) > 1:
+            return {'$and': conditions}
+        return conditions[0] if conditions else {}
+
+    @staticmethod
+    def _projection(
+        columns: t.Optional[t.List[str]]
+    ) -> t.Optional[t.Dict[str, int]]:
+        if not columns:
+            return None
+        projection = {column: 1 for column in columns}
+        # _id is returned unless it is excluded explicitly
+        projection.setdefault('_id', 0)
+        return projection
+
+    def _count_exact(
+        self,
+        table: str,
+        filters: t.Optional[t.List[t.Tuple[str, str, t.Any]]] = None
+    ) -> int:
+        # The metadata count (estimated_document_count) can drift after an unclean shutdown or
+        # on sharded clusters, so it is only used for --count estimate
+        collection = self.db[table]
+        document = self._filter_document(filters)
+        key = (self.host, self.database, table, json.dumps(document, sort_keys=True, default=str))
+        with _count_cache_lock:
+            total = _count_cache.get(key)
+        if total is None:
+            total = collection.count_documents(document)
+            with _count_cache_lock:
+                _count_cache[key] = total
+        return total
+
+    def _count_estimate(self, table: str) -> t.Optional[int]:
+        return self.db[table].estimated_document_count()
+
+    @staticmethod
+    def _cursor_value(value: t.Any) -> t.Any:
+        # Extended JSON, so ObjectIds, dates etc. are restored with their type and not compared as strings
+        return json.loads(json_util.dumps(value))
+
+    @staticmethod
+    def _plain_document(document: t.Dict[str, t.Any]) -> t.Dict[str, t.Any]:
+        """
+        Converts ObjectId fields to strings once, here, so renderers and JSON encoders receive
+        plain values and do not fall back to converting them cell by cell.
+        """
+        for key, value in document.items():
+            if type(value) is ObjectId:
+                document[key] = str(value)
+        return document
+
     def fetch_data(
         self,
         table: str,
         page: int = 1,
-        page_size: int = 100
+        page_size: int = 100,
+        after: t.Optional[str] = None,
+        keyset: bool = False,
+        count: str = 'exact',
+        columns: t.Optional[t.List[str]] = None,
+        filters: t.Optional[t.List[t.Tuple[str, str, t.Any]]] = None
     ) -> t.Dict[str, t.Any]:
         """
         Fetches data from the MongoDB database.
+
+        Keyset pages (keyset or after) are read with {_id: {$gt: last _id}} sorted on _id, an
+        index seek that costs the same for every page; page numbers skip documents on the
+        server. $gt only matches _id values of the same type group as the last one, so _id
+        values of the groups that sort after it are matched by $type in the same query, and
+        collections with mixed _id types are paged through in BSON order.
+        """
+        collection = self.db[table]
+        query = self._filter_document(filters)
+        projection = self._projection(columns)
+        total_rows, approximate = self.count_rows(table, count, filters)
+        batch_size = min(page_size, self.batch_size)
+
+        if not (keyset or after):
+            cursor = collection.find(query, projection, batch_size=batch_size)
+            data = list(cursor.skip((page - 1) * page_size).limit(page_size))
+            return self._page_result([self._plain_document(document) for document in data], page, page_size,
+                                     total_rows, approximate)
+
+        if after:
+            _, (last_id,) = decode_cursor(after)
+            last_id = json_util.loads(json.dumps(last_id))
+            seek = {'_id': {'$gt': last_id}}
+            later_types = [alias for aliases in BSON_TYPE_GROUPS[bson_type_group(last_id) + 1:] for alias in aliases]
+            if later_types:
+                seek = {'$or': [seek, {'_id': {'$type': later_types}}]}
+            query = {'$and': [query, seek]} if query else seek
+        if projection is not None:
+            projection['_id'] = 1
+        cursor = collection.find(query, projection, batch_size=batch_size)
+        data = list(cursor.sort('_id', pymongo.ASCENDING).limit(page_size))
+        next_cursor = None
+        if len(data) == page_size:
+            next_cursor = encode_cursor(['_id'], [self._cursor_value(data[-1]['_id'])])
+        if columns and '_id' not in columns:
+            # _id was only read for the cursor
+            for document in data:
+                del document['_id']
+        return self._page_result([self._plain_document(document) for document in data], None, page_size,
+                                 total_rows, approximate, next_cursor=next_cursor)
+
+    def partition_splits(
+        self,
+        table: str,
+        partitions: int
+    ) -> t.Tuple[str, t.List[t.Any]]:
+        """
+        Splits on quantiles of a $sample of _id values, which the server reads with a random
+        cursor without scanning the collection. Partitions therefore hold roughly, not exactly,
+        as many documents each. Range conditions only match _id values of one type group, so
+        collections whose smallest and largest _id differ in type cannot be partitioned.
+        """
+        collection = self.db[table]
+        # Sorted by the server, Python cannot order e.g. embedded documents or Decimal128 with floats
+        pipeline = [{'$sample': {'size': partitions * PARTITION_SAMPLE_SIZE}}, {'$project': {'_id': 1}},
+                    {'$sort': {'_id': 1}}]
+        sample = [document['_id'] for document in collection.aggregate(pipeline)]
+        if not sample:
+            return '_id', []
+        # _id values sort by type group first, so the first and last _id cover every group present
+        bounds = [document['_id'] for direction in (pymongo.ASCENDING, pymongo.DESCENDING)
+                  for document in collection.find({}, {'_id': 1}).sort('_id', direction).limit(1)]
+        if len({bson_type_group(value) for value in sample + bounds}) > 1:
+            raise ValueError(f"Collection '{table}' has _id values of different types and cannot be partitioned")
+        splits = []
+        for index in range(1, partitions):
+            split = sample[len(sample) * index // partitions]
+            # Equal values are adjacent in the sorted sample, a split equal to the first would leave a partition empty
+            if split != (splits[-1] if splits else sample[0]):
+                splits.append(split)
+        return '_id', splits
+
+    def fetch_sample(
+        self,
+        table: str,
+        size: t.Optional[int] = None,
+        percent: t.Optional[float] = None,
+        columns: t.Optional[t.List[str]] = None,
+        filters: t.Optional[t.List[t.Tuple[str, str, t.Any]]] = None
+    ) -> t.Dict[str, t.Any]:
+        """
+        Samples documents with a $sample stage. Without filters, and when the sample is under
+        5% of a collection of more than 100 documents, the server picks documents with a random
+        cursor and does not scan the collection; documents may then occasionally be returned
+        twice. Larger samples and filtered samples scan the (matching) documents and sort them
+        randomly, which is uniform but takes time proportional to the collection.
         """
-        offset = (page -1) * page_size
         collection = self.db[table]
-        data = list(collection.find({}).skip(offset).limit(page_size))
-        total_rows = collection.count_documents({})
-
-        rem = 1 if total_rows % page_size else 0
-        total_pages = (total_rows // page_size) + rem
-
-        return {
-            'data': data,
-            'page': page,
-            'total_pages': total_pages,
-            'total_rows': total_rows
-        }
+        size, estimate = self._sample_size(table, size, percent)
+        pipeline = []
+        if filters:
+            pipeline.append({'$match': self._filter_document(filters)})
+        pipeline.append({'$sample': {'size': size}})
+        projection = self._projection(columns)
+        if projection:
+            pipeline.append({'$project': projection})
+        data = [self._plain_document(document) for document in collection.aggregate(pipeline)]
+        return self._sample_result(data, estimate, filters)
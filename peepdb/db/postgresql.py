@@ -1,9 +1,38 @@
+import io
+import uuid
 import psycopg2
 from psycopg2.extras import RealDictCursor
 from .base import BaseDatabase
-from typing import List, Dict, Any
+from ..arrow import import_pyarrow
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+
+# Arrow types of the PostgreSQL types (as printed by format_type) that CSV type inference could get wrong
+PG_ARROW_TYPES = [
+    ('boolean', lambda pa: pa.bool_()),
+    ('smallint', lambda pa: pa.int16()),
+    ('integer', lambda pa: pa.int32()),
+    ('bigint', lambda pa: pa.int64()),
+    ('real', lambda pa: pa.float32()),
+    ('double precision', lambda pa: pa.float64()),
+    ('text', lambda pa: pa.string()),
+    ('character', lambda pa: pa.string()),
+    ('uuid', lambda pa: pa.string()),
+]
+
+# Rows read by TABLESAMPLE per row of a sample given in rows, since the number it returns varies
+SAMPLE_OVERSAMPLING = 2
+
+# SQLSTATEs after which a new connection may succeed: admin/crash shutdown and cannot connect now.
+# Class 08 (connection exception) is matched as a whole.
+TRANSIENT_SQLSTATES = {'57P01', '57P02', '57P03'}
+# libpq reports failures to reach the server without a SQLSTATE, unlike e.g. a wrong password
+TRANSIENT_MESSAGES = ('could not connect', 'connection refused', 'server closed the connection', 'timeout expired',
+                      'connection timed out', 'no route to host', 'could not translate host name')
 
 class PostgreSQLDatabase(BaseDatabase):
+    supports_keyset = True
+    transient_errors = (psycopg2.OperationalError, psycopg2.InterfaceError)
+
     def connect(self) -> None:
         try:
             self.connection = psycopg2.connect(
@@ -27,21 +56,181 @@ class PostgreSQLDatabase(BaseDatabase):
             self.connection.close()
             self.logger.info(f"Disconnected from PostgreSQL database: {self.database}")
 
+    def is_transient(self, error: Exception) -> bool:
+        # OperationalError also covers wrong passwords, missing databases and statement timeouts
+        if isinstance(error, psycopg2.OperationalError):
+            code = error.pgcode
+            if code:
+                return code.startswith('08') or code in TRANSIENT_SQLSTATES
+            message = str(error).lower()
+            return any(phrase in message for phrase in TRANSIENT_MESSAGES)
+        return super().is_transient(error)
+
+    def reset(self) -> None:
+        # End the implicit transaction so pooled connections do not sit idle in transaction
+        self.connection.rollback()
+
     def fetch_tables(self) -> List[str]:
         self.cursor.execute("SELECT table_name FROM information_schema.tables WHERE table_schema = 'public'")
         return [table['table_name'] for table in self.cursor.fetchall()]
 
-    def fetch_data(self, table: str, page: int = 1, page_size: int = 100) -> Dict[str, Any]:
+    def stream_rows(self, table: str, batch_size: int = 1000) -> Iterator[Dict[str, Any]]:
+        # A named cursor is a server-side cursor, iterating it fetches itersize rows per round trip
+        with self.connection.cursor(name=f"peepdb_stream_{uuid.uuid4().hex}", cursor_factory=RealDictCursor) as cursor:
+            cursor.itersize = batch_size
+            cursor.execute(f"SELECT * FROM {table}")
+            yield from cursor
+
+    def fetch_primary_key(self, table: str) -> List[str]:
+        self.cursor.execute(
+            "SELECT i.indexrelid, a.attname FROM pg_index i "
+            "JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey) "
+            "WHERE i.indrelid = %s::regclass AND (i.indisprimary OR i.indisunique) "
+            # Only full indexes on plain NOT NULL columns: expression columns are 0 in indkey, and
+            # partial or nullable indexes do not cover every row
+            "AND i.indpred IS NULL AND NOT 0 = ANY(i.indkey::int2[]) AND NOT EXISTS ("
+            "SELECT 1 FROM pg_attribute n WHERE n.attrelid = i.indrelid AND n.attnum = ANY(i.indkey) "
+            "AND NOT n.attnotnull) "
+            "ORDER BY i.indisprimary DESC, i.indexrelid, array_position(i.indkey::int2[], a.attnum)",
+            (table,)
+        )
+        rows = self.cursor.fetchall()
+        if not rows:
+            return []
+        index_oid = rows[0]['indexrelid']
+        return [row['attname'] for row in rows if row['indexrelid'] == index_oid]
+
+    def fetch_columns(self, table: str) -> List[Tuple[str, str]]:
+        self.cursor.execute(
+            "SELECT attname, format_type(atttypid, atttypmod) AS type FROM pg_attribute "
+            "WHERE attrelid = %s::regclass AND attnum > 0 AND NOT attisdropped ORDER BY attnum",
+            (table,)
+        )
+        return [(row['attname'], row['type']) for row in self.cursor.fetchall()]
+
+    def schema_version(self) -> Optional[str]:
+        # DDL rewrites the pg_class row of a table, which gives it a new xmin
+        self.cursor.execute(
+            "SELECT COUNT(*) AS tables, MAX(xmin::text::bigint) AS xmin FROM pg_class "
+            "WHERE relnamespace = 'public'::regnamespace"
+        )
+        row = self.cursor.fetchone()
+        return f"{row['tables']}:{row['xmin']}"
+
+    def _count_exact(self, table: str, filters: Optional[List[Tuple[str, str, Any]]] = None) -> int:
+        where, params = self._where_sql(filters)
+        self.cursor.execute(f"SELECT COUNT(*) as total FROM {table}{where}", params or None)
+        return self.cursor.fetchone()['total']
+
+    def _count_estimate(self, table: str) -> Optional[int]:
+        self.cursor.execute("SELECT reltuples::bigint AS estimate FROM pg_class WHERE oid = %s::regclass", (table,))
+        row = self.cursor.fetchone()
+        # reltuples is -1 for tables that were never vacuumed or analyzed
+        return row['estimate'] if row and row['estimate'] >= 0 else None
+
+    def fetch_data(self, table: str, page: int = 1, page_size: int = 100, after: str = None,
+                   keyset: bool = False, count: str = 'exact', columns: Optional[List[str]] = None,
+                   filters: Optional[List[Tuple[str, str, Any]]] = None) -> Dict[str, Any]:
+        total_rows, approximate = self.count_rows(table, count, filters)
+
+        if keyset or after:
+            key_columns, after_values = self._resolve_keyset(table, after)
+            query, params = self._keyset_query(table, key_columns, after_values, page_size, columns, filters)
+            self.cursor.execute(query, params or None)
+            return self._keyset_result(self.cursor.fetchall(), key_columns, page_size, total_rows, approximate,
+                                       columns)
+
         offset = (page - 1) * page_size
-        self.cursor.execute(f"SELECT COUNT(*) as total FROM {table}")
-        total_rows = self.cursor.fetchone()['total']
-        
-        self.cursor.execute(f"SELECT * FROM {table} LIMIT {page_size} OFFSET {offset}")
+        where, params = self._where_sql(filters)
+        self.cursor.execute(f"{self._select_sql(table, columns)}{where} LIMIT {page_size} OFFSET {offset}",
+                            params or None)
         rows = self.cursor.fetchall()
-        
-        return {
-            'data': rows,
-            'page': page,
-            'total_pages': (total_rows + page_size - 1) // page_size,
-            'total_rows': total_rows
-        }
\ No newline at end of file
+
+        return self._page_result(rows, page, page_size, total_rows, approximate)
+
+    def fetch_arrow(self, table: str, page: int = 1, page_size: int = 100, count: str = 'exact',
+                    columns: Optional[List[str]] = None,
+                    filters: Optional[List[Tuple[str, str, Any]]] = None) -> Dict[str, Any]:
+        total_rows, approximate = self.count_rows(table, count, filters)
+        offset = (page - 1) * page_size
+        where, params = self._where_sql(filters)
+        query = self.cursor.mogrify(f"{self._select_sql(table, columns)}{where} LIMIT {page_size} OFFSET {offset}",
+                                    params or None).decode()
+        column_types = self.metadata.columns(self, table) if self.metadata else self.fetch_columns(table)
+        # COPY sends the page as CSV in one stream that pyarrow parses in C, with no Python object per value
+        buffer = io.BytesIO()
+        self.cursor.copy_expert(f"COPY ({query}) TO STDOUT WITH (FORMAT csv, HEADER true)", buffer)
+        buffer.seek(0)
+        return self._page_result(read_copy_csv(buffer, column_types), page, page_size, total_rows, approximate)
+
+    def partition_splits(self, table: str, partitions: int) -> Tuple[str, List[Any]]:
+        """
+        Takes the split values from the planner's equal-frequency histogram of the key column
+        when ANALYZE has collected one, so partitions hold about as many rows each even when
+        the keys have gaps. Falls back to splitting MIN to MAX evenly.
+        """
+        key_column = self._integer_key(table)
+        if key_column is not None:
+            self.cursor.execute(
+                "SELECT histogram_bounds::text AS bounds FROM pg_stats "
+                "WHERE schemaname = current_schema() AND tablename = %s AND attname = %s",
+                (table, key_column)
+            )
+            row = self.cursor.fetchone()
+            bounds = [int(value) for value in row['bounds'].strip('{}').split(',')] if row and row['bounds'] else []
+            if len(bounds) > partitions:
+                splits = {bounds[len(bounds) * index // partitions] for index in range(1, partitions)}
+                return key_column, sorted(splits)
+        return super().partition_splits(table, partitions)
+
+    def fetch_sample(self, table: str, size: Optional[int] = None, percent: Optional[float] = None,
+                     columns: Optional[List[str]] = None,
+                     filters: Optional[List[Tuple[str, str, Any]]] = None) -> Dict[str, Any]:
+        """
+        Samples rows with TABLESAMPLE SYSTEM, which reads a random set of whole pages, so the
+        cost is proportional to the sample rather than the table. Rows stored on the same page
+        are picked together, so the sample is random per page rather than per row, and the
+        number of rows varies around the requested size. A size in rows is turned into a
+        percentage with the reltuples estimate and twice as many rows are read before picking
+        size of them; tables that were never analyzed fall back to ORDER BY random(), which
+        reads the whole table.
+        """
+        size, estimate = self._sample_size(table, size, percent)
+        where, params = self._where_sql(filters)
+        if percent is None:
+            if not estimate:
+                self.cursor.execute(f"{self._select_sql(table, columns)}{where} ORDER BY random() LIMIT {size}",
+                                    params or None)
+                return self._sample_result(self.cursor.fetchall(), estimate, filters)
+            percent = min(100.0, size * SAMPLE_OVERSAMPLING * 100 / estimate)
+        # Picked at random from the sampled pages, LIMIT alone would favour the first of them
+        self.cursor.execute(f"{self._select_sql(f'{table} TABLESAMPLE SYSTEM ({float(percent)})', columns)}{where} "
+                            f"ORDER BY random() LIMIT {size}", params or None)
+        return self._sample_result(self.cursor.fetchall(), estimate, filters)
+
+
+def read_copy_csv(buffer: io.BytesIO, column_types: List[Tuple[str, str]]):
+    """
+    Parses the output of COPY ... (FORMAT csv, HEADER true) into a pyarrow.Table.
+
+    Booleans, integers, floats and text are typed from the PostgreSQL column types, so e.g. text
+    holding digits stays text; other columns are left to pyarrow's type inference.
+    """
+    pa = import_pyarrow()
+    import pyarrow.csv as pa_csv
+
+    arrow_types = {}
+    for name, pg_type in column_types:
+        for prefix, arrow_type in PG_ARROW_TYPES:
+            if pg_type.startswith(prefix) and not pg_type.endswith('[]'):
+                arrow_types[name] = arrow_type(pa)
+                break
+    convert_options = pa_csv.ConvertOptions(
+        column_types=arrow_types,
+        # NULL is an unquoted empty field, an empty string is written as ""
+        strings_can_be_null=True,
+        quoted_strings_can_be_null=False,
+        true_values=['t'],
+        false_values=['f']
+    )
+    return pa_csv.read_csv(buffer, convert_options=convert_options)
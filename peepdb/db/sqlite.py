@@ -1,22 +1,53 @@
 import os
 import sqlite3
+from urllib.parse import quote
 from .base import BaseDatabase
-from typing import List, Dict, Any
+from ..arrow import columns_to_arrow
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+
+# Rows read per fetchmany call of fetch_arrow
+ARROW_BATCH_ROWS = 10000
+# Rows read per fetchmany call when building dicts
+FETCH_BATCH_ROWS = 1000
+# Bytes of the file read through a memory map instead of read() calls, and page cache size
+# (negative values are KiB)
+MMAP_SIZE = 1 << 30
+CACHE_SIZE = -65536
+
+
+def sqlite_uri(host: str, read_only: bool = True) -> str:
+    """
+    Returns the URI a database is opened with. host is a file path, or a file: URI whose
+    parameters are kept, e.g. file:/data/app.db?immutable=1 for files nothing writes to.
+    """
+    uri = host if host.startswith('file:') else f"file:{quote(os.path.abspath(host))}"
+    if read_only and 'mode=' not in uri:
+        uri += ('&' if '?' in uri else '?') + 'mode=ro'
+    return uri
+
 
 class SQLiteDatabase(BaseDatabase):
+    supports_keyset = True
+    placeholder = '?'
+    transient_errors = (sqlite3.OperationalError,)
+
+    def __init__(self, *args, read_only: bool = True, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.read_only = read_only
+
     def connect(self) -> None:
+        self.db_path = self.host if self.host.startswith('file:') else os.path.abspath(self.host)
         try:
-            print(f"Attempting to connect to SQLite database.")
-            print(f"Self.host: {self.host}")
-            print(f"Self.database: {self.database}")
-            self.db_path = os.path.abspath(self.host)
-            print(f"Using database file: {self.db_path}")
-            self.connection = sqlite3.connect(self.db_path)
-            self.connection.row_factory = sqlite3.Row
+            uri = sqlite_uri(self.host, self.read_only)
+            # Pooled connections may be used from several worker threads, one at a time
+            self.connection = sqlite3.connect(uri, uri=True, check_same_thread=False)
+            # Rows are read as plain tuples, dicts are built only for the rows that are returned
             self.cursor = self.connection.cursor()
-            print(f"Connected to SQLite database: {self.db_path}")
+            self.cursor.execute(f"PRAGMA mmap_size = {MMAP_SIZE}")
+            self.cursor.execute(f"PRAGMA cache_size = {CACHE_SIZE}")
+            self.logger.info(f"Connected to SQLite database: {uri}")
         except sqlite3.Error as e:
-            print(f"Error connecting to SQLite database: {e}")
+            self.logger.error(f"Error connecting to SQLite database: {e}")
             raise
 
     def disconnect(self) -> None:
@@ -24,40 +55,175 @@ class SQLiteDatabase(BaseDatabase):
             self.cursor.close()
         if self.connection:
             self.connection.close()
-            print(f"Disconnected from SQLite database: {self.db_path}")
+            self.logger.info(f"Disconnected from SQLite database: {self.db_path}")
+
+    def is_transient(self, error: Exception) -> bool:
+        # OperationalError is also raised for e.g. missing tables, only lock contention passes
+        message = str(error).lower()
+        return super().is_transient(error) and ('locked' in message or 'busy' in message)
+
+    def _table_sql(self, table: str) -> str:
+        return f"'{table}'"
+
+    def _fetch_dicts(self) -> List[Dict[str, Any]]:
+        names = [description[0] for description in self.cursor.description]
+        rows = []
+        while True:
+            batch = self.cursor.fetchmany(FETCH_BATCH_ROWS)
+            if not batch:
+                return rows
+            rows.extend(dict(zip(names, row)) for row in batch)
 
     def fetch_tables(self) -> List[str]:
-        print("Fetching tables from SQLite database")
-        print(f"Current working directory: {os.getcwd()}")
-        print(f"Database file path: {self.db_path}")
-        
         try:
             self.cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
-            tables = [table[0] for table in self.cursor.fetchall()]
-            print(f"Tables found: {tables}")
-            return tables
+            return [table[0] for table in self.cursor.fetchall()]
         except sqlite3.Error as e:
-            print(f"Error when querying the database: {e}")
+            self.logger.error(f"Error when querying the database: {e}")
             return []
 
-    def fetch_data(self, table: str, page: int = 1, page_size: int = 100) -> Dict[str, Any]:
-        print(f"Fetching data from table '{table}' (page: {page}, page_size: {page_size})")
+    def stream_rows(self, table: str, batch_size: int = 1000) -> Iterator[Dict[str, Any]]:
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(f"SELECT * FROM '{table}'")
+            names = [description[0] for description in cursor.description]
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield dict(zip(names, row))
+        finally:
+            cursor.close()
+
+    def fetch_primary_key(self, table: str) -> List[str]:
+        """
+        Returns the primary key, or else the first unique index, whose columns cannot be NULL.
+
+        A seek past a NULL key, (k) > (NULL), matches nothing, so nullable keys would end
+        keyset paging early. SQLite allows NULL in primary keys other than INTEGER PRIMARY KEY
+        unless they are declared NOT NULL.
+        """
+        self.cursor.execute(f"PRAGMA table_info('{table}')")
+        table_columns = self._fetch_dicts()
+        not_null = {row['name'] for row in table_columns if row['notnull']}
+        primary_key = sorted((row['pk'], row['name'], row['type']) for row in table_columns if row['pk'])
+        if len(primary_key) == 1 and primary_key[0][2].upper() == 'INTEGER':
+            # An alias of the rowid, never NULL
+            not_null.add(primary_key[0][1])
+        if primary_key and all(name in not_null for _, name, _ in primary_key):
+            return [name for _, name, _ in primary_key]
+
+        self.cursor.execute(f"PRAGMA index_list('{table}')")
+        for index in self._fetch_dicts():
+            if not index['unique'] or index['partial'] or index['origin'] == 'pk':
+                continue
+            self.cursor.execute(f"PRAGMA index_info('{index['name']}')")
+            columns = [row['name'] for row in self._fetch_dicts()]
+            # Expression indexes report no column name and cannot be used as a seek key
+            if columns and all(column in not_null for column in columns):
+                return columns
+        return []
+
+    def fetch_columns(self, table: str) -> List[Tuple[str, str]]:
+        self.cursor.execute(f"PRAGMA table_info('{table}')")
+        return [(row['name'], row['type']) for row in self._fetch_dicts()]
+
+    def schema_version(self) -> Optional[str]:
+        # Incremented by SQLite on every schema change
+        self.cursor.execute("PRAGMA schema_version")
+        return str(self.cursor.fetchone()[0])
+
+    def _count_exact(self, table: str, filters: Optional[List[Tuple[str, str, Any]]] = None) -> int:
+        where, params = self._where_sql(filters)
+        self.cursor.execute(f"SELECT COUNT(*) as total FROM '{table}'{where}", params)
+        return self.cursor.fetchone()[0]
+
+    def _count_estimate(self, table: str) -> Optional[int]:
+        try:
+            # sqlite_stat1 only exists once ANALYZE has been run; the first number of stat is the row count
+            self.cursor.execute("SELECT stat FROM sqlite_stat1 WHERE tbl = ? LIMIT 1", (table,))
+            row = self.cursor.fetchone()
+            if row:
+                return int(row[0].split()[0])
+        except sqlite3.OperationalError:
+            pass
+        try:
+            # MAX(rowid) is an upper bound found through a single b-tree descent
+            self.cursor.execute(f"SELECT MAX(rowid) FROM '{table}'")
+            return self.cursor.fetchone()[0] or 0
+        except sqlite3.OperationalError:
+            # WITHOUT ROWID tables have no rowid to estimate from
+            return None
+
+    def fetch_data(self, table: str, page: int = 1, page_size: int = 100, after: str = None,
+                   keyset: bool = False, count: str = 'exact', columns: Optional[List[str]] = None,
+                   filters: Optional[List[Tuple[str, str, Any]]] = None) -> Dict[str, Any]:
         offset = (page - 1) * page_size
         try:
-            self.cursor.execute(f"SELECT COUNT(*) as total FROM '{table}'")
-            total_rows = self.cursor.fetchone()[0]
-            print(f"Total rows in table '{table}': {total_rows}")
+            total_rows, approximate = self.count_rows(table, count, filters)
+
+            if keyset or after:
+                key_columns, after_values = self._resolve_keyset(table, after)
+                query, params = self._keyset_query(f"'{table}'", key_columns, after_values, page_size, columns,
+                                                   filters)
+                self.cursor.execute(query, params)
+                rows = self._fetch_dicts()
+                return self._keyset_result(rows, key_columns, page_size, total_rows, approximate, columns)
 
-            self.cursor.execute(f"SELECT * FROM '{table}' LIMIT {page_size} OFFSET {offset}")
-            rows = [dict(row) for row in self.cursor.fetchall()]
-            print(f"Fetched {len(rows)} rows from table '{table}'")
+            select = self._select_sql(f"'{table}'", columns)
+            where, params = self._where_sql(filters)
+            self.cursor.execute(f"{select}{where} LIMIT {page_size} OFFSET {offset}", params)
+            rows = self._fetch_dicts()
 
-            return {
-                'data': rows,
-                'page': page,
-                'total_pages': (total_rows + page_size - 1) // page_size,
-                'total_rows': total_rows
-            }
+            return self._page_result(rows, page, page_size, total_rows, approximate)
         except sqlite3.Error as e:
-            print(f"Error fetching data from table '{table}': {e}")
-            raise
\ No newline at end of file
+            self.logger.error(f"Error fetching data from table '{table}': {e}")
+            raise
+
+    def fetch_arrow(self, table: str, page: int = 1, page_size: int = 100, count: str = 'exact',
+                    columns: Optional[List[str]] = None,
+                    filters: Optional[List[Tuple[str, str, Any]]] = None) -> Dict[str, Any]:
+        total_rows, approximate = self.count_rows(table, count, filters)
+        offset = (page - 1) * page_size
+        select = self._select_sql(f"'{table}'", columns)
+        where, params = self._where_sql(filters)
+        # Plain tuples go straight into columns, without a dict per row
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(f"{select}{where} LIMIT {page_size} OFFSET {offset}", params)
+            names = [description[0] for description in cursor.description]
+            rows = []
+            while True:
+                batch = cursor.fetchmany(ARROW_BATCH_ROWS)
+                if not batch:
+                    break
+                rows.extend(batch)
+        finally:
+            cursor.close()
+        return self._page_result(columns_to_arrow(names, rows), page, page_size, total_rows, approximate)
+
+    def fetch_sample(self, table: str, size: Optional[int] = None, percent: Optional[float] = None,
+                     columns: Optional[List[str]] = None,
+                     filters: Optional[List[Tuple[str, str, Any]]] = None) -> Dict[str, Any]:
+        """
+        Samples rows by seeking to random rowids between MIN(rowid) and MAX(rowid), one b-tree
+        seek per row. Rows that follow a gap in the rowids (deleted rows, or rows that do not
+        match the filters) are more likely to be picked. With filters that no index covers,
+        finding the rowid range reads the table. WITHOUT ROWID tables have no rowid and fall
+        back to ORDER BY random(), which reads the whole table.
+        """
+        size, estimate = self._sample_size(table, size, percent)
+        try:
+            where, params = self._where_sql(filters)
+            self.cursor.execute(f"SELECT MIN(rowid), MAX(rowid) FROM '{table}'{where}", params)
+            low, high = self.cursor.fetchone()
+        except sqlite3.OperationalError:
+            select = self._select_sql(f"'{table}'", columns)
+            where, params = self._where_sql(filters)
+            self.cursor.execute(f"{select}{where} ORDER BY random() LIMIT {size}", params)
+            return self._sample_result(self._fetch_dicts(), estimate, filters)
+        if low is None:
+            return self._sample_result([], estimate, filters)
+        rows = self._probe_sample(f"'{table}'", 'rowid', low, high, size, columns, filters)
+        return self._sample_result(rows, estimate, filters)
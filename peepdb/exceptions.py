@@ -1,2 +1,10 @@
 class InvalidPassword(Exception):
-    pass
\ No newline at end of file
+    pass
+
+
+class DaemonError(Exception):
+    pass
+
+
+class ExportError(Exception):
+    pass
@@ -0,0 +1,302 @@
+import csv
+import os
+import shutil
+import tempfile
+from datetime import date, time
+from itertools import islice
+from typing import Any, Dict, IO, Iterable, Iterator, List, Optional, Tuple
+
+from .arrow import arrow_value
+from .core import connect_to_database
+from .exceptions import ExportError
+from .json_output import dumps
+
+EXPORT_FORMATS = ['ndjson', 'csv', 'parquet']
+# Formats that can only be written to a file, not to stdout
+BINARY_FORMATS = ['parquet']
+# Rows held back at most to learn the type of Parquet columns that start out null
+PARQUET_INFERENCE_ROWS = 100000
+
+
+def batched(rows: Iterable[Dict[str, Any]], batch_size: int) -> Iterator[List[Dict[str, Any]]]:
+    iterator = iter(rows)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def write_ndjson(rows: Iterable[Dict[str, Any]], output: IO[str]) -> int:
+    count = 0
+    for row in rows:
+        output.write(dumps(row).decode('utf-8'))
+        output.write("\n")
+        count += 1
+    return count
+
+
+def _csv_value(value: Any) -> Any:
+    if isinstance(value, (date, time)):
+        return value.isoformat()
+    elif isinstance(value, (dict, list)):
+        return dumps(value).decode('utf-8')
+    return value
+
+
+def write_csv(rows: Iterable[Dict[str, Any]], output: IO[str], fieldnames: Optional[List[str]] = None,
+              header: bool = True) -> int:
+    """
+    Writes rows as CSV. Unless fieldnames are given, the header is taken from the first row;
+    keys that only appear in later rows (e.g. in schemaless MongoDB collections) are ignored.
+    """
+    writer = None
+    count = 0
+    for row in rows:
+        if writer is None:
+            writer = csv.DictWriter(output, fieldnames=fieldnames or list(row.keys()), extrasaction='ignore')
+            if header:
+                writer.writeheader()
+        writer.writerow({key: _csv_value(value) for key, value in row.items()})
+        count += 1
+    return count
+
+
+def write_parquet(rows: Iterable[Dict[str, Any]], path: str, batch_size: int = 1000) -> int:
+    """
+    Writes rows to a Parquet file, one row group per batch.
+
+    The schema is inferred from the first batches. While a column has only held nulls, batches
+    are held back to learn its type, up to PARQUET_INFERENCE_ROWS rows. Columns still all null
+    after that are written as strings, so values that only appear later are kept.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("Parquet export requires pyarrow. Install it with: pip install peepdb[parquet]")
+
+    writer = None
+    schema = None
+    pending: List[List[Dict[str, Any]]] = []
+    pending_rows = 0
+    text_columns = set()
+    count = 0
+
+    def write(batch: List[Dict[str, Any]]) -> None:
+        if text_columns:
+            batch = [{key: _parquet_text(value) if key in text_columns else value for key, value in row.items()}
+                     for row in batch]
+        writer.write_table(pa.Table.from_pylist(batch, schema=writer.schema))
+
+    try:
+        for batch in batched(rows, batch_size):
+            batch = [{key: arrow_value(value) for key, value in row.items()} for row in batch]
+            count += len(batch)
+            if writer is not None:
+                write(batch)
+                continue
+            batch_schema = pa.Table.from_pylist(batch).schema
+            if schema is None:
+                schema = batch_schema
+            for index, field in enumerate(schema):
+                if pa.types.is_null(field.type) and field.name in batch_schema.names:
+                    schema = schema.set(index, batch_schema.field(field.name))
+            pending.append(batch)
+            pending_rows += len(batch)
+            if pending_rows < PARQUET_INFERENCE_ROWS and any(pa.types.is_null(field.type) for field in schema):
+                continue
+            writer = _parquet_writer(path, schema, text_columns)
+            for pending_batch in pending:
+                write(pending_batch)
+            pending = []
+        if writer is None and schema is not None:
+            writer = _parquet_writer(path, schema, text_columns)
+            for pending_batch in pending:
+                write(pending_batch)
+    finally:
+        if writer is not None:
+            writer.close()
+    return count
+
+
+def _parquet_writer(path: str, schema, text_columns: set):
+    """
+    Opens a ParquetWriter, writing columns that are still all null as strings. Their names are
+    added to text_columns.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    for index, field in enumerate(schema):
+        if pa.types.is_null(field.type):
+            schema = schema.set(index, field.with_type(pa.string()))
+            text_columns.add(field.name)
+    return pq.ParquetWriter(path, schema)
+
+
+def _parquet_text(value: Any) -> Any:
+    return None if value is None else str(_csv_value(value))
+
+
+def write_rows(rows: Iterable[Dict[str, Any]], format: str, output: Any, batch_size: int = 1000) -> int:
+    """
+    Writes rows in the given export format. output is a text stream for ndjson/csv and a file path for parquet.
+    """
+    if format == 'ndjson':
+        return write_ndjson(rows, output)
+    elif format == 'csv':
+        return write_csv(rows, output)
+    elif format == 'parquet':
+        return write_parquet(rows, output, batch_size)
+    raise ValueError(f"Unsupported export format: {format}")
+
+
+def export_table(db_type: str, host: str, user: str, password: str, database: str, table: str, format: str,
+                 output: Any, batch_size: int = 1000) -> int:
+    """
+    Streams a whole table into output and returns the number of rows written.
+
+    Rows flow from a server-side cursor through a generator pipeline into the writer, so memory
+    use depends on batch_size and not on the size of the table.
+    """
+    db = connect_to_database(db_type, host, user, password, database)
+    db.connect()
+    try:
+        rows = db.stream_rows(table, batch_size)
+        try:
+            return write_rows(rows, format, output, batch_size)
+        finally:
+            # Release the server-side cursor before the connection goes away
+            rows.close()
+    finally:
+        db.disconnect()
+
+
+def iter_partition(db, table: str, key_column: str, low: Any, high: Any,
+                   batch_size: int = 1000) -> Iterator[Dict[str, Any]]:
+    """
+    Yields the rows with low <= key_column < high (None leaves a side open) in key order,
+    batch_size rows per keyset page, so each round trip is an index seek.
+    """
+    filters = []
+    if low is not None:
+        filters.append((key_column, '>=', low))
+    if high is not None:
+        filters.append((key_column, '<', high))
+    after = None
+    while True:
+        page = db.fetch_data(table, 1, batch_size, after=after, keyset=True, count='none', filters=filters or None)
+        yield from page['data']
+        after = page['next_cursor']
+        if not after:
+            return
+
+
+def export_partition(connection: Tuple[str, str, str, str, str], table: str, key_column: str, low: Any, high: Any,
+                     format: str, path: str, batch_size: int = 1000) -> int:
+    """
+    Exports one key range of a table to path over a connection of its own. Runs in a worker
+    process of export_partitioned.
+    """
+    db = connect_to_database(*connection)
+    db.connect()
+    try:
+        rows = iter_partition(db, table, key_column, low, high, batch_size)
+        if format in BINARY_FORMATS:
+            return write_rows(rows, format, path, batch_size)
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            return write_rows(rows, format, f, batch_size)
+    finally:
+        db.disconnect()
+
+
+def shard_paths(output: str, count: int) -> List[str]:
+    root, extension = os.path.splitext(output)
+    return [f"{root}.part{index:04d}{extension}" for index in range(count)]
+
+
+def merge_shards(paths: List[str], format: str, output: IO[str]) -> None:
+    """
+    Concatenates ndjson or csv shards in order, keeping only the first CSV header.
+    """
+    header_written = False
+    for path in paths:
+        with open(path, 'r', newline='', encoding='utf-8') as f:
+            if format == 'csv':
+                header = f.readline()
+                if not header:
+                    continue
+                if not header_written:
+                    output.write(header)
+                    header_written = True
+            shutil.copyfileobj(f, output)
+
+
+def export_partitioned(connection: Tuple[str, str, str, str, str], table: str, format: str, output: Any,
+                       partitions: int, batch_size: int = 1000, shards: bool = False) -> Tuple[int, List[str]]:
+    """
+    Exports a table as disjoint key ranges fetched concurrently by a pool of worker processes,
+    each on its own connection. Returns the number of rows written and the shard files.
+
+    With shards (always for parquet), output is a file path and each range is written to a
+    file next to it, "<name>.part0000<ext>" and so on. Otherwise the ranges are written to
+    temporary files and then copied to output, a text stream, in key order.
+    """
+    db = connect_to_database(*connection)
+    db.connect()
+    try:
+        key_column, splits = db.partition_splits(table, partitions)
+    finally:
+        db.disconnect()
+    bounds = [None] + splits + [None]
+    ranges = list(zip(bounds[:-1], bounds[1:]))
+
+    shards = shards or format in BINARY_FORMATS
+    directory = None if shards else tempfile.mkdtemp(prefix='peepdb-export-')
+    paths = shard_paths(output, len(ranges)) if shards else \
+        [os.path.join(directory, f"part{index:04d}.{format}") for index in range(len(ranges))]
+    try:
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+
+        # Worker processes are spawned, so database drivers are not forked with open sockets
+        with ProcessPoolExecutor(max_workers=len(ranges), mp_context=multiprocessing.get_context('spawn')) as executor:
+            futures = [executor.submit(export_partition, connection, table, key_column, low, high, format, path,
+                                       batch_size)
+                       for (low, high), path in zip(ranges, paths)]
+            count = 0
+            failures = []
+            for index, ((low, high), future) in enumerate(zip(ranges, futures)):
+                if future.cancelled():
+                    continue
+                try:
+                    count += future.result()
+                except Exception as e:
+                    if not failures:
+                        # Ranges that have not started are not worth running any more
+                        for pending in futures[index + 1:]:
+                            pending.cancel()
+                    failures.append(f"partition {index} ({describe_range(key_column, low, high)}): {e}")
+        if failures:
+            if shards:
+                # Partial shards would look like a complete export
+                for path in paths:
+                    if os.path.exists(path):
+                        os.remove(path)
+            raise ExportError(f"Export of '{table}' failed in " + "; ".join(failures))
+        if not shards:
+            merge_shards(paths, format, output)
+    finally:
+        if directory is not None:
+            shutil.rmtree(directory, ignore_errors=True)
+    return count, paths if shards else []
+
+
+def describe_range(key_column: str, low: Any, high: Any) -> str:
+    conditions = []
+    if low is not None:
+        conditions.append(f"{key_column} >= {low}")
+    if high is not None:
+        conditions.append(f"{key_column} < {high}")
+    return ' and '.join(conditions) or 'all rows'
@@ -0,0 +1,73 @@
+import json
+import logging
+import os
+import socket
+import socketserver
+from typing import Any, Callable, Dict, Optional
+
+from .exceptions import DaemonError
+
+logger = logging.getLogger(__name__)
+
+
+def send_request(socket_path: str, payload: Dict[str, Any]) -> Optional[Any]:
+    """
+    Sends one JSON request to a peepdb background process and returns its result.
+
+    Returns None when nothing is listening on socket_path, so callers can fall back to doing
+    the work themselves. Errors reported by the process are raised as DaemonError.
+    """
+    if not os.path.exists(socket_path):
+        return None
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(socket_path)
+            sock.sendall(json.dumps(payload).encode() + b"\n")
+            with sock.makefile('rb') as f:
+                line = f.readline()
+    except OSError as e:
+        # A socket file left behind by a process that is no longer running
+        logger.debug(f"Nothing is listening on {socket_path}: {e}")
+        return None
+    if not line:
+        return None
+
+    response = json.loads(line)
+    if not response['ok']:
+        raise DaemonError(response['error'])
+    return response['result']
+
+
+def create_server(socket_path: str, handle: Callable[[Dict[str, Any]], Any],
+                  encoder: type = json.JSONEncoder) -> socketserver.ThreadingUnixStreamServer:
+    """
+    Creates a threaded server answering newline-delimited JSON requests on a Unix socket.
+
+    The socket is only accessible by its owner. A stale socket file is replaced, but a live
+    one raises DaemonError.
+    """
+    os.makedirs(os.path.dirname(socket_path), exist_ok=True)
+    if os.path.exists(socket_path):
+        if send_request(socket_path, {'action': 'ping'}) is not None:
+            raise DaemonError(f"A peepdb process is already listening on {socket_path}")
+        os.remove(socket_path)
+
+    class RequestHandler(socketserver.StreamRequestHandler):
+        def handle(self):
+            for line in self.rfile:
+                try:
+                    # Encoded here too, so a result that cannot be serialized is reported as an error
+                    response = json.dumps({'ok': True, 'result': handle(json.loads(line))}, cls=encoder)
+                except Exception as e:
+                    logger.error(f"Request failed: {e}")
+                    response = json.dumps({'ok': False, 'error': str(e)})
+                self.wfile.write(response.encode() + b"\n")
+                self.wfile.flush()
+
+    old_umask = os.umask(0o077)
+    try:
+        server = socketserver.ThreadingUnixStreamServer(socket_path, RequestHandler)
+    finally:
+        os.umask(old_umask)
+    server.daemon_threads = True
+    return server
@@ -0,0 +1,156 @@
+import json
+import logging
+import os
+import random
+import re
+import secrets
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, List, Optional, Tuple
+
+from .config import CONFIG_DIR
+from .core import connect_to_database
+from .export import write_csv, write_ndjson
+
+logger = logging.getLogger(__name__)
+
+JOBS_DIR = os.path.join(CONFIG_DIR, "jobs")
+# Formats that can be appended to, and so resumed at a byte offset
+RESUMABLE_FORMATS = ['ndjson', 'csv']
+
+# Attempts after a transient error, and the first and longest wait between them in seconds
+DEFAULT_RETRIES = 5
+BACKOFF_SECONDS = 1.0
+MAX_BACKOFF_SECONDS = 60.0
+
+
+@dataclass
+class ExportJob:
+    """
+    A checkpointed export of one table to a file, saved as JSON under ~/.peepdb/jobs.
+
+    After every batch is written and synced to disk, the keyset cursor of the next batch, the
+    size of the output file and the number of rows written are saved. A resumed job cuts the
+    file back to that size, dropping anything written after the checkpoint, and continues from
+    the cursor.
+    """
+    job_id: str
+    connection: str
+    table: str
+    format: str
+    output: str
+    batch_size: int = 1000
+    after: Optional[str] = None
+    offset: int = 0
+    rows: int = 0
+    fieldnames: Optional[List[str]] = None
+    status: str = 'running'
+    error: Optional[str] = None
+    updated_at: float = field(default_factory=time.time)
+    directory: Optional[str] = field(default=None, repr=False)
+
+    @classmethod
+    def create(cls, connection: str, table: str, format: str, output: str, batch_size: int = 1000,
+               directory: Optional[str] = None) -> 'ExportJob':
+        if format not in RESUMABLE_FORMATS:
+            raise ValueError(f"Checkpointed exports support {', '.join(RESUMABLE_FORMATS)}, not {format}")
+        # The random suffix keeps exports of the same table started in the same second apart
+        job_id = re.sub(r'[^A-Za-z0-9_.-]', '_',
+                        f"{connection}-{table}-{time.strftime('%Y%m%d-%H%M%S')}-{secrets.token_hex(3)}")
+        job = cls(job_id, connection, table, format, os.path.abspath(output), batch_size, directory=directory)
+        job.save()
+        return job
+
+    @classmethod
+    def load(cls, job_id: str, directory: Optional[str] = None) -> Optional['ExportJob']:
+        try:
+            with open(os.path.join(directory or JOBS_DIR, f"{job_id}.json"), "r") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return cls(**state, directory=directory)
+
+    @property
+    def path(self) -> str:
+        return os.path.join(self.directory or JOBS_DIR, f"{self.job_id}.json")
+
+    def save(self) -> None:
+        self.updated_at = time.time()
+        state = asdict(self)
+        del state['directory']
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        # Replaced in one step, a crash leaves either the previous or the new checkpoint
+        with open(self.path + ".tmp", "w") as f:
+            json.dump(state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(self.path + ".tmp", self.path)
+
+
+def export_batches(db, job: ExportJob) -> None:
+    """
+    Writes the rest of the table to the job's output one keyset batch at a time, saving a
+    checkpoint after each batch.
+    """
+    if not db.supports_keyset:
+        raise ValueError(f"Checkpointed exports need keyset pagination, which {db.__class__.__name__} does not support")
+    if job.offset:
+        if not os.path.exists(job.output) or os.path.getsize(job.output) < job.offset:
+            raise ValueError(f"The output file {job.output} is missing or shorter than its checkpoint")
+        os.truncate(job.output, job.offset)
+    with open(job.output, 'a' if job.offset else 'w', newline='', encoding='utf-8') as f:
+        while True:
+            page = db.fetch_data(job.table, 1, job.batch_size, after=job.after, keyset=True, count='none')
+            rows = page['data']
+            if rows and job.format == 'csv':
+                header = job.fieldnames is None
+                if header:
+                    job.fieldnames = list(rows[0].keys())
+                write_csv(rows, f, job.fieldnames, header=header)
+            elif rows:
+                write_ndjson(rows, f)
+            f.flush()
+            os.fsync(f.fileno())
+            job.after, job.offset, job.rows = page['next_cursor'], os.fstat(f.fileno()).st_size, job.rows + len(rows)
+            job.save()
+            if not job.after:
+                return
+
+
+def run_export_job(job: ExportJob, connection: Tuple[str, str, str, str, str], retries: int = DEFAULT_RETRIES,
+                   sleep: Callable[[float], Any] = time.sleep) -> int:
+    """
+    Runs or resumes an export job and returns the total number of rows written.
+
+    Transient driver errors (see BaseDatabase.is_transient) are retried on a new connection
+    after an exponential backoff with jitter, up to retries times in a row; a batch that
+    succeeds resets the count. Other errors mark the job as failed and are raised, it can
+    still be resumed from its last checkpoint.
+    """
+    attempt = 0
+    while True:
+        db = connect_to_database(*connection)
+        rows_before = job.rows
+        try:
+            db.connect()
+            export_batches(db, job)
+            job.status, job.error = 'done', None
+            job.save()
+            return job.rows
+        except Exception as e:
+            if job.rows > rows_before:
+                attempt = 0
+            if not db.is_transient(e) or attempt >= retries:
+                job.status, job.error = 'failed', str(e)
+                job.save()
+                raise
+            delay = min(MAX_BACKOFF_SECONDS, BACKOFF_SECONDS * 2 ** attempt) * random.uniform(0.5, 1.0)
+            attempt += 1
+            logger.warning(f"Export job '{job.job_id}' failed after {job.rows} rows: {e}. "
+                           f"Retrying in {delay:.1f}s (attempt {attempt} of {retries})")
+            sleep(delay)
+        finally:
+            try:
+                db.disconnect()
+            except Exception as e:
+                logger.debug(f"Could not disconnect after export attempt: {e}")
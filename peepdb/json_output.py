@@ -0,0 +1,141 @@
+import base64
+import json
+from datetime import date, time
+from decimal import Decimal
+from typing import Any, BinaryIO, Dict
+from uuid import UUID
+
+# orjson is imported on first use to keep it out of the CLI's cold start, and is None when it
+# is not installed
+_NOT_LOADED = object()
+orjson: Any = _NOT_LOADED
+
+JSON_STYLES = ['pretty', 'compact', 'ndjson']
+
+# Rows encoded before they are written out together
+WRITE_BATCH_ROWS = 500
+
+
+def json_default(obj: Any) -> Any:
+    """
+    Converts the values JSON has no type for: Decimal to float, dates and times to ISO 8601,
+    UUID and MongoDB ObjectId to strings and bytes to base64.
+    """
+    if isinstance(obj, Decimal):
+        return float(obj)
+    elif isinstance(obj, (date, time)):
+        return obj.isoformat()
+    elif isinstance(obj, UUID):
+        return str(obj)
+    elif isinstance(obj, (bytes, bytearray, memoryview)):
+        return base64.b64encode(bytes(obj)).decode('ascii')
+    elif type(obj).__module__.split('.')[0] == 'bson':
+        # ObjectId and the other BSON scalar types, checked by module so bson is not imported
+        return str(obj)
+    elif isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _orjson() -> Any:
+    global orjson
+    if orjson is _NOT_LOADED:
+        try:
+            import orjson as module
+        except ImportError:
+            module = None
+        orjson = module
+    return orjson
+
+
+def _stdlib_dumps(obj: Any, pretty: bool) -> bytes:
+    if pretty:
+        text = json.dumps(obj, indent=2, default=json_default, ensure_ascii=False)
+    else:
+        text = json.dumps(obj, separators=(',', ':'), default=json_default, ensure_ascii=False)
+    return text.encode('utf-8')
+
+
+def dumps(obj: Any, pretty: bool = False) -> bytes:
+    """
+    Encodes obj as UTF-8 JSON, with orjson when it is installed and the json module otherwise.
+    """
+    encoder = _orjson()
+    if encoder is not None:
+        try:
+            option = encoder.OPT_NON_STR_KEYS | (encoder.OPT_INDENT_2 if pretty else 0)
+            return encoder.dumps(obj, default=json_default, option=option)
+        except encoder.JSONEncodeError:
+            # e.g. integers beyond 64 bits, which only the json module can write
+            pass
+    return _stdlib_dumps(obj, pretty)
+
+
+def write_json(result: Dict[str, Any], output: BinaryIO, style: str = 'pretty') -> int:
+    """
+    Writes a fetch result to a binary stream and returns the number of bytes written.
+
+    Rows are encoded and written in batches as they are read, so the whole document is never
+    built in memory. 'pretty' indents like json.dumps(indent=2), 'compact' leaves out all
+    whitespace and 'ndjson' writes one row per line (with a "_table" key when the result holds
+    several tables). Unlike json.dumps defaults, non-ASCII characters are written as UTF-8
+    rather than \\u escapes, and with orjson NaN and infinite floats are written as null.
+    """
+    if style == 'ndjson':
+        return _write_ndjson(result, output)
+
+    pretty = style == 'pretty'
+    newline = b'\n' if pretty else b''
+    unit = b'  ' if pretty else b''
+    colon = b': ' if pretty else b':'
+    written = 0
+
+    def write(chunk: bytes) -> None:
+        nonlocal written
+        output.write(chunk)
+        written += len(chunk)
+
+    def nested(value: Any, depth: int) -> bytes:
+        encoded = dumps(value, pretty)
+        return encoded.replace(b'\n', b'\n' + unit * depth) if pretty else encoded
+
+    write(b'{')
+    for table_index, (table_name, table_result) in enumerate(result.items()):
+        write((b',' if table_index else b'') + newline + unit + dumps(table_name) + colon + b'{')
+        for field_index, (key, value) in enumerate(table_result.items()):
+            write((b',' if field_index else b'') + newline + unit * 2 + dumps(key) + colon)
+            if key != 'data' or not isinstance(value, list) or not value:
+                write(nested(value, 2))
+                continue
+            write(b'[')
+            batch = []
+            for row_index, row in enumerate(value):
+                batch.append((b',' if row_index else b'') + newline + unit * 3 + nested(row, 3))
+                if len(batch) >= WRITE_BATCH_ROWS:
+                    write(b''.join(batch))
+                    batch = []
+            write(b''.join(batch) + newline + unit * 2 + b']')
+        write((newline + unit if table_result else b'') + b'}')
+    write((newline if result else b'') + b'}\n')
+    return written
+
+
+def _write_ndjson(result: Dict[str, Any], output: BinaryIO) -> int:
+    written = 0
+    several = len(result) > 1
+    for table_name, table_result in result.items():
+        if table_result.get('error'):
+            rows = [{'error': table_result['error']}]
+        else:
+            rows = table_result.get('data') or []
+        for start in range(0, len(rows), WRITE_BATCH_ROWS):
+            lines = []
+            for row in rows[start:start + WRITE_BATCH_ROWS]:
+                if several:
+                    row = {'_table': table_name, **row}
+                lines.append(dumps(row) + b'\n')
+            chunk = b''.join(lines)
+            output.write(chunk)
+            written += len(chunk)
+    return written
+
@@ -0,0 +1,143 @@
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from urllib.parse import quote
+
+from .config import CONFIG_DIR
+from .db.base import BaseDatabase
+
+logger = logging.getLogger(__name__)
+
+METADATA_DIR = os.path.join(CONFIG_DIR, "metadata")
+# Cached metadata is fetched again after this many seconds, even when the schema looks unchanged
+DEFAULT_TTL = 24 * 3600
+# TTL for backends without a schema version (e.g. MongoDB, Firebase), where nothing else notices changes
+UNVERSIONED_TTL = 5 * 60
+# A long-lived instance (e.g. in the daemon) checks the TTL and schema version again after this many seconds
+DEFAULT_RECHECK_INTERVAL = 5
+
+
+class MetadataCache:
+    """
+    On-disk cache of the table list, columns, primary keys and row estimates of a saved connection.
+
+    The cache is checked on first use and again on uses more than recheck_interval seconds
+    after the last check: it is dropped when it is older than ttl or when the backend's
+    schema_version() differs from the one it was built with. Backends without a schema version
+    use the shorter unversioned_ttl instead. Entries missing from the cache are fetched from the
+    database and saved on first use.
+    """
+
+    def __init__(self, connection_name: str, ttl: float = DEFAULT_TTL, directory: Optional[str] = None,
+                 recheck_interval: float = DEFAULT_RECHECK_INTERVAL, unversioned_ttl: float = UNVERSIONED_TTL):
+        self.connection_name = connection_name
+        self.ttl = ttl
+        self.unversioned_ttl = unversioned_ttl
+        self.recheck_interval = recheck_interval
+        self.path = os.path.join(directory or METADATA_DIR, f"{quote(connection_name, safe='')}.json")
+        self._entry: Optional[Dict[str, Any]] = None
+        self._checked_at = 0.0
+        self._lock = threading.RLock()
+
+    def _empty_entry(self, version: Optional[str]) -> Dict[str, Any]:
+        return {'fetched_at': time.time(), 'version': version, 'tables': None, 'columns': {}, 'primary_keys': {},
+                'row_estimates': {}}
+
+    def _load(self, db: BaseDatabase) -> Dict[str, Any]:
+        entry = self._entry
+        if entry is not None and time.monotonic() - self._checked_at < self.recheck_interval:
+            return entry
+        if entry is None:
+            try:
+                with open(self.path, "r") as f:
+                    entry = json.load(f)
+            except (OSError, ValueError):
+                entry = None
+
+        version = db.schema_version()
+        ttl = self.ttl if version is not None else min(self.ttl, self.unversioned_ttl)
+        if entry is None or time.time() - entry['fetched_at'] > ttl or entry['version'] != version:
+            if entry is not None:
+                logger.debug(f"Metadata cache of '{self.connection_name}' is outdated")
+            entry = self._empty_entry(version)
+        self._entry = entry
+        self._checked_at = time.monotonic()
+        return entry
+
+    def _save(self) -> None:
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path + ".tmp", "w") as f:
+                json.dump(self._entry, f, default=str)
+            os.replace(self.path + ".tmp", self.path)
+        except OSError as e:
+            logger.warning(f"Could not save metadata cache: {e}")
+
+    def _cached(self, db: BaseDatabase, section: str, key: Optional[str], fetch) -> Any:
+        with self._lock:
+            entry = self._load(db)
+            cached = entry[section] if key is None else entry[section].get(key)
+            if cached is not None:
+                return cached
+            value = fetch()
+            if key is None:
+                entry[section] = value
+            else:
+                entry[section][key] = value
+            self._save()
+            return value
+
+    def tables(self, db: BaseDatabase) -> List[str]:
+        return self._cached(db, 'tables', None, db.fetch_tables)
+
+    def columns(self, db: BaseDatabase, table: str) -> List[List[str]]:
+        return self._cached(db, 'columns', table, lambda: [list(column) for column in db.fetch_columns(table)])
+
+    def primary_key(self, db: BaseDatabase, table: str) -> List[str]:
+        return self._cached(db, 'primary_keys', table, lambda: db.fetch_primary_key(table))
+
+    def row_estimate(self, db: BaseDatabase, table: str) -> Optional[int]:
+        return self._cached(db, 'row_estimates', table, lambda: db._count_estimate(table))
+
+    def refresh(self, db: BaseDatabase) -> List[str]:
+        """
+        Rebuilds the cache from the database and returns the cached tables.
+
+        Columns, primary keys and row estimates are only cached where the backend supports them.
+        """
+        with self._lock:
+            self._entry = self._empty_entry(db.schema_version())
+            tables = self.tables(db)
+            for table in tables:
+                for fetch in (self.columns, self.primary_key, self.row_estimate):
+                    try:
+                        fetch(db, table)
+                    except NotImplementedError:
+                        pass
+            return tables
+
+    def clear(self) -> bool:
+        with self._lock:
+            self._entry = None
+            if os.path.exists(self.path):
+                os.remove(self.path)
+                return True
+            return False
+
+
+def clear_metadata_caches(directory: Optional[str] = None) -> int:
+    """
+    Removes the metadata caches of all connections and returns how many were removed.
+    """
+    directory = directory or METADATA_DIR
+    if not os.path.isdir(directory):
+        return 0
+    removed = 0
+    for file_name in os.listdir(directory):
+        if file_name.endswith(".json"):
+            os.remove(os.path.join(directory, file_name))
+            removed += 1
+    return removed
@@ -0,0 +1,132 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .db.base import BaseDatabase
+
+logger = logging.getLogger(__name__)
+
+
+class ConnectionPool:
+    """
+    A bounded pool of connected database backends.
+
+    Backends are created by factory and connected lazily, so the pool never opens more
+    connections than it is asked for concurrently, and never more than max_size.
+
+    Long-lived pools can set idle_timeout, after which evict_idle() closes unused connections,
+    and health_check_interval, after which an idle connection is pinged before it is reused.
+    """
+
+    def __init__(self, factory: Callable[[], BaseDatabase], max_size: int = 4, idle_timeout: Optional[float] = None,
+                 health_check_interval: Optional[float] = None):
+        self.factory = factory
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.health_check_interval = health_check_interval
+        # Idle connections with the time they were released, most recently used last
+        self._idle: List[Tuple[BaseDatabase, float]] = []
+        self._connections: List[BaseDatabase] = []
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_size)
+
+    def acquire(self) -> BaseDatabase:
+        self._slots.acquire()
+        try:
+            db = self._take_idle()
+            if db is None:
+                db = self.factory()
+                db.connect()
+                with self._lock:
+                    self._connections.append(db)
+            return db
+        except Exception:
+            self._slots.release()
+            raise
+
+    def _take_idle(self) -> Optional[BaseDatabase]:
+        while True:
+            with self._lock:
+                if not self._idle:
+                    return None
+                db, released_at = self._idle.pop()
+            if self.health_check_interval is None or time.monotonic() - released_at < self.health_check_interval:
+                return db
+            if db.ping():
+                return db
+            logger.info("Discarding pooled connection that failed its health check")
+            with self._lock:
+                self._connections.remove(db)
+            self._disconnect(db)
+
+    def release(self, db: BaseDatabase, discard: bool = False) -> None:
+        """
+        Returns a backend to the pool. Discarded backends are disconnected instead of reused,
+        e.g. after an error that may have left the connection in an unusable state.
+        """
+        if not discard:
+            try:
+                db.reset()
+            except Exception as e:
+                logger.warning(f"Could not reset pooled connection: {e}")
+                discard = True
+        with self._lock:
+            if discard:
+                self._connections.remove(db)
+            else:
+                self._idle.append((db, time.monotonic()))
+        if discard:
+            self._disconnect(db)
+        self._slots.release()
+
+    @contextmanager
+    def connection(self):
+        db = self.acquire()
+        try:
+            yield db
+        except Exception:
+            self.release(db, discard=True)
+            raise
+        else:
+            self.release(db)
+
+    def evict_idle(self) -> int:
+        """
+        Closes connections that have been idle for longer than idle_timeout and returns how many were closed.
+        """
+        if self.idle_timeout is None:
+            return 0
+        deadline = time.monotonic() - self.idle_timeout
+        with self._lock:
+            expired = [db for db, released_at in self._idle if released_at < deadline]
+            self._idle = [(db, released_at) for db, released_at in self._idle if released_at >= deadline]
+            for db in expired:
+                self._connections.remove(db)
+        for db in expired:
+            self._disconnect(db)
+        return len(expired)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {'open': len(self._connections), 'idle': len(self._idle), 'max_size': self.max_size}
+
+    def close(self) -> None:
+        with self._lock:
+            connections, self._connections, self._idle = self._connections, [], []
+        for db in connections:
+            self._disconnect(db)
+
+    @staticmethod
+    def _disconnect(db: BaseDatabase) -> None:
+        try:
+            db.disconnect()
+        except Exception as e:
+            logger.warning(f"Error while closing pooled connection: {e}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,20 @@
+import json
+import sys
+from typing import Any, Dict
+
+from .cli import fetch_view_result
+from .result_cache import ResultCache
+
+
+def prefetch(payload: Dict[str, Any]) -> None:
+    """
+    Fetches one view request into the result cache. Runs in the process started by
+    result_cache.prefetch_in_background.
+    """
+    result = fetch_view_result(payload['connection'], payload['use_daemon'], payload['request'])
+    if result is not None:
+        ResultCache(directory=payload['directory']).put(payload['connection'], payload['key'], result)
+
+
+if __name__ == "__main__":
+    prefetch(json.loads(sys.argv[1]))
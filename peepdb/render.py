@@ -0,0 +1,72 @@
+import re
+from itertools import islice
+from typing import Any, Dict, Iterator, List, Optional
+
+# Column widths are measured on this many leading rows, so the first lines can be printed
+# before the rest of a large page has been looked at
+WIDTH_SAMPLE_ROWS = 1000
+
+MIN_PADDING = 2
+
+NUMBER_PATTERN = re.compile(r'^[+-]?(\d[\d,]*(\.\d*)?|\.\d+)([eE][+-]?\d+)?$')
+
+
+def cell_lines(value: Any, max_col_width: Optional[int] = None) -> List[str]:
+    text = '' if value is None else str(value)
+    lines = text.split('\n')
+    if max_col_width:
+        lines = [truncate(line, max_col_width) for line in lines]
+    return lines
+
+
+def truncate(text: str, width: int) -> str:
+    if len(text) <= width:
+        return text
+    return text[:width - 1] + '…'
+
+
+def render_grid(rows: List[Dict[str, Any]], max_col_width: Optional[int] = None,
+                sample_size: int = WIDTH_SAMPLE_ROWS) -> Iterator[str]:
+    """
+    Renders rows as a grid like tabulate's 'grid' format, one line at a time.
+
+    Widths and alignment are taken from the header and the first sample_size rows. Cells of
+    later rows that are wider than their column are printed in full and overflow it; only
+    cells longer than max_col_width are truncated.
+    """
+    headers = list(rows[0].keys())
+    sample = list(islice(rows, sample_size))
+
+    # Like tabulate, leave room for two extra characters next to each header
+    widths = [len(header) + MIN_PADDING for header in headers]
+    numeric = [False] * len(headers)
+    for index, key in enumerate(headers):
+        values = [str(row.get(key)) for row in sample if row.get(key) not in (None, '')]
+        # Numbers are right aligned, judged before truncation so a cut off number stays aligned
+        numeric[index] = bool(values) and all(NUMBER_PATTERN.match(value) for value in values)
+    sample = [[cell_lines(row.get(key), max_col_width) for key in headers] for row in sample]
+    for cells in sample:
+        for index, lines in enumerate(cells):
+            widths[index] = max(widths[index], *map(len, lines))
+
+    def format_line(texts: List[str]) -> str:
+        parts = []
+        for text, width, right in zip(texts, widths, numeric):
+            parts.append(text.rjust(width) if right else text.ljust(width))
+        return '| ' + ' | '.join(parts) + ' |'
+
+    def format_row(cells: List[List[str]]) -> Iterator[str]:
+        height = max(len(lines) for lines in cells)
+        for line_index in range(height):
+            yield format_line([lines[line_index] if line_index < len(lines) else '' for lines in cells])
+
+    separator = '+' + '+'.join('-' * (width + 2) for width in widths) + '+'
+    yield separator
+    yield format_line(headers)
+    yield separator.replace('-', '=')
+    for cells in sample:
+        yield from format_row(cells)
+        yield separator
+    for row in islice(rows, sample_size, None):
+        yield from format_row([cell_lines(row.get(key), max_col_width) for key in headers])
+        yield separator
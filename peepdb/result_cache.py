@@ -0,0 +1,148 @@
+import hashlib
+import json
+import logging
+import os
+import pickle
+import struct
+import subprocess
+import sys
+import time
+import zlib
+from typing import Any, Dict, Optional
+from urllib.parse import quote
+
+from .config import CONFIG_DIR
+
+logger = logging.getLogger(__name__)
+
+RESULTS_DIR = os.path.join(CONFIG_DIR, "results")
+# Errors of the latest background prefetch process
+PREFETCH_LOG = os.path.join(CONFIG_DIR, "prefetch.log")
+DEFAULT_TTL = 300
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+# Every entry starts with the time it was stored, reads refresh the file mtime for LRU eviction
+HEADER = struct.Struct('<d')
+
+
+class ResultCache:
+    """
+    Local cache of fetched result pages, bounded by age and total size.
+
+    Entries are stored per connection as zlib-compressed pickles, so Decimal, date and other
+    driver types come back unchanged. When the cache grows over max_bytes, the least recently
+    used entries are removed first.
+    """
+
+    def __init__(self, ttl: float = DEFAULT_TTL, max_bytes: int = DEFAULT_MAX_BYTES, directory: Optional[str] = None):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.directory = directory or RESULTS_DIR
+
+    @staticmethod
+    def key(connection_name: str, **request) -> str:
+        return hashlib.sha256(json.dumps([connection_name, request], sort_keys=True, default=str).encode()).hexdigest()
+
+    def _path(self, connection_name: str, key: str) -> str:
+        return os.path.join(self.directory, quote(connection_name, safe=''), f"{key}.bin")
+
+    def get(self, connection_name: str, key: str) -> Optional[Dict[str, Any]]:
+        path = self._path(connection_name, key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            stored_at, = HEADER.unpack_from(data)
+            if time.time() - stored_at > self.ttl:
+                os.remove(path)
+                return None
+            result = pickle.loads(zlib.decompress(data[HEADER.size:]))
+            os.utime(path)
+            return result
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, struct.error, zlib.error, pickle.UnpicklingError) as e:
+            logger.debug(f"Ignoring unreadable result cache entry {path}: {e}")
+            return None
+
+    def put(self, connection_name: str, key: str, result: Dict[str, Any]) -> None:
+        path = self._path(connection_name, key)
+        try:
+            data = HEADER.pack(time.time()) + zlib.compress(pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL))
+        except (pickle.PicklingError, TypeError, AttributeError) as e:
+            # Some driver values (e.g. objects holding a connection or a lock) cannot be pickled
+            logger.warning(f"Could not save result cache entry: {e}")
+            return
+        if len(data) > self.max_bytes:
+            return
+        try:
+            os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+            with open(path + ".tmp", "wb") as f:
+                f.write(data)
+            os.replace(path + ".tmp", path)
+            self.evict()
+        except OSError as e:
+            logger.warning(f"Could not save result cache entry: {e}")
+
+    def evict(self) -> int:
+        """
+        Removes expired entries, then least recently used ones until the cache fits in max_bytes.
+        Returns the number of removed entries.
+        """
+        entries = []
+        now = time.time()
+        for root, _, file_names in os.walk(self.directory):
+            for file_name in file_names:
+                path = os.path.join(root, file_name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        removed = 0
+        total = sum(size for _, size, _ in entries)
+        for mtime, size, path in sorted(entries):
+            # An entry is never read after ttl, and reads only make mtime newer than its store time
+            if total <= self.max_bytes and now - mtime <= self.ttl:
+                continue
+            try:
+                os.remove(path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+            total -= size
+        return removed
+
+    def clear(self, connection_name: Optional[str] = None) -> int:
+        """
+        Removes the cached pages of one connection, or of all connections, and returns how many were removed.
+        """
+        directory = self.directory
+        if connection_name:
+            directory = os.path.join(directory, quote(connection_name, safe=''))
+        removed = 0
+        for root, _, file_names in os.walk(directory):
+            for file_name in file_names:
+                os.remove(os.path.join(root, file_name))
+                removed += 1
+        return removed
+
+
+def prefetch_in_background(connection_name: str, key: str, request: Dict[str, Any], use_daemon: bool,
+                           directory: Optional[str] = None) -> None:
+    """
+    Starts a detached python process that fetches request into the result cache under key, so
+    the command can return while the next page loads.
+
+    The process is spawned rather than forked, since the command may already run threads
+    (worker pools, driver threads). It never reads input, e.g. a password prompt, and the
+    errors of the latest one are written to PREFETCH_LOG.
+    """
+    payload = json.dumps({'connection': connection_name, 'key': key, 'request': request,
+                          'use_daemon': use_daemon, 'directory': directory})
+    try:
+        os.makedirs(os.path.dirname(PREFETCH_LOG), exist_ok=True)
+        with open(PREFETCH_LOG, 'wb') as log:
+            subprocess.Popen([sys.executable, '-m', 'peepdb.prefetch', payload], stdin=subprocess.DEVNULL,
+                             stdout=subprocess.DEVNULL, stderr=log, start_new_session=True, close_fds=True)
+    except OSError as e:
+        logger.debug(f"Could not start prefetching the next page: {e}")
@@ -0,0 +1,23 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def metadata_dir(tmp_path, monkeypatch):
+    # Keep cached metadata of test connections out of the real ~/.peepdb
+    directory = str(tmp_path / 'metadata')
+    monkeypatch.setattr('peepdb.metadata.METADATA_DIR', directory)
+    return directory
+
+
+@pytest.fixture(autouse=True)
+def results_dir(tmp_path, monkeypatch):
+    directory = str(tmp_path / 'results')
+    monkeypatch.setattr('peepdb.result_cache.RESULTS_DIR', directory)
+    return directory
+
+
+@pytest.fixture(autouse=True)
+def jobs_dir(tmp_path, monkeypatch):
+    directory = str(tmp_path / 'jobs')
+    monkeypatch.setattr('peepdb.jobs.JOBS_DIR', directory)
+    return directory
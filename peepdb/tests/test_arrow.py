@@ -0,0 +1,107 @@
+import io
+import sqlite3
+from decimal import Decimal
+import pytest
+from unittest.mock import patch
+from click.testing import CliRunner
+from peepdb.arrow import rows_to_arrow, write_arrow
+from peepdb.cli import cli
+from peepdb.core import fetch_results
+from peepdb.db.postgresql import read_copy_csv
+
+pa = pytest.importorskip('pyarrow')
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / 'arrow.db')
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE TABLE metrics (id INTEGER PRIMARY KEY, name TEXT, value REAL)')
+    conn.executemany('INSERT INTO metrics VALUES (?, ?, ?)',
+                     [(i, None if i % 10 == 0 else f'm{i}', i * 0.5) for i in range(1, 251)])
+    conn.commit()
+    conn.close()
+    return path
+
+
+def test_sqlite_fetch_arrow(db_path):
+    result = fetch_results('sqlite', db_path, '', '', '', 'metrics', page=2, page_size=100, columnar=True)
+    page = result['metrics']
+
+    assert isinstance(page['data'], pa.Table)
+    assert page['data'].column_names == ['id', 'name', 'value']
+    assert page['data'].schema.field('value').type == pa.float64()
+    assert page['data'].column('id').to_pylist() == list(range(101, 201))
+    assert page['data'].column('name')[9].as_py() is None
+    assert page['total_rows'] == 250
+    assert page['total_pages'] == 3
+
+
+def test_sqlite_fetch_arrow_with_columns_and_filters(db_path):
+    result = fetch_results('sqlite', db_path, '', '', '', 'metrics', columns=['id'], filters=['value > 120'],
+                           count='none', columnar=True)
+    assert result['metrics']['data'].to_pydict() == {'id': list(range(241, 251))}
+    assert result['metrics']['total_rows'] is None
+
+
+def test_rows_to_arrow_with_mixed_documents():
+    table = rows_to_arrow([{'a': 1, 'b': Decimal('1.5')}, {'a': 'x', 'c': True}])
+    assert table.column_names == ['a', 'b', 'c']
+    assert table.column('a').to_pylist() == ['1', 'x']
+    assert table.column('c').to_pylist() == [None, True]
+
+
+def test_read_copy_csv_uses_column_types():
+    data = io.BytesIO(b'id,code,ok,tags\n1,007,t,"{1,2}"\n2,"",f,\n3,,,\n')
+    table = read_copy_csv(data, [('id', 'integer'), ('code', 'text'), ('ok', 'boolean'), ('tags', 'integer[]')])
+
+    assert table.schema.field('id').type == pa.int32()
+    assert table.column('code').to_pylist() == ['007', '', None]
+    assert table.column('ok').to_pylist() == [True, False, None]
+    assert table.column('tags').to_pylist() == ['{1,2}', None, None]
+
+
+def test_write_arrow_formats(tmp_path):
+    table = pa.table({'id': [1, 2], 'name': ['a', 'b']})
+    stream = io.BytesIO()
+    assert write_arrow(table, 'arrow', stream) == 2
+    assert pa.ipc.open_stream(stream.getvalue()).read_all().equals(table)
+
+    import pyarrow.feather as feather
+    write_arrow(table, 'feather', str(tmp_path / 'out.feather'))
+    assert feather.read_table(str(tmp_path / 'out.feather')).equals(table)
+
+
+def test_view_command_parquet_output(db_path, tmp_path):
+    pq = pytest.importorskip('pyarrow.parquet')
+    output = str(tmp_path / 'metrics.parquet')
+    runner = CliRunner()
+    with patch('peepdb.cli.get_connection', return_value=('sqlite', db_path, '', '', '')):
+        result = runner.invoke(cli, ['view', 'mydb', '--table', 'metrics', '--format', 'parquet'])
+        assert '--output is required' in result.output
+
+        result = runner.invoke(cli, ['view', 'mydb', '--table', 'metrics', '--format', 'parquet',
+                                     '--page-size', '50', '--output', output])
+
+    assert result.exit_code == 0
+    assert 'Wrote 50 rows' in result.output
+    assert pq.read_table(output).column('id').to_pylist() == list(range(1, 51))
+
+
+def test_write_parquet_learns_types_of_columns_null_in_first_batches(tmp_path, monkeypatch):
+    pq = pytest.importorskip('pyarrow.parquet')
+    from peepdb import export
+
+    path = str(tmp_path / 'late.parquet')
+    rows = [{'id': i, 'score': None} for i in range(25)] + [{'id': 25, 'score': 1.5}]
+    assert export.write_parquet(iter(rows), path, batch_size=10) == 26
+    table = pq.read_table(path)
+    assert table.schema.field('score').type == pa.float64()
+    assert table.column('score').to_pylist()[-1] == 1.5
+
+    # Columns still all null once the inference limit is reached are written as strings
+    monkeypatch.setattr(export, 'PARQUET_INFERENCE_ROWS', 10)
+    export.write_parquet(iter(rows), path, batch_size=10)
+    table = pq.read_table(path)
+    assert table.schema.field('score').type == pa.string()
+    assert table.column('score').to_pylist()[-1] == '1.5'
@@ -0,0 +1,107 @@
+import asyncio
+import sqlite3
+from datetime import date
+import pytest
+from peepdb.core import async_fetch_results, async_peep_db
+from peepdb.db import get_async_backend
+
+pytest.importorskip('aiosqlite')
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / 'async.db')
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT)')
+    conn.execute('CREATE TABLE products (id INTEGER PRIMARY KEY, price REAL)')
+    conn.executemany('INSERT INTO users VALUES (?, ?)', [(1, 'Alice'), (2, 'Bob'), (3, 'Carol')])
+    conn.commit()
+    conn.close()
+    return path
+
+
+def test_async_fetch_all_tables(db_path):
+    result = asyncio.run(async_fetch_results('sqlite', db_path, '', '', '', concurrency=2))
+
+    assert list(result) == ['users', 'products']
+    assert [row['name'] for row in result['users']['data']] == ['Alice', 'Bob', 'Carol']
+    assert result['products']['total_rows'] == 0
+
+
+def test_async_fetch_page_with_filters(db_path):
+    result = asyncio.run(async_fetch_results('sqlite', db_path, '', '', '', table='users', page=2, page_size=1,
+                                             columns=['name'], filters=['id >= 2']))
+
+    assert result['users']['data'] == [{'name': 'Carol'}]
+    assert result['users']['total_rows'] == 2
+    assert result['users']['total_pages'] == 2
+
+
+def test_async_backend_context_manager(db_path):
+    async def run():
+        async with get_async_backend('sqlite')(db_path, '', '', '') as db:
+            with pytest.raises(sqlite3.OperationalError):
+                await db.fetch_data('missing')
+        return await async_peep_db('sqlite', db_path, '', '', '', table='users', format='json')
+
+    result = asyncio.run(run())
+    assert result['users']['total_rows'] == 3
+
+
+def test_async_sqlite_is_read_only(db_path):
+    async def run():
+        async with get_async_backend('sqlite')(db_path, '', '', '') as db:
+            await db._query('DELETE FROM users')
+
+    with pytest.raises(sqlite3.OperationalError, match='readonly'):
+        asyncio.run(run())
+
+
+def test_async_postgresql_converts_string_filter_values():
+    from unittest.mock import AsyncMock, MagicMock
+    pytest.importorskip('asyncpg')
+    from peepdb.db.async_postgresql import AsyncPostgreSQLDatabase
+
+    statement = MagicMock()
+    statement.get_parameters.return_value = [MagicMock(), MagicMock()]
+    statement.get_parameters.return_value[0].name = 'date'
+    statement.get_parameters.return_value[1].name = 'text'
+    statement.fetch = AsyncMock(return_value=[])
+    connection = MagicMock(prepare=AsyncMock(return_value=statement))
+    db = AsyncPostgreSQLDatabase('localhost', 'user', 'password', 'test')
+    db.pool = MagicMock()
+    db.pool.acquire.return_value.__aenter__ = AsyncMock(return_value=connection)
+    db.pool.acquire.return_value.__aexit__ = AsyncMock(return_value=False)
+
+    asyncio.run(db.fetch_data('events', count='none', filters=[('day', '>=', '2024-01-31'), ('name', '=', 'x')]))
+
+    assert 'WHERE "day" >= $1 AND "name" = $2' in connection.prepare.call_args[0][0]
+    statement.fetch.assert_called_once_with(date(2024, 1, 31), 'x')
+    with pytest.raises(ValueError, match='Invalid date value'):
+        db._convert_parameter('yesterday', 'date')
+
+
+def test_async_mongodb_converts_object_ids():
+    from unittest.mock import AsyncMock, MagicMock
+    pytest.importorskip('motor')
+    from bson import ObjectId
+    from peepdb.db.async_mongodb import AsyncMongoDBDatabase
+
+    object_id = ObjectId()
+    db = AsyncMongoDBDatabase('localhost', 'user', 'password', 'test')
+    db.db = MagicMock()
+    cursor = db.db['users'].find.return_value.skip.return_value.limit.return_value
+    cursor.to_list = AsyncMock(return_value=[{'_id': object_id, 'name': 'Alice'}])
+
+    result = asyncio.run(db.fetch_data('users', count='none'))
+
+    assert result['data'] == [{'_id': str(object_id), 'name': 'Alice'}]
+
+
+def test_async_backend_unsupported():
+    with pytest.raises(ValueError):
+        get_async_backend('firebase')
+
+
+if __name__ == '__main__':
+    pytest.main()
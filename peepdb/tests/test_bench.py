@@ -0,0 +1,31 @@
+import sqlite3
+from peepdb.bench import compare_results, create_fixture, deep_cursor
+from peepdb.db.sqlite import SQLiteDatabase
+
+
+def test_create_fixture(tmp_path):
+    path = str(tmp_path / 'bench.db')
+    table = create_fixture(path, rows=50, width=5)
+
+    conn = sqlite3.connect(path)
+    columns = [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+    assert columns == ['id', 'c0', 'c1', 'c2', 'c3', 'c4']
+    assert conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] == 50
+    conn.close()
+
+
+def test_deep_cursor_starts_at_last_page(tmp_path):
+    path = str(tmp_path / 'bench.db')
+    table = create_fixture(path, rows=250, width=2)
+
+    with SQLiteDatabase(path, '', '', '') as db:
+        cursor = deep_cursor(db, table, 100, 3)
+        result = db.fetch_data(table, 1, 100, after=cursor)
+        assert result['data'] == db.fetch_data(table, 3, 100)['data']
+        assert deep_cursor(db, table, 100, 1) is None
+
+
+def test_compare_results():
+    baseline = {'results': {'connect': {'min': 0.002}, 'json_encode': {'min': 0.010}}}
+    current = {'results': {'connect': {'min': 0.003}, 'format_as_table': {'min': 0.1}}}
+    assert compare_results(current, baseline) == [('connect', 0.002, 0.003, 1.5)]
@@ -0,0 +1,68 @@
+import sqlite3
+import pytest
+from peepdb.browse import TableBrowser, column_layout, format_line
+from peepdb.db.sqlite import SQLiteDatabase
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / 'browse.db')
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE TABLE events (id INTEGER PRIMARY KEY, name TEXT)')
+    conn.execute('CREATE TABLE logs (message TEXT)')
+    conn.executemany('INSERT INTO events VALUES (?, ?)', [(i, f'event {i}') for i in range(1, 106)])
+    conn.executemany('INSERT INTO logs VALUES (?)', [(f'log {i}',) for i in range(1, 26)])
+    conn.commit()
+    conn.close()
+    return path
+
+
+def test_browser_scrolls_across_windows(db_path):
+    with TableBrowser(SQLiteDatabase(db_path, '', '', ''), 'events', window_size=10) as browser:
+        assert browser.keyset
+        rows = browser.rows(5, 10)
+        assert [int(row['id']) for row in rows] == list(range(6, 16))
+
+        rows = browser.rows(100, 10)
+        assert [int(row['id']) for row in rows] == list(range(101, 106))
+        assert browser.last_window == 10
+        assert browser.known_rows == 105
+        assert browser.at_end(105)
+        assert browser.rows(105, 10) == []
+
+
+def test_browser_keeps_bounded_windows(db_path):
+    with TableBrowser(SQLiteDatabase(db_path, '', '', ''), 'events', window_size=10, max_windows=3) as browser:
+        for start in range(0, 105, 5):
+            browser.rows(start, 5)
+            assert len(browser.windows) <= 3
+
+        # Evicted windows are fetched again when scrolled back into view
+        assert 0 not in browser.windows
+        assert [int(row['id']) for row in browser.rows(0, 3)] == [1, 2, 3]
+
+
+def test_browser_without_primary_key_uses_pages(db_path):
+    with TableBrowser(SQLiteDatabase(db_path, '', '', ''), 'logs', window_size=10,
+                      filters=["message != 'log 1'"]) as browser:
+        assert not browser.keyset
+        rows = browser.rows(0, 30)
+        assert len(rows) == 24
+        assert rows[0]['message'] == 'log 2'
+        assert browser.last_window == 2
+
+
+def test_browser_prefetches_next_window(db_path):
+    with TableBrowser(SQLiteDatabase(db_path, '', '', ''), 'events', window_size=10) as browser:
+        browser.rows(0, 5)
+        future = browser.pending.get(1)
+        if future is not None:
+            future.result()
+        assert 1 in browser.windows
+
+
+def test_column_layout_truncates():
+    rows = [{'id': '1', 'text': 'a' * 50}]
+    layout = column_layout(rows, 10)
+    assert layout == [('id', 2), ('text', 10)]
+    assert format_line(['1', 'a' * 50], layout) == '1  │ aaaaaaaaa…'
@@ -1,6 +1,11 @@
+import json
+import sqlite3
+import subprocess
+import sys
 import pytest
 from click.testing import CliRunner
 from peepdb.cli import cli
+from peepdb.core import connect_to_database
 from unittest.mock import patch, MagicMock
 
 @pytest.fixture
@@ -23,7 +28,41 @@ def mock_db():
     return db
 
 @patch('peepdb.cli.get_connection')
-@patch('peepdb.core.MySQLDatabase')
+@patch('peepdb.db.MySQLDatabase')
+def test_view_command_with_max_col_width(mock_mysql_db, mock_get_connection, runner, mock_db):
+    mock_get_connection.return_value = ('mysql', 'localhost', 'user', 'password', 'testdb')
+    mock_mysql_db.return_value = mock_db
+    mock_db.fetch_data.return_value = {
+        'data': [{'id': 1, 'body': 'x' * 500}],
+        'page': 1,
+        'total_pages': 1,
+        'total_rows': 1
+    }
+
+    result = runner.invoke(cli, ['view', 'testconn', '--table', 'posts', '--max-col-width', '10'])
+
+    assert result.exit_code == 0
+    assert "| xxxxxxxxx… |" in result.output
+    assert "x" * 11 not in result.output
+
+@patch('peepdb.cli.get_connection')
+@patch('peepdb.db.MySQLDatabase')
+def test_view_command_with_columns_and_filters(mock_mysql_db, mock_get_connection, runner, mock_db):
+    mock_get_connection.return_value = ('mysql', 'localhost', 'user', 'password', 'testdb')
+    mock_mysql_db.return_value = mock_db
+
+    result = runner.invoke(cli, ['view', 'testconn', '--table', 'users', '--columns', 'id, name',
+                                 '--where', 'age >= 30', '--filter', "name != 'Bob'"])
+
+    assert result.exit_code == 0
+    mock_db.fetch_data.assert_called_once_with('users', 1, 100, columns=['id', 'name'],
+                                               filters=[('age', '>=', 30), ('name', '!=', 'Bob')])
+
+    result = runner.invoke(cli, ['view', 'testconn', '--table', 'users', '--where', 'age'])
+    assert "Error: Invalid filter" in result.output
+
+@patch('peepdb.cli.get_connection')
+@patch('peepdb.db.MySQLDatabase')
 def test_view_command_with_pagination(mock_mysql_db, mock_get_connection, runner, mock_db):
     mock_get_connection.return_value = ('mysql', 'localhost', 'user', 'password', 'testdb')
     mock_mysql_db.return_value = mock_db
@@ -47,7 +86,7 @@ def test_view_command_with_pagination(mock_mysql_db, mock_get_connection, runner
     mock_db.fetch_data.assert_called_once_with('users', 2, 50)
 
 @patch('peepdb.cli.get_connection')
-@patch('peepdb.core.MySQLDatabase')
+@patch('peepdb.db.MySQLDatabase')
 def test_view_command_with_json_format(mock_mysql_db, mock_get_connection, runner, mock_db):
     mock_get_connection.return_value = ('mysql', 'localhost', 'user', 'password', 'testdb')
     mock_mysql_db.return_value = mock_db
@@ -62,7 +101,7 @@ def test_view_command_with_json_format(mock_mysql_db, mock_get_connection, runne
     assert '"total_rows": 2' in result.output
 
 @patch('peepdb.cli.get_connection')
-@patch('peepdb.core.MySQLDatabase')
+@patch('peepdb.db.MySQLDatabase')
 def test_view_command_with_scientific(mock_mysql_db, mock_get_connection, runner, mock_db):
     mock_get_connection.return_value = ('mysql', 'localhost', 'user', 'password', 'testdb')
     mock_mysql_db.return_value = mock_db
@@ -84,6 +123,45 @@ def test_view_command_with_scientific(mock_mysql_db, mock_get_connection, runner
 
     mock_get_connection.assert_called_once_with('testconn')
 
+@patch('peepdb.cli.get_connection')
+@patch('peepdb.db.MySQLDatabase')
+def test_view_command_with_keyset(mock_mysql_db, mock_get_connection, runner, mock_db):
+    mock_get_connection.return_value = ('mysql', 'localhost', 'user', 'password', 'testdb')
+    mock_mysql_db.return_value = mock_db
+    mock_db.fetch_data.return_value = {
+        'data': [{'id': 3, 'name': 'John Doe'}],
+        'page': None,
+        'total_pages': 3,
+        'total_rows': 3,
+        'next_cursor': 'abc123'
+    }
+
+    result = runner.invoke(cli, ['view', 'testconn', '--table', 'users', '--after', 'xyz', '--page-size', '1'])
+
+    assert result.exit_code == 0
+    assert "Showing 1 rows (Total rows: 3)" in result.output
+    assert "--after abc123" in result.output
+    mock_db.fetch_data.assert_called_once_with('users', 1, 1, after='xyz', keyset=True)
+
+@patch('peepdb.cli.get_connection')
+@patch('peepdb.db.MySQLDatabase')
+def test_view_command_with_estimated_count(mock_mysql_db, mock_get_connection, runner, mock_db):
+    mock_get_connection.return_value = ('mysql', 'localhost', 'user', 'password', 'testdb')
+    mock_mysql_db.return_value = mock_db
+    mock_db.fetch_data.return_value = {
+        'data': [{'id': 1, 'name': 'John Doe'}],
+        'page': 1,
+        'total_pages': 1000,
+        'total_rows': 100000,
+        'approximate': True
+    }
+
+    result = runner.invoke(cli, ['view', 'testconn', '--table', 'users', '--count', 'estimate'])
+
+    assert result.exit_code == 0
+    assert "Page 1 of ~1000 (Estimated total rows: ~100000)" in result.output
+    mock_db.fetch_data.assert_called_once_with('users', 1, 100, count='estimate')
+
 @patch('peepdb.cli.get_connection')
 def test_view_command_invalid_connection(mock_get_connection, runner):
     mock_get_connection.return_value = None
@@ -93,6 +171,255 @@ def test_view_command_invalid_connection(mock_get_connection, runner):
     assert result.exit_code == 0
     assert "Error: No saved connection found with name 'invalid_conn'." in result.output
 
+@pytest.fixture
+def sqlite_connection(tmp_path):
+    db_path = str(tmp_path / 'export.db')
+    conn = sqlite3.connect(db_path)
+    conn.execute('CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT)')
+    conn.executemany('INSERT INTO users VALUES (?, ?)', [(1, 'Alice'), (2, 'Bob'), (3, 'Carol')])
+    conn.commit()
+    conn.close()
+    return ('sqlite', db_path, '', '', '')
+
+@patch('peepdb.cli.get_connection')
+def test_cache_refresh_and_clear(mock_get_connection, runner, sqlite_connection, metadata_dir):
+    mock_get_connection.return_value = sqlite_connection
+
+    result = runner.invoke(cli, ['cache', 'refresh', 'testconn'])
+    assert result.exit_code == 0
+    assert "Cached metadata of 1 table(s) for 'testconn'." in result.output
+    with open(f"{metadata_dir}/testconn.json") as f:
+        cached = json.load(f)
+    assert cached['columns']['users'] == [['id', 'INTEGER'], ['name', 'TEXT']]
+    assert cached['primary_keys']['users'] == ['id']
+
+    result = runner.invoke(cli, ['view', 'testconn', '--no-daemon'])
+    assert "Alice" in result.output
+
+    result = runner.invoke(cli, ['cache', 'clear'])
+    assert "1 metadata cache(s) cleared." in result.output
+
+def run_prefetch(connection_name, key, request, use_daemon, directory):
+    from peepdb.prefetch import prefetch
+    prefetch({'connection': connection_name, 'key': key, 'request': request, 'use_daemon': use_daemon,
+              'directory': directory})
+
+@patch('peepdb.cli.prefetch_in_background', side_effect=run_prefetch)
+@patch('peepdb.cli.get_connection')
+def test_view_command_with_cache_prefetches_next_page(mock_get_connection, mock_prefetch, runner, sqlite_connection):
+    mock_get_connection.return_value = sqlite_connection
+    arguments = ['view', 'testconn', '--table', 'users', '--page-size', '2', '--cache', '--no-daemon']
+
+    with patch('peepdb.core.connect_to_database', wraps=connect_to_database) as mock_connect:
+        result = runner.invoke(cli, arguments)
+        assert "Alice" in result.output
+        assert "--page 2 --page-size 2 --cache" in result.output
+        # Page 1 and the prefetched page 2
+        assert mock_connect.call_count == 2
+
+        result = runner.invoke(cli, arguments + ['--page', '2'])
+        assert "Carol" in result.output
+        assert mock_connect.call_count == 2
+
+@patch('peepdb.cli.get_connection')
+def test_view_command_with_sample(mock_get_connection, runner, sqlite_connection):
+    mock_get_connection.return_value = sqlite_connection
+
+    result = runner.invoke(cli, ['view', 'testconn', '--table', 'users', '--sample', '2', '--no-daemon'])
+    assert result.exit_code == 0
+    assert "Random sample of" in result.output
+    assert "Another sample: peepdb view testconn --table users --sample 2" in result.output
+
+    result = runner.invoke(cli, ['view', 'testconn', '--table', 'users', '--sample', '2', '--keyset'])
+    assert "Error: --sample cannot be combined with --keyset or --after." in result.output
+
+    result = runner.invoke(cli, ['view', 'testconn', '--sample', 'some'])
+    assert "Error: --sample requires --table." in result.output
+
+@patch('peepdb.cli.match_connections', return_value=['shard1', 'shard2'])
+@patch('peepdb.cli.get_connection')
+def test_view_command_with_connections(mock_get_connection, mock_match_connections, runner, sqlite_connection):
+    mock_get_connection.return_value = sqlite_connection
+
+    result = runner.invoke(cli, ['view', '--connections', 'shard*', '--table', 'users', '--no-daemon'])
+    assert result.exit_code == 0
+    assert "Table: shard1/users" in result.output
+    assert "Table: shard2/users" in result.output
+    assert "Queried 2 connection(s), 0 failed." in result.output
+    mock_match_connections.assert_called_with(['shard*'])
+
+    result = runner.invoke(cli, ['view', '--connections', 'shard1,shard2', '--table', 'users', '--merge',
+                                 '--format', 'ndjson', '--no-daemon'])
+    rows = [json.loads(line) for line in result.output.splitlines() if line.startswith('{')]
+    assert [row['_connection'] for row in rows] == ['shard1'] * 3 + ['shard2'] * 3
+    mock_match_connections.assert_called_with(['shard1', 'shard2'])
+
+    result = runner.invoke(cli, ['view', 'testconn', '--connections', 'shard*'])
+    assert "Error: Give either CONNECTION_NAME or --connections, not both." in result.output
+
+@patch('peepdb.cli.get_connection')
+def test_view_command_machine_formats_keep_stdout_parseable(mock_get_connection, runner, sqlite_connection):
+    mock_get_connection.return_value = sqlite_connection
+
+    result = runner.invoke(cli, ['view', 'testconn', '--table', 'users', '--format', 'ndjson', '--no-daemon'])
+    assert result.exit_code == 0
+    assert [json.loads(line)['name'] for line in result.stdout.splitlines()] == ['Alice', 'Bob', 'Carol']
+
+    result = runner.invoke(cli, ['view', 'testconn', '--format', 'json', '--no-daemon'])
+    assert result.exit_code == 0
+    assert [row['name'] for row in json.loads(result.stdout)['users']['data']] == ['Alice', 'Bob', 'Carol']
+
+@patch('peepdb.db.firebase.FirebaseDatabase.connect')
+@patch('peepdb.cli.get_connection')
+def test_view_command_sample_unsupported(mock_get_connection, mock_connect, runner):
+    mock_get_connection.return_value = ('firebase', 'service-account.json', '', '', '')
+
+    result = runner.invoke(cli, ['view', 'testconn', '--table', 'users', '--sample', '10', '--no-daemon'])
+
+    assert result.exit_code == 0
+    assert "Error: Sampling is not supported by FirebaseDatabase" in result.output
+
+@patch('peepdb.cli.get_connection')
+def test_browse_command_reports_errors(mock_get_connection, runner, sqlite_connection):
+    mock_get_connection.return_value = sqlite_connection
+
+    result = runner.invoke(cli, ['browse', 'testconn', '--table', 'missing'])
+
+    assert result.exit_code == 0
+    assert "Error: " in result.output and "missing" in result.output
+
+@patch('peepdb.cli.get_connection')
+def test_export_command_ndjson(mock_get_connection, runner, sqlite_connection):
+    mock_get_connection.return_value = sqlite_connection
+
+    result = runner.invoke(cli, ['export', 'testconn', '--table', 'users', '--batch-size', '2'])
+
+    assert result.exit_code == 0
+    lines = [line for line in result.output.splitlines() if line.startswith('{')]
+    assert [json.loads(line)['name'] for line in lines] == ['Alice', 'Bob', 'Carol']
+
+@patch('peepdb.cli.get_connection')
+def test_export_command_with_partitions(mock_get_connection, runner, sqlite_connection, tmp_path):
+    mock_get_connection.return_value = sqlite_connection
+
+    result = runner.invoke(cli, ['export', 'testconn', '--table', 'users', '--format', 'csv', '--partitions', '2',
+                                 '--batch-size', '1', '--output', str(tmp_path / 'users.csv')])
+    assert result.exit_code == 0
+    assert (tmp_path / 'users.csv').read_text().splitlines() == ['id,name', '1,Alice', '2,Bob', '3,Carol']
+
+    result = runner.invoke(cli, ['export', 'testconn', '--table', 'users', '--partitions', '2', '--shards',
+                                 '--output', str(tmp_path / 'users.ndjson')])
+    assert result.exit_code == 0
+    shards = sorted(tmp_path.glob('users.part*.ndjson'))
+    assert [path.name for path in shards] == ['users.part0000.ndjson', 'users.part0001.ndjson']
+    assert sum(len(path.read_text().splitlines()) for path in shards) == 3
+
+def flaky_fetch_data(failures):
+    """
+    Wraps SQLiteDatabase.fetch_data so that its second call raises the given errors in turn.
+    """
+    from peepdb.db.sqlite import SQLiteDatabase
+    fetch_data = SQLiteDatabase.fetch_data
+    calls = []
+
+    def fetch(self, *args, **kwargs):
+        calls.append(kwargs.get('after'))
+        if len(calls) >= 2 and failures:
+            raise failures.pop(0)
+        return fetch_data(self, *args, **kwargs)
+    return fetch, calls
+
+@patch('peepdb.jobs.BACKOFF_SECONDS', 0)
+@patch('peepdb.cli.get_connection')
+def test_export_command_checkpoint_and_resume(mock_get_connection, runner, sqlite_connection, tmp_path, jobs_dir):
+    mock_get_connection.return_value = sqlite_connection
+    output = tmp_path / 'users.csv'
+
+    fetch, calls = flaky_fetch_data([sqlite3.OperationalError('database is locked'),
+                                     sqlite3.OperationalError('no such table: users')])
+    with patch('peepdb.db.sqlite.SQLiteDatabase.fetch_data', fetch):
+        result = runner.invoke(cli, ['export', 'testconn', '--table', 'users', '--format', 'csv', '--batch-size', '1',
+                                     '--checkpoint', '--output', str(output)])
+    assert "Error: no such table: users" in result.output
+    # The locked database was retried, the missing table was not
+    assert len(calls) == 3
+    job_id = result.output.split("Resume it with: peepdb export --resume ")[1].split()[0]
+    with open(f"{jobs_dir}/{job_id}.json") as f:
+        job = json.load(f)
+    assert job['status'] == 'failed' and job['rows'] == 1
+    # Rows written after the checkpoint are dropped on resume
+    with open(output, 'a') as f:
+        f.write('2,Bo')
+
+    result = runner.invoke(cli, ['export', '--resume', job_id])
+    assert result.exit_code == 0
+    assert f"Resuming export job '{job_id}' after 1 rows." in result.output
+    assert output.read_text().splitlines() == ['id,name', '1,Alice', '2,Bob', '3,Carol']
+
+    result = runner.invoke(cli, ['export', '--resume', job_id])
+    assert "already finished with 3 rows" in result.output
+
+def test_export_jobs_started_in_the_same_second_get_their_own_checkpoint(tmp_path, jobs_dir):
+    from peepdb.jobs import ExportJob
+
+    with patch('peepdb.jobs.time.strftime', return_value='20260101-120000'):
+        first, second = (ExportJob.create('testconn', 'users', 'csv', str(tmp_path / name)) for name in ['a', 'b'])
+    assert first.job_id != second.job_id
+    assert ExportJob.load(first.job_id).output.endswith('a')
+
+@patch('peepdb.cli.get_connection')
+def test_export_command_checkpoint_requires_output(mock_get_connection, runner, sqlite_connection):
+    mock_get_connection.return_value = sqlite_connection
+
+    result = runner.invoke(cli, ['export', 'testconn', '--table', 'users', '--checkpoint'])
+    assert "Error: --checkpoint requires --output" in result.output
+    result = runner.invoke(cli, ['export', '--resume', 'missing'])
+    assert "Error: No export job found with id 'missing'." in result.output
+
+@patch('peepdb.cli.get_connection')
+def test_export_command_reports_failed_partitions(mock_get_connection, runner, sqlite_connection, tmp_path):
+    from concurrent.futures import ThreadPoolExecutor
+    from peepdb import export
+    mock_get_connection.return_value = sqlite_connection
+    export_partition = export.export_partition
+
+    def failing_partition(connection, table, key_column, low, high, *args):
+        if low is not None:
+            raise ConnectionError('server closed the connection')
+        return export_partition(connection, table, key_column, low, high, *args)
+
+    # Threads instead of spawned processes, so the patched worker is used
+    thread_pool = lambda max_workers, mp_context: ThreadPoolExecutor(max_workers)
+    with patch('concurrent.futures.ProcessPoolExecutor', thread_pool), \
+            patch('peepdb.export.export_partition', failing_partition):
+        result = runner.invoke(cli, ['export', 'testconn', '--table', 'users', '--partitions', '2', '--shards',
+                                     '--output', str(tmp_path / 'users.ndjson')])
+    assert result.exit_code == 0
+    assert "Error: Export of 'users' failed in partition 1 (id >= 2): server closed the connection" in result.output
+    assert not list(tmp_path.glob('users.part*'))
+
+@patch('peepdb.cli.get_connection')
+def test_export_command_csv_to_file(mock_get_connection, runner, sqlite_connection, tmp_path):
+    mock_get_connection.return_value = sqlite_connection
+    output = tmp_path / 'users.csv'
+
+    result = runner.invoke(cli, ['export', 'testconn', '--table', 'users', '--format', 'csv', '--output', str(output)])
+
+    assert result.exit_code == 0
+    assert output.read_text().splitlines() == ['id,name', '1,Alice', '2,Bob', '3,Carol']
+
+@patch('peepdb.cli.get_connection')
+def test_export_command_parquet(mock_get_connection, runner, sqlite_connection, tmp_path):
+    pq = pytest.importorskip('pyarrow.parquet')
+    mock_get_connection.return_value = sqlite_connection
+    output = tmp_path / 'users.parquet'
+
+    result = runner.invoke(cli, ['export', 'testconn', '--table', 'users', '--format', 'parquet',
+                                 '--output', str(output), '--batch-size', '2'])
+
+    assert result.exit_code == 0
+    assert pq.read_table(str(output)).column('name').to_pylist() == ['Alice', 'Bob', 'Carol']
+
 @patch('peepdb.cli.save_connection')
 def test_save_command(mock_save_connection, runner):
     result = runner.invoke(cli, [
@@ -141,5 +468,63 @@ def test_remove_all_command(mock_remove_all_connections, runner):
     assert "2 connection(s) have been removed." in result.output
     mock_remove_all_connections.assert_called_once()
 
+def test_cli_import_does_not_load_database_drivers():
+    # Guards the cold start budget: drivers and heavy modules are only imported once they are actually used
+    drivers = ['mysql.connector', 'psycopg2', 'pymysql', 'pymongo', 'firebase_admin', 'keyring', 'asyncio', 'orjson',
+               'multiprocessing', 'concurrent.futures', 'pyarrow', 'tabulate', 'curses']
+    code = f"import sys, peepdb.cli; print(','.join(m for m in {drivers!r} if m in sys.modules))"
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == ''
+
+def test_bench_command_writes_and_compares_results(runner, tmp_path):
+    output = str(tmp_path / 'bench.json')
+    result = runner.invoke(cli, ['bench', '--rows', '300', '--width', '4', '--repeat', '1', '--output', output])
+    assert result.exit_code == 0
+    report = json.loads(open(output).read())
+    assert report['parameters']['rows'] == 300
+    assert {'connect', 'fetch_tables', 'fetch_data_deep_page', 'fetch_data_deep_keyset', 'format_as_table',
+            'json_encode'} <= set(report['results'])
+    assert all(timing['min'] >= 0 and timing['peak_kib'] >= 0 for timing in report['results'].values())
+
+    result = runner.invoke(cli, ['bench', '--rows', '300', '--width', '4', '--repeat', '1', '--compare', output])
+    assert result.exit_code == 0
+    assert 'baseline ms' in result.output
+
+
+def test_view_command_with_timings(runner, tmp_path):
+    db_path = str(tmp_path / 'view.db')
+    conn = sqlite3.connect(db_path)
+    conn.execute('CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT)')
+    conn.execute("INSERT INTO users VALUES (1, 'Alice')")
+    conn.commit()
+    conn.close()
+
+    with patch('peepdb.cli.get_connection', return_value=('sqlite', db_path, '', '', '')):
+        result = runner.invoke(cli, ['view', 'mydb', '--table', 'users', '--no-daemon', '--timings'])
+
+    assert result.exit_code == 0
+    assert 'Alice' in result.output
+    assert '| phase' in result.output
+    assert 'fetch_data' in result.output
+    assert 'render' in result.output
+    assert 'Total:' in result.output
+
+
+@patch('peepdb.cli.get_connection')
+@patch('peepdb.db.MySQLDatabase')
+def test_view_command_with_ndjson_and_compact_format(mock_mysql_db, mock_get_connection, runner, mock_db):
+    mock_get_connection.return_value = ('mysql', 'localhost', 'user', 'password', 'testdb')
+    mock_mysql_db.return_value = mock_db
+
+    result = runner.invoke(cli, ['view', 'testconn', '--table', 'users', '--format', 'ndjson', '--no-daemon'])
+    assert result.exit_code == 0
+    lines = [line for line in result.output.splitlines() if line.startswith('{')]
+    assert [json.loads(line)['name'] for line in lines] == ['John Doe', 'Jane Smith']
+
+    result = runner.invoke(cli, ['view', 'testconn', '--table', 'users', '--format', 'json', '--compact',
+                                 '--no-daemon'])
+    assert result.exit_code == 0
+    assert '{"users":{"data":[{"id":1,"name":"John Doe"}' in result.output
+
 if __name__ == '__main__':
-    pytest.main()
\ No newline at end of file
+    pytest.main()
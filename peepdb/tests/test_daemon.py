@@ -0,0 +1,136 @@
+import os
+import sqlite3
+import threading
+import time
+import pytest
+from unittest.mock import Mock, patch
+from peepdb.daemon import PeepDBDaemon, request_daemon
+from peepdb.db.mariadb import MariaDBDatabase
+from peepdb.db.mysql import MySQLDatabase
+from peepdb.exceptions import DaemonError
+from peepdb.pool import ConnectionPool
+
+
+def test_pool_reuses_connections():
+    factory = Mock(side_effect=lambda: Mock())
+    pool = ConnectionPool(factory, max_size=2)
+
+    with pool.connection() as first:
+        pass
+    with pool.connection() as second:
+        pass
+
+    assert first is second
+    assert factory.call_count == 1
+    pool.close()
+    first.disconnect.assert_called_once()
+
+
+def test_pool_discards_connection_after_error():
+    factory = Mock(side_effect=lambda: Mock())
+    pool = ConnectionPool(factory, max_size=1)
+
+    with pytest.raises(RuntimeError):
+        with pool.connection() as db:
+            raise RuntimeError('boom')
+
+    db.disconnect.assert_called_once()
+    assert pool.stats() == {'open': 0, 'idle': 0, 'max_size': 1}
+
+
+@pytest.mark.parametrize('database_class, driver', [
+    (MySQLDatabase, 'mysql.connector.connect'),
+    (MariaDBDatabase, 'pymysql.connect'),
+])
+def test_pool_resets_connection_between_leases(database_class, driver):
+    with patch(driver) as connect:
+        pool = ConnectionPool(lambda: database_class('localhost', 'user', 'password', 'shop'), max_size=1)
+        with pool.connection() as first:
+            connect.return_value.rollback.assert_not_called()
+        with pool.connection() as second:
+            # The snapshot of the first lease is gone before the connection is handed out again
+            connect.return_value.rollback.assert_called_once()
+        pool.close()
+    assert first is second
+
+
+def test_pool_idle_eviction_and_health_check():
+    factory = Mock(side_effect=lambda: Mock())
+    pool = ConnectionPool(factory, max_size=2, idle_timeout=0, health_check_interval=0)
+
+    with pool.connection() as db:
+        pass
+    assert pool.evict_idle() == 1
+    db.disconnect.assert_called_once()
+
+    with pool.connection() as db:
+        db.ping.return_value = False
+    with pool.connection() as replacement:
+        pass
+    assert replacement is not db
+    db.disconnect.assert_called_once()
+
+
+@pytest.fixture
+def daemon(tmp_path):
+    db_path = str(tmp_path / 'daemon.db')
+    conn = sqlite3.connect(db_path)
+    conn.execute('CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT)')
+    conn.executemany('INSERT INTO users VALUES (?, ?)', [(1, 'Alice'), (2, 'Bob')])
+    conn.commit()
+    conn.close()
+
+    socket_path = str(tmp_path / 'peepdb.sock')
+    daemon = PeepDBDaemon(socket_path, max_size=2)
+    with patch('peepdb.daemon.get_connection') as mock_get_connection:
+        mock_get_connection.side_effect = lambda name: ('sqlite', db_path, '', '', '') if name == 'local' else None
+        thread = threading.Thread(target=daemon.serve_forever, daemon=True)
+        thread.start()
+        for _ in range(100):
+            if os.path.exists(socket_path) and request_daemon({'action': 'ping'}, socket_path):
+                break
+            time.sleep(0.02)
+        yield daemon
+        daemon.shutdown()
+        thread.join(timeout=5)
+
+
+def test_daemon_view_reuses_pool(daemon):
+    request = {'action': 'view', 'connection': 'local', 'table': 'users', 'page': 1, 'page_size': 10}
+
+    result = request_daemon(request, daemon.socket_path)
+    assert [row['name'] for row in result['users']['data']] == ['Alice', 'Bob']
+
+    request_daemon(request, daemon.socket_path)
+    status = request_daemon({'action': 'status'}, daemon.socket_path)
+    assert status['local']['open'] == 1
+
+
+def test_daemon_reports_errors(daemon):
+    with pytest.raises(DaemonError, match="No saved connection found with name 'missing'"):
+        request_daemon({'action': 'view', 'connection': 'missing'}, daemon.socket_path)
+
+
+def test_unserializable_result_is_reported_as_error(tmp_path):
+    from datetime import timedelta
+    from peepdb.ipc import create_server, send_request
+
+    socket_path = str(tmp_path / 'ipc.sock')
+    server = create_server(socket_path, lambda request: {'elapsed': timedelta(seconds=1)})
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        with pytest.raises(DaemonError, match="timedelta"):
+            send_request(socket_path, {'action': 'view'})
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join(timeout=5)
+
+
+def test_request_daemon_without_daemon(tmp_path):
+    assert request_daemon({'action': 'ping'}, str(tmp_path / 'missing.sock')) is None
+
+
+if __name__ == '__main__':
+    pytest.main()
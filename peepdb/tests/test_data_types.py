@@ -39,7 +39,7 @@ def mock_db():
     return db
 
 
-@patch('peepdb.core.MySQLDatabase')
+@patch('peepdb.db.MySQLDatabase')
 def test_peep_db_with_data_types(mock_mysql_db):
     mock_db = Mock(spec=MySQLDatabase)
     mock_mysql_db.return_value = mock_db
@@ -88,7 +88,7 @@ def test_peep_db_with_data_types(mock_mysql_db):
             assert expected_value == actual_value, f"Mismatch for key '{key}': expected {expected_value}, got {actual_value}"
 
 
-@patch('peepdb.core.MySQLDatabase')
+@patch('peepdb.db.MySQLDatabase')
 def test_peep_db_with_large_numbers(mock_mysql_db):
     mock_db = Mock(spec=MySQLDatabase)
     mock_db.fetch_data.return_value = {
@@ -126,7 +126,7 @@ def test_peep_db_with_large_numbers(mock_mysql_db):
     assert actual_big_decimal == expected_big_decimal or actual_big_decimal == '1e+16'
 
 
-@patch('peepdb.core.MySQLDatabase')
+@patch('peepdb.db.MySQLDatabase')
 def test_peep_db_with_scientific(mock_mysql_db):
     mock_db = Mock(spec=MySQLDatabase)
     mock_mysql_db.return_value = mock_db
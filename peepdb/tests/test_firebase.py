@@ -0,0 +1,191 @@
+import pytest
+from unittest.mock import Mock
+from firebase_admin import firestore
+from peepdb.db.firebase import FirebaseDatabase, PageCursorCache
+
+
+class FakeDocument:
+    def __init__(self, id):
+        self.id = id
+
+    def to_dict(self):
+        return {'id': self.id}
+
+
+class FakeQuery:
+    """
+    Minimal stand-in for a Firestore query over documents ordered by id, counting billed reads.
+    """
+
+    def __init__(self, collection, descending=False, after=None, offset=0, limit=None):
+        self.collection = collection
+        self.descending = descending
+        self.after = after
+        self._offset = offset
+        self._limit = limit
+
+    def _copy(self, **changes):
+        state = dict(descending=self.descending, after=self.after, offset=self._offset, limit=self._limit)
+        state.update(changes)
+        return FakeQuery(self.collection, **state)
+
+    def where(self, filter):
+        self.collection.filters.append((filter.field_path, filter.op_string, filter.value))
+        return self
+
+    def select(self, field_paths):
+        self.collection.selected = list(field_paths)
+        return self
+
+    def order_by(self, field, direction=None):
+        return self._copy(descending=direction == firestore.Query.DESCENDING)
+
+    def start_after(self, values):
+        return self._copy(after=values['__name__'])
+
+    def offset(self, offset):
+        return self._copy(offset=offset)
+
+    def limit(self, limit):
+        return self._copy(limit=limit)
+
+    def stream(self):
+        ids = sorted(self.collection.ids, reverse=self.descending)
+        if self.after is not None:
+            ids = [id for id in ids if (id < self.after if self.descending else id > self.after)]
+        ids = ids[:self._offset + self._limit]
+        # Firestore bills skipped documents as reads too
+        self.collection.reads += len(ids)
+        return [FakeDocument(id) for id in ids[self._offset:]]
+
+    def count(self):
+        aggregation = Mock()
+        aggregation.get.return_value = [[Mock(value=len(self.collection.ids))]]
+        return aggregation
+
+
+class FakeCollection(FakeQuery):
+    def __init__(self, size):
+        self.ids = [f"doc{i:04d}" for i in range(size)]
+        self.reads = 0
+        self.filters = []
+        self.selected = None
+        super().__init__(self)
+
+
+@pytest.fixture
+def firebase(tmp_path):
+    collection = FakeCollection(1000)
+    db = FirebaseDatabase('service-account.json')
+    db.page_cursors = PageCursorCache(str(tmp_path / 'firebase_cursors.json'))
+    db.db = Mock()
+    db.db.collection.return_value = collection
+    return db, collection
+
+
+def test_fetch_data_reads_only_requested_page(firebase):
+    db, collection = firebase
+
+    result = db.fetch_data('users', page=1, page_size=10)
+
+    assert [row['id'] for row in result['data']] == [f"doc{i:04d}" for i in range(10)]
+    assert result['total_rows'] == 1000
+    assert result['total_pages'] == 100
+    assert collection.reads == 10
+
+
+def test_adjacent_pages_use_cached_cursors(firebase):
+    db, collection = firebase
+    db.fetch_data('users', page=1, page_size=10)
+    db.fetch_data('users', page=2, page_size=10)
+    collection.reads = 0
+
+    forward = db.fetch_data('users', page=3, page_size=10, count='none')
+    backward = db.fetch_data('users', page=2, page_size=10, count='none')
+
+    assert forward['data'][0]['id'] == 'doc0020'
+    assert [row['id'] for row in backward['data']] == [f"doc{i:04d}" for i in range(10, 20)]
+    assert collection.reads == 20
+
+
+def test_backward_page_without_previous_cursor(firebase):
+    db, collection = firebase
+    db.fetch_data('users', page=50, page_size=10, count='none')
+    collection.reads = 0
+
+    result = db.fetch_data('users', page=49, page_size=10, count='none')
+
+    assert [row['id'] for row in result['data']] == [f"doc{i:04d}" for i in range(480, 490)]
+    assert collection.reads == 10
+
+
+def test_page_cursors_are_persisted(firebase, tmp_path):
+    db, collection = firebase
+    db.fetch_data('users', page=1, page_size=10, count='none')
+
+    db.page_cursors = PageCursorCache(str(tmp_path / 'firebase_cursors.json'))
+    collection.reads = 0
+    result = db.fetch_data('users', page=2, page_size=10, count='none')
+
+    assert result['data'][0]['id'] == 'doc0010'
+    assert result['total_rows'] is None
+    assert collection.reads == 10
+
+
+def test_expired_page_cursors_are_not_used(firebase, tmp_path):
+    db, collection = firebase
+    db.fetch_data('users', page=1, page_size=10, count='none')
+    # Documents added before the first page moved every later page boundary
+    collection.ids = [f"doa{i:04d}" for i in range(5)] + collection.ids
+
+    db.page_cursors = PageCursorCache(str(tmp_path / 'firebase_cursors.json'), ttl=0)
+    result = db.fetch_data('users', page=2, page_size=10, count='none')
+
+    assert result['data'][0]['id'] == 'doc0005'
+
+
+def test_count_modes(firebase):
+    db, collection = firebase
+
+    assert db.fetch_data('users', page_size=10, count='none')['total_rows'] is None
+    estimate = db.fetch_data('users', page_size=10, count='estimate')
+    assert estimate['total_rows'] == 1000 and estimate['approximate']
+    assert db.fetch_data('users', page_size=10, count='estimate', filters=[('age', '=', 30)])['total_rows'] is None
+
+
+def test_fetch_data_pushes_down_columns_and_filters(firebase):
+    db, collection = firebase
+
+    db.fetch_data('users', page=1, page_size=10, count='none', columns=['name'], filters=[('age', '>', 30)])
+
+    assert collection.filters == [('age', '>', 30)]
+    assert collection.selected == ['name']
+
+
+def test_connections_with_different_service_accounts_use_separate_apps(monkeypatch, tmp_path):
+    from peepdb.db import firebase as firebase_module
+    apps = {}
+
+    def initialize_app(cred, name):
+        apps[name] = Mock(credential=cred)
+        return apps[name]
+
+    def get_app(name):
+        if name not in apps:
+            raise ValueError(name)
+        return apps[name]
+
+    monkeypatch.setattr(firebase_module.firebase_admin, 'initialize_app', initialize_app)
+    monkeypatch.setattr(firebase_module.firebase_admin, 'get_app', get_app)
+    monkeypatch.setattr(firebase_module.credentials, 'Certificate', lambda path: path)
+    monkeypatch.setattr(firebase_module.firestore, 'client', lambda app: app)
+
+    first, second, again = (FirebaseDatabase(str(tmp_path / path)) for path in ['a.json', 'b.json', 'a.json'])
+    for db in (first, second, again):
+        db.connect()
+    assert first.db.credential.endswith('a.json') and second.db.credential.endswith('b.json')
+    assert again.db is first.db
+
+
+if __name__ == '__main__':
+    pytest.main()
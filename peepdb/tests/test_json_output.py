@@ -0,0 +1,93 @@
+import io
+import json
+import uuid
+from datetime import date, datetime, time
+from decimal import Decimal
+import pytest
+from peepdb import json_output
+from peepdb.core import CustomEncoder
+from peepdb.json_output import dumps, write_json
+
+
+@pytest.fixture
+def result():
+    return {
+        'users': {
+            'data': [
+                {'id': 1, 'name': 'Alice', 'balance': Decimal('10.50'), 'created': datetime(2024, 1, 2, 3, 4, 5),
+                 'tags': ['a', 'b'], 'address': {'city': 'Athens'}},
+                {'id': 2, 'name': None, 'balance': Decimal('0'), 'created': datetime(2024, 1, 3),
+                 'tags': [], 'address': {}}
+            ],
+            'page': 1,
+            'total_pages': 1,
+            'total_rows': 2,
+            'approximate': False
+        },
+        'empty': {'data': [], 'page': 1, 'total_pages': 0, 'total_rows': 0}
+    }
+
+
+@pytest.fixture(params=['orjson', 'json'])
+def encoder(request, monkeypatch):
+    if request.param == 'orjson':
+        pytest.importorskip('orjson')
+    else:
+        monkeypatch.setattr(json_output, 'orjson', None)
+    return request.param
+
+
+def test_pretty_output_matches_json_dumps(result, encoder):
+    output = io.BytesIO()
+    written = write_json(result, output, 'pretty')
+
+    expected = json.dumps(result, indent=2, cls=CustomEncoder) + '\n'
+    assert output.getvalue().decode() == expected
+    assert written == len(output.getvalue())
+
+
+def test_non_ascii_and_nan_output(encoder):
+    output = io.BytesIO()
+    write_json({'users': {'data': [{'name': 'Zoë 東京', 'score': float('nan')}]}}, output, 'compact')
+
+    # Written as UTF-8, where json.dumps escapes to \u00eb by default
+    assert output.getvalue() == (b'{"users":{"data":[{"name":"Zo\xc3\xab \xe6\x9d\xb1\xe4\xba\xac","score":'
+                                 + (b'null' if encoder == 'orjson' else b'NaN') + b'}]}}\n')
+
+
+def test_compact_output(result, encoder):
+    output = io.BytesIO()
+    write_json(result, output, 'compact')
+
+    text = output.getvalue().decode()
+    assert '\n' not in text.rstrip('\n')
+    assert json.loads(text) == json.loads(json.dumps(result, cls=CustomEncoder))
+
+
+def test_ndjson_output(result, encoder):
+    output = io.BytesIO()
+    write_json({'users': result['users']}, output, 'ndjson')
+    rows = [json.loads(line) for line in output.getvalue().decode().splitlines()]
+    assert [row['id'] for row in rows] == [1, 2]
+    assert rows[0]['balance'] == 10.5
+
+    output = io.BytesIO()
+    write_json(result, output, 'ndjson')
+    rows = [json.loads(line) for line in output.getvalue().decode().splitlines()]
+    assert [row['_table'] for row in rows] == ['users', 'users']
+
+
+def test_dumps_special_types(encoder):
+    bson = pytest.importorskip('bson')
+    object_id = bson.ObjectId('65a1b2c3d4e5f60718293a4b')
+    value = {'id': object_id, 'uuid': uuid.UUID(int=1), 'raw': b'\x00\xff', 'day': date(2024, 1, 1),
+             'at': time(12, 30), 'amount': Decimal('1.25'), 'big': 2 ** 70}
+    assert json.loads(dumps(value)) == {
+        'id': '65a1b2c3d4e5f60718293a4b',
+        'uuid': '00000000-0000-0000-0000-000000000001',
+        'raw': 'AP8=',
+        'day': '2024-01-01',
+        'at': '12:30:00',
+        'amount': 1.25,
+        'big': 2 ** 70
+    }
@@ -0,0 +1,188 @@
+import json
+import pytest
+from bson import Decimal128, ObjectId
+from peepdb.db import mongodb
+from peepdb.db.base import parse_filter
+from peepdb.db.mongodb import BSON_TYPE_GROUPS, MongoDBDatabase, bson_type_group
+from peepdb.json_output import dumps
+
+
+def matches(document, query):
+    """
+    Evaluates the subset of MongoDB query documents that MongoDBDatabase builds.
+    """
+    if '$and' in query:
+        return all(matches(document, condition) for condition in query['$and'])
+    if '$or' in query:
+        return any(matches(document, condition) for condition in query['$or'])
+    for field, condition in query.items():
+        for operator, value in condition.items():
+            if field not in document:
+                return False
+            if operator == '$type':
+                if not any(alias in value for alias in BSON_TYPE_GROUPS[bson_type_group(document[field])]):
+                    return False
+                continue
+            # Range conditions only match values of the same type group
+            if bson_type_group(document[field]) != bson_type_group(value):
+                return False
+            if operator == '$gt' and not document[field] > value:
+                return False
+            if operator == '$gte' and not document[field] >= value:
+                return False
+            if operator == '$eq' and document[field] != value:
+                return False
+    return True
+
+
+def id_sort_key(value):
+    """
+    Orders _id values like the server for the types used here, Decimal128 among other numbers.
+    """
+    return bson_type_group(value), value.to_decimal() if isinstance(value, Decimal128) else value
+
+
+class FakeCursor:
+    def __init__(self, documents):
+        self.documents = documents
+
+    def sort(self, field, direction):
+        return FakeCursor(sorted(self.documents, key=lambda document: id_sort_key(document[field]),
+                                 reverse=direction == -1))
+
+    def skip(self, count):
+        return FakeCursor(self.documents[count:])
+
+    def limit(self, count):
+        return FakeCursor(self.documents[:count])
+
+    def __iter__(self):
+        return iter(self.documents)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+class FakeCollection:
+    """
+    Minimal stand-in for a pymongo collection that records how it was queried.
+    """
+
+    def __init__(self, documents):
+        self.documents = documents
+        self.finds = []
+        self.exact_counts = 0
+
+    def find(self, query, projection=None, batch_size=0):
+        self.finds.append((query, projection, batch_size))
+        documents = [dict(document) for document in self.documents if matches(document, query)]
+        if projection:
+            # _id is returned unless it is excluded explicitly
+            fields = {key for key, value in projection.items() if value} | {'_id'} - \
+                {key for key, value in projection.items() if not value}
+            documents = [{key: value for key, value in document.items() if key in fields} for document in documents]
+        return FakeCursor(documents)
+
+    def aggregate(self, pipeline):
+        # A $sample of at least the whole collection returns every document
+        documents = [{'_id': document['_id']} for document in self.documents]
+        if any('$sort' in stage for stage in pipeline):
+            documents.sort(key=lambda document: id_sort_key(document['_id']))
+        return documents
+
+    def estimated_document_count(self):
+        return len(self.documents)
+
+    def count_documents(self, query):
+        self.exact_counts += 1
+        return sum(matches(document, query) for document in self.documents)
+
+
+@pytest.fixture
+def db():
+    mongodb._count_cache.clear()
+    database = MongoDBDatabase('localhost', 'user', 'password', 'test', batch_size=2)
+    collection = FakeCollection([{'_id': ObjectId(), 'n': n} for n in range(5)])
+    database.db = {'items': collection}
+    return database
+
+
+def test_fetch_data_keyset_pages_by_id(db):
+    collection = db.db['items']
+
+    first = db.fetch_data('items', page_size=2, keyset=True)
+    assert [document['n'] for document in first['data']] == [0, 1]
+    assert all(isinstance(document['_id'], str) for document in first['data'])
+
+    second = db.fetch_data('items', page_size=2, after=first['next_cursor'], columns=['n'])
+    assert second['data'] == [{'n': 2}, {'n': 3}]
+    query, projection, batch_size = collection.finds[-1]
+    assert isinstance(query['$or'][0]['_id']['$gt'], ObjectId)
+    assert projection == {'n': 1, '_id': 1}
+    assert batch_size == 2
+
+    last = db.fetch_data('items', page_size=2, after=second['next_cursor'])
+    assert [document['n'] for document in last['data']] == [4]
+    assert last['next_cursor'] is None
+
+
+def test_fetch_data_keyset_with_filters(db):
+    first = db.fetch_data('items', page_size=1, keyset=True, filters=[parse_filter('n >= 3')])
+    second = db.fetch_data('items', page_size=1, after=first['next_cursor'], filters=[parse_filter('n >= 3')])
+    assert [first['data'][0]['n'], second['data'][0]['n']] == [3, 4]
+
+
+def test_fetch_data_keyset_pages_across_id_types(db):
+    ids = [3, 1.5, 'b', 'a', ObjectId(), ObjectId()]
+    db.db['mixed'] = FakeCollection([{'_id': value} for value in ids])
+
+    seen = []
+    page = db.fetch_data('mixed', page_size=2, keyset=True)
+    seen += page['data']
+    while page['next_cursor']:
+        page = db.fetch_data('mixed', page_size=2, after=page['next_cursor'])
+        seen += page['data']
+    assert [document['_id'] for document in seen] == [1.5, 3, 'a', 'b'] + sorted(str(value) for value in ids[4:])
+
+
+def test_partition_splits_rejects_mixed_id_types(db):
+    key, splits = db.partition_splits('items', 2)
+    assert key == '_id' and splits == [sorted(document['_id'] for document in db.db['items'].documents)[2]]
+
+    db.db['mixed'] = FakeCollection([{'_id': value} for value in [1, 2, 'a']])
+    with pytest.raises(ValueError, match='different types'):
+        db.partition_splits('mixed', 2)
+
+    # Python cannot compare Decimal128 with float, the sample is sorted by the server
+    db.db['numbers'] = FakeCollection([{'_id': value} for value in
+                                       [1.5, Decimal128('2'), 3, 0.5, Decimal128('4'), 2.5]])
+    key, splits = db.partition_splits('numbers', 3)
+    assert splits == [Decimal128('2'), 3]
+
+
+def test_count_uses_metadata_only_for_estimates_and_caches_counts(db):
+    collection = db.db['items']
+
+    estimate = db.fetch_data('items', page_size=2, count='estimate')
+    assert (estimate['total_rows'], estimate['approximate']) == (5, True)
+    assert collection.exact_counts == 0
+
+    exact = db.fetch_data('items', page_size=2)
+    assert (exact['total_rows'], exact['approximate']) == (5, False)
+    assert collection.exact_counts == 1
+    collection.exact_counts = 0
+
+    filters = [parse_filter('n >= 2')]
+    for page in (1, 2):
+        assert db.fetch_data('items', page=page, page_size=2, filters=filters)['total_rows'] == 3
+    assert collection.exact_counts == 1
+
+
+def test_object_ids_are_plain_strings(db):
+    rows = db.fetch_data('items', page_size=5)['data']
+    assert all(type(row['_id']) is str for row in rows)
+    assert json.loads(dumps(rows))[0]['_id'] == rows[0]['_id']
+    assert [row['n'] for row in db.stream_rows('items')] == list(range(5))
@@ -1,15 +1,23 @@
+import json
+import threading
+import time
 import pytest
 from unittest.mock import Mock, patch
+from cryptography.fernet import Fernet
+from peepdb.agent import KeyAgent
 from decimal import Decimal
-from peepdb.core import peep_db
+from peepdb.core import peep_db, fetch_connections_concurrently, format_columns, format_value, label_connection_results
+from peepdb.render import render_grid
+from peepdb.result_cache import ResultCache
+from tabulate import tabulate
 from peepdb.config import save_connection, get_connection, list_connections, remove_connection, remove_all_connections
 from peepdb.db import MySQLDatabase, PostgreSQLDatabase, MariaDBDatabase, MongoDBDatabase, FirebaseDatabase
 
-@patch('peepdb.core.FirebaseDatabase')
-@patch('peepdb.core.MongoDBDatabase')
-@patch('peepdb.core.MySQLDatabase')
-@patch('peepdb.core.PostgreSQLDatabase')
-@patch('peepdb.core.MariaDBDatabase')
+@patch('peepdb.db.FirebaseDatabase')
+@patch('peepdb.db.MongoDBDatabase')
+@patch('peepdb.db.MySQLDatabase')
+@patch('peepdb.db.PostgreSQLDatabase')
+@patch('peepdb.db.MariaDBDatabase')
 def test_peep_db(mock_mariadb, mock_postgresql, mock_mysql, mock_mongodb, mock_firebase_db):
     # Create a mock database object
     mock_db = Mock()
@@ -119,6 +127,157 @@ def test_peep_db(mock_mariadb, mock_postgresql, mock_mysql, mock_mongodb, mock_f
         peep_db('unsupported', 'host', 'user', 'password', 'database')
 
 
+@patch('peepdb.db.PostgreSQLDatabase')
+def test_peep_db_parallel(mock_postgresql):
+    def fetch_data(table, page, page_size):
+        if table == 'broken':
+            raise RuntimeError('relation does not exist')
+        return {'data': [{'table': table}], 'page': page, 'total_pages': 1, 'total_rows': 1}
+
+    mock_db = Mock()
+    mock_db.fetch_tables.return_value = ['t1', 'broken', 't2', 't3']
+    mock_db.fetch_data.side_effect = fetch_data
+    mock_postgresql.return_value = mock_db
+
+    result = peep_db('postgres', 'host', 'user', 'password', 'database', format='json', parallel=3)
+
+    # Table order is kept and the failing table does not abort the others
+    assert list(result) == ['t1', 'broken', 't2', 't3']
+    assert result['t3']['data'] == [{'table': 't3'}]
+    assert result['broken']['error'] == 'relation does not exist'
+
+    output = peep_db('postgres', 'host', 'user', 'password', 'database', format='table', parallel=3)
+    assert 'Error: relation does not exist' in output
+    assert 'Table: t3' in output
+
+
+@pytest.mark.parametrize('scientific', [False, True])
+@pytest.mark.parametrize('output_format', ['table', 'json'])
+def test_format_columns_matches_format_value(scientific, output_format):
+    from datetime import date, datetime
+    rows = [
+        {'id': 1, 'price': 1234567.891, 'amount': Decimal('10.5'), 'born': date(2020, 1, 2), 'name': 'a', 'mixed': 1},
+        {'id': 12345678, 'price': None, 'amount': Decimal('12345678.9'), 'born': datetime(2021, 3, 4, 5, 6), 'name': None, 'mixed': 'x'},
+        {'id': True, 'price': 0.5, 'amount': None, 'born': None, 'name': 'c', 'mixed': Decimal('2.5')},
+    ]
+    expected = [{key: format_value(value, scientific, output_format) for key, value in row.items()} for row in rows]
+
+    format_columns(rows, scientific, output_format)
+
+    assert rows == expected
+
+
+def test_format_columns_with_different_fields():
+    rows = [{'_id': 1, 'price': Decimal('2000000')}, {'_id': 2, 'tags': 'a'}]
+
+    format_columns(rows, False, 'table')
+
+    assert rows == [{'_id': '1', 'price': '2,000,000.00'}, {'_id': '2', 'tags': 'a'}]
+
+
+def test_postgresql_transient_errors_by_sqlstate():
+    import psycopg2
+
+    def operational_error(code, message=''):
+        error_class = type('Error', (psycopg2.OperationalError,), {'pgcode': code})
+        return error_class(message)
+
+    db = PostgreSQLDatabase('localhost', 'user', 'password', 'test')
+    assert db.is_transient(operational_error('08006'))
+    assert db.is_transient(operational_error('57P01'))
+    assert db.is_transient(operational_error(None, 'could not connect to server: Connection refused'))
+    assert db.is_transient(psycopg2.InterfaceError('connection already closed'))
+    assert not db.is_transient(operational_error('57014', 'canceling statement due to statement timeout'))
+    assert not db.is_transient(operational_error(None, 'FATAL:  password authentication failed for user "user"'))
+    assert not db.is_transient(operational_error(None, 'FATAL:  database "test" does not exist'))
+
+
+def test_mysql_and_mariadb_transient_errors_by_errno():
+    import mysql.connector
+    import pymysql
+
+    db = MySQLDatabase('localhost', 'user', 'password', 'test')
+    assert db.is_transient(mysql.connector.errors.OperationalError('Lost connection', errno=2013))
+    assert db.is_transient(mysql.connector.errors.InterfaceError("Can't connect", errno=2003))
+    assert db.is_transient(mysql.connector.errors.InternalError('Deadlock found', errno=1213))
+    assert not db.is_transient(mysql.connector.errors.OperationalError('Query execution was interrupted', errno=3024))
+    assert not db.is_transient(mysql.connector.errors.ProgrammingError('Access denied', errno=1045))
+
+    db = MariaDBDatabase('localhost', 'user', 'password', 'test')
+    assert db.is_transient(pymysql.err.OperationalError(2006, 'MySQL server has gone away'))
+    assert db.is_transient(pymysql.err.OperationalError(1205, 'Lock wait timeout exceeded'))
+    assert db.is_transient(pymysql.err.InterfaceError(0, ''))
+    assert not db.is_transient(pymysql.err.OperationalError(1045, 'Access denied for user'))
+    assert not db.is_transient(pymysql.err.OperationalError(1969, 'Query execution was interrupted (max_statement_time exceeded)'))
+
+
+def test_render_grid_matches_tabulate():
+    rows = [{'id': '1', 'name': 'Alice', 'note': None}, {'id': '22', 'name': 'Bob', 'note': 'two\nlines'}]
+
+    expected = tabulate([list(row.values()) for row in rows], headers=rows[0].keys(), tablefmt='grid')
+
+    assert "\n".join(render_grid(rows)) == expected
+
+
+def test_render_grid_rows_after_sample_overflow_their_column():
+    rows = [{'name': 'short'}, {'name': 'much longer name'}]
+
+    lines = list(render_grid(rows, sample_size=1))
+    assert lines[-2] == '| much longer name |'
+
+    lines = list(render_grid(rows, max_col_width=8, sample_size=1))
+    assert lines[-2] == '| much lo… |'
+
+
+def test_result_cache_ttl_and_lru_eviction(tmp_path):
+    from datetime import date
+    cache = ResultCache(ttl=60, max_bytes=10 ** 6, directory=str(tmp_path))
+    result = {'users': {'data': [{'id': 1, 'price': Decimal('1.50'), 'born': date(2000, 1, 1)}], 'page': 1}}
+    key = ResultCache.key('conn', table='users', page=1)
+
+    cache.put('conn', key, result)
+    assert cache.get('conn', key) == result
+    assert cache.get('conn', ResultCache.key('conn', table='users', page=2)) is None
+
+    expired = ResultCache(ttl=0, directory=str(tmp_path))
+    time.sleep(0.01)
+    assert expired.get('conn', key) is None
+
+    small = ResultCache(ttl=60, max_bytes=1, directory=str(tmp_path))
+    small.put('conn', key, result)
+    assert small.get('conn', key) is None
+
+
+def test_result_cache_evicts_least_recently_used(tmp_path):
+    import os
+    results = {page: {'t': {'data': [{'page': page}]}} for page in range(3)}
+    keys = {page: ResultCache.key('conn', page=page) for page in range(3)}
+    cache = ResultCache(directory=str(tmp_path))
+    cache.put('conn', keys[0], results[0])
+    entry_size = os.path.getsize(cache._path('conn', keys[0]))
+
+    cache = ResultCache(max_bytes=2 * entry_size, directory=str(tmp_path))
+    cache.put('conn', keys[1], results[1])
+    now = time.time()
+    os.utime(cache._path('conn', keys[0]), (now - 10, now - 10))
+    os.utime(cache._path('conn', keys[1]), (now - 20, now - 20))
+    cache.get('conn', keys[1])
+
+    cache.put('conn', keys[2], results[2])
+    assert cache.get('conn', keys[0]) is None
+    assert cache.get('conn', keys[1]) == results[1]
+    assert cache.get('conn', keys[2]) == results[2]
+
+
+
+def test_result_cache_skips_unpicklable_results(tmp_path, caplog):
+    cache = ResultCache(directory=str(tmp_path))
+    key = ResultCache.key('conn', page=1)
+    cache.put('conn', key, {'t': {'data': [{'lock': threading.Lock()}]}})
+    assert cache.get('conn', key) is None
+    assert 'Could not save result cache entry' in caplog.text
+
+
 # Test configuration functions
 @patch('peepdb.config.os.path.exists')
 @patch('peepdb.config.open')
@@ -166,5 +325,87 @@ def test_config_functions(mock_decrypt, mock_encrypt, mock_json_dump, mock_json_
     # Assert that os.remove was called with the correct arguments
 
 
+@patch('peepdb.config.get_key')
+def test_get_connection_caches_key_and_config(mock_get_key, tmp_path):
+    mock_get_key.return_value = Fernet.generate_key().decode()
+    config_file = str(tmp_path / 'config.json')
+
+    with patch('peepdb.config.CONFIG_DIR', str(tmp_path)), patch('peepdb.config.CONFIG_FILE', config_file), \
+            patch('peepdb.config._fernet', None), patch('peepdb.config._config_cache', None):
+        save_connection('cached_conn', 'postgres', 'host', 'user', 'password', 'database')
+        with patch('peepdb.config.json.load', wraps=json.load) as mock_json_load:
+            for _ in range(3):
+                assert get_connection('cached_conn') == ('postgres', 'host', 'user', 'password', 'database')
+            # The config is parsed once per process and one Fernet instance decrypts every field
+            assert mock_json_load.call_count == 1
+    assert mock_get_key.call_count == 1
+
+
+def test_key_agent_expires_keys():
+    agent = KeyAgent('unused.sock', ttl=0.05)
+
+    agent.handle({'action': 'add', 'key_id': 'salt', 'key': 'secret'})
+    assert agent.handle({'action': 'get', 'key_id': 'salt'}) == 'secret'
+
+    time.sleep(0.1)
+    assert agent.handle({'action': 'get', 'key_id': 'salt'}) is None
+
+
+
+def test_fetch_connections_concurrently_bounds_workers_and_times_out():
+    running = []
+    peak = []
+
+    def fetch(name):
+        running.append(name)
+        peak.append(len(running))
+        time.sleep(5 if name == 'slow' else 0.05)
+        running.remove(name)
+        if name == 'broken':
+            raise ConnectionError('refused')
+        return {'users': {'data': [{'id': name}], 'page': 1, 'total_pages': 1, 'total_rows': 1}}
+
+    started = time.monotonic()
+    results = fetch_connections_concurrently(['a', 'slow', 'b', 'broken', 'c'], fetch, parallel=2, timeout=0.5)
+
+    assert time.monotonic() - started < 2
+    assert list(results) == ['a', 'slow', 'b', 'broken', 'c']
+    assert isinstance(results['slow'], TimeoutError)
+    assert isinstance(results['broken'], ConnectionError)
+    assert results['c']['users']['data'] == [{'id': 'c'}]
+    assert max(peak) <= 2
+
+    labelled = label_connection_results(results)
+    assert list(labelled) == ['a/users', 'slow', 'b/users', 'broken', 'c/users']
+    assert 'refused' in labelled['broken']['error']
+
+    merged = label_connection_results(results, merge=True)
+    assert [row['_connection'] for row in merged['users']['data']] == ['a', 'b', 'c']
+    assert merged['users']['total_rows'] == 3
+
+
+def test_fetch_connections_concurrently_times_out_hanging_and_queued_connections():
+    release = threading.Event()
+
+    def fetch(name):
+        if name in ('a', 'b'):
+            release.wait(3600)
+            return 'late'
+        return 'ok'
+
+    try:
+        started = time.monotonic()
+        # 'c' is queued behind the two hanging connections for the whole timeout
+        results = fetch_connections_concurrently(['a', 'b', 'c'], fetch, parallel=2, timeout=0.5)
+        assert time.monotonic() - started < 2
+        assert all(isinstance(results[name], TimeoutError) for name in ['a', 'b', 'c'])
+
+        results = fetch_connections_concurrently(['a', 'd'], fetch, parallel=1, timeout=0.3)
+        assert time.monotonic() - started < 3
+        assert isinstance(results['a'], TimeoutError) and isinstance(results['d'], TimeoutError)
+    finally:
+        release.set()
+
+
 if __name__ == '__main__':
     pytest.main()
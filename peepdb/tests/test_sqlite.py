@@ -1,7 +1,11 @@
 import unittest
 import os
+import tempfile
 import sqlite3
+from unittest.mock import patch
+from peepdb.db.base import parse_filter, parse_sample
 from peepdb.db.sqlite import SQLiteDatabase
+from peepdb.metadata import MetadataCache
 
 class TestSQLiteDatabase(unittest.TestCase):
     def setUp(self):
@@ -64,6 +68,185 @@ class TestSQLiteDatabase(unittest.TestCase):
         self.assertEqual(result['data'][0]['name'], 'Bob')
         self.assertEqual(result['page'], 2)
 
+    def test_fetch_primary_key(self):
+        self.assertEqual(self.db.fetch_primary_key('users'), ['id'])
+
+    def test_fetch_data_keyset(self):
+        result = self.db.fetch_data('users', page_size=1, keyset=True)
+        self.assertEqual(result['data'][0]['name'], 'Alice')
+        self.assertIsNone(result['page'])
+        self.assertIsNotNone(result['next_cursor'])
+
+        result = self.db.fetch_data('users', page_size=1, after=result['next_cursor'])
+        self.assertEqual(result['data'][0]['name'], 'Bob')
+
+        result = self.db.fetch_data('users', page_size=1, after=result['next_cursor'])
+        self.assertEqual(result['data'], [])
+        self.assertIsNone(result['next_cursor'])
+
+    def test_fetch_data_keyset_without_key(self):
+        self.cursor.execute('CREATE TABLE logs (message TEXT)')
+        self.conn.commit()
+        with self.assertRaises(ValueError):
+            self.db.fetch_data('logs', keyset=True)
+
+    def test_fetch_primary_key_skips_nullable_unique_index(self):
+        # Paging on a nullable key returned the NULL rows first, then nothing past (code) > (NULL)
+        self.cursor.execute('CREATE TABLE codes (code TEXT UNIQUE, name TEXT)')
+        self.cursor.execute('CREATE TABLE tags (tag TEXT NOT NULL, kept INTEGER)')
+        self.cursor.execute('CREATE UNIQUE INDEX tags_kept ON tags (tag) WHERE kept')
+        self.cursor.execute('CREATE TABLE labels (label TEXT NOT NULL UNIQUE)')
+        self.cursor.executemany('INSERT INTO codes VALUES (?, ?)',
+                                [(None, 'a'), ('x', 'b'), (None, 'c'), ('y', 'd'), ('z', 'e')])
+        self.conn.commit()
+        self.assertEqual(self.db.fetch_primary_key('codes'), [])
+        self.assertEqual(self.db.fetch_primary_key('tags'), [])
+        self.assertEqual(self.db.fetch_primary_key('labels'), ['label'])
+        with self.assertRaises(ValueError):
+            self.db.fetch_data('codes', page_size=2, keyset=True)
+        self.assertEqual(len(self.db.fetch_data('codes', page_size=5)['data']), 5)
+
+    def test_fetch_data_count_modes(self):
+        result = self.db.fetch_data('users', count='none')
+        self.assertIsNone(result['total_rows'])
+        self.assertIsNone(result['total_pages'])
+        self.assertEqual(len(result['data']), 2)
+
+        result = self.db.fetch_data('users', count='estimate')
+        self.assertEqual(result['total_rows'], 2)
+        self.assertTrue(result['approximate'])
+
+        self.cursor.execute('ANALYZE')
+        self.conn.commit()
+        result = self.db.fetch_data('users', count='estimate')
+        self.assertEqual(result['total_rows'], 2)
+
+    def test_fetch_data_columns_and_filters(self):
+        result = self.db.fetch_data('users', columns=['name'], filters=[parse_filter("email != 'alice@test.com'")])
+        self.assertEqual(result['data'], [{'name': 'Bob'}])
+        self.assertEqual(result['total_rows'], 1)
+
+        result = self.db.fetch_data('users', filters=[parse_filter('email = null')])
+        self.assertEqual(result['data'], [])
+
+    def test_fetch_data_keyset_with_columns(self):
+        result = self.db.fetch_data('users', page_size=1, keyset=True, columns=['name'],
+                                    filters=[parse_filter('id >= 1')])
+        self.assertEqual(result['data'], [{'name': 'Alice'}])
+
+        result = self.db.fetch_data('users', page_size=1, after=result['next_cursor'], columns=['name'],
+                                    filters=[parse_filter('id >= 1')])
+        self.assertEqual(result['data'], [{'name': 'Bob'}])
+
+    def test_parse_filter(self):
+        self.assertEqual(parse_filter('age>=30'), ('age', '>=', 30))
+        self.assertEqual(parse_filter("name = 'O Brien'"), ('name', '=', 'O Brien'))
+        self.assertEqual(parse_filter('price <> 1.5'), ('price', '!=', 1.5))
+        self.assertEqual(parse_filter('active = true'), ('active', '=', True))
+        with self.assertRaises(ValueError):
+            parse_filter('age > null')
+        with self.assertRaises(ValueError):
+            parse_filter('age')
+
+    def test_metadata_cache_invalidated_by_schema_change(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = MetadataCache('test', directory=directory)
+            self.assertEqual(set(cache.tables(self.db)), {'users', 'products'})
+            self.assertEqual(cache.primary_key(self.db, 'users'), ['id'])
+
+            # A new instance reads the tables from disk while the schema is unchanged
+            self.cursor.execute("INSERT INTO users VALUES (3, 'Carol', 'carol@test.com')")
+            self.conn.commit()
+            self.assertEqual(set(MetadataCache('test', directory=directory).tables(self.db)), {'users', 'products'})
+
+            self.cursor.execute('CREATE TABLE orders (id INTEGER PRIMARY KEY)')
+            self.conn.commit()
+            self.assertIn('orders', MetadataCache('test', directory=directory).tables(self.db))
+
+    def test_long_lived_metadata_cache_sees_schema_changes(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = MetadataCache('test', directory=directory, recheck_interval=0)
+            self.assertEqual(set(cache.tables(self.db)), {'users', 'products'})
+
+            self.cursor.execute('CREATE TABLE orders (id INTEGER PRIMARY KEY)')
+            self.conn.commit()
+            self.assertIn('orders', cache.tables(self.db))
+
+            # Within the recheck interval the entry in memory is used without checking
+            cache.recheck_interval = 3600
+            self.cursor.execute('CREATE TABLE invoices (id INTEGER PRIMARY KEY)')
+            self.conn.commit()
+            self.assertNotIn('invoices', cache.tables(self.db))
+
+    def test_metadata_cache_without_schema_version_expires_sooner(self):
+        with tempfile.TemporaryDirectory() as directory, patch.object(self.db, 'schema_version', return_value=None):
+            MetadataCache('test', directory=directory).tables(self.db)
+            self.cursor.execute('CREATE TABLE orders (id INTEGER PRIMARY KEY)')
+            self.conn.commit()
+            self.assertNotIn('orders', MetadataCache('test', directory=directory).tables(self.db))
+            self.assertIn('orders', MetadataCache('test', directory=directory, unversioned_ttl=0).tables(self.db))
+
+    def test_fetch_sample(self):
+        self.cursor.executemany('INSERT INTO users VALUES (?, ?, ?)',
+                                [(i, f'user{i}', f'user{i}@test.com') for i in range(3, 1001)])
+        self.conn.commit()
+
+        result = self.db.fetch_sample('users', size=20)
+        self.assertTrue(result['sample'])
+        self.assertLessEqual(len(result['data']), 20)
+        self.assertGreater(len(result['data']), 10)
+        self.assertEqual(set(result['data'][0]), {'id', 'name', 'email'})
+        self.assertEqual(len({row['id'] for row in result['data']}), len(result['data']))
+
+        result = self.db.fetch_sample('users', percent=1, columns=['name'], filters=[parse_filter('id > 500')])
+        self.assertTrue(result['data'])
+        self.assertIsNone(result['total_rows'])
+        for row in result['data']:
+            self.assertEqual(list(row), ['name'])
+            self.assertGreater(int(row['name'][4:]), 500)
+
+    def test_fetch_sample_without_rowid(self):
+        self.cursor.execute('CREATE TABLE tags (name TEXT PRIMARY KEY) WITHOUT ROWID')
+        self.cursor.executemany('INSERT INTO tags VALUES (?)', [('a',), ('b',), ('c',)])
+        self.conn.commit()
+
+        result = self.db.fetch_sample('tags', size=2)
+        self.assertEqual(len(result['data']), 2)
+        self.assertLessEqual({row['name'] for row in result['data']}, {'a', 'b', 'c'})
+
+    def test_parse_sample(self):
+        self.assertEqual(parse_sample('500'), (500, None))
+        self.assertEqual(parse_sample('2.5%'), (None, 2.5))
+        for value in ('0', '-1', '0%', '101%', 'many'):
+            with self.assertRaises(ValueError):
+                parse_sample(value)
+
+    def test_connection_is_read_only(self):
+        with self.assertRaises(sqlite3.OperationalError):
+            self.db.cursor.execute("INSERT INTO users VALUES (3, 'Carol', 'carol@test.com')")
+
+        immutable = SQLiteDatabase(f'file:{os.path.abspath(self.db_path)}?immutable=1', '', '', '')
+        immutable.connect()
+        try:
+            self.assertEqual(immutable.fetch_data('users')['total_rows'], 2)
+        finally:
+            immutable.disconnect()
+
+        with self.assertRaises(sqlite3.OperationalError):
+            SQLiteDatabase('missing.db', '', '', '').connect()
+        self.assertFalse(os.path.exists('missing.db'))
+
+    def test_partition_splits(self):
+        self.cursor.executemany('INSERT INTO users VALUES (?, ?, ?)',
+                                [(i, f'user{i}', f'user{i}@test.com') for i in range(3, 101)])
+        self.conn.commit()
+        self.assertEqual(self.db.partition_splits('users', 4), ('id', [26, 51, 76]))
+        self.assertEqual(self.db.partition_splits('users', 1), ('id', []))
+
+    def test_stream_rows(self):
+        rows = list(self.db.stream_rows('users', batch_size=1))
+        self.assertEqual([row['name'] for row in rows], ['Alice', 'Bob'])
+
     def test_fetch_data_nonexistent_table(self):
         with self.assertRaises(sqlite3.OperationalError):
             self.db.fetch_data('nonexistent_table')
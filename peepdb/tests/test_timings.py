@@ -0,0 +1,60 @@
+import json
+import sqlite3
+import pytest
+from peepdb.core import peep_db
+from peepdb.db.sqlite import SQLiteDatabase
+from peepdb.timings import current, phase, record_timings
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / 'timings.db')
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT)')
+    conn.executemany('INSERT INTO users VALUES (?, ?)', [(1, 'Alice'), (2, 'Bob'), (3, 'Carol')])
+    conn.commit()
+    conn.close()
+    return path
+
+
+def test_record_timings_of_peep_db(db_path):
+    with record_timings() as timings:
+        peep_db('sqlite', db_path, '', '', '', table='users', page_size=2)
+
+    phases = timings.as_dict()['phases']
+    names = [entry['phase'] for entry in phases]
+    for name in ('fetch', 'connect_to_database', 'connect', 'fetch_data', 'count_rows', 'query', 'format'):
+        assert name in names
+    assert all(entry['seconds'] >= 0 for entry in phases)
+
+    fetch_data = next(entry for entry in phases if entry['phase'] == 'fetch_data')
+    assert fetch_data['rows'] == 2
+    assert fetch_data['depth'] == 1
+    count_rows = next(entry for entry in phases if entry['phase'] == 'count_rows')
+    assert count_rows['rows'] == 3
+    queries = [entry['query'] for entry in phases if entry['phase'] == 'query']
+    assert any('LIMIT 2 OFFSET 0' in query for query in queries)
+    assert timings.total_seconds >= fetch_data['seconds']
+
+
+def test_nothing_is_recorded_without_recorder(db_path):
+    assert current() is None
+    with phase('unused') as attributes:
+        attributes['rows'] = 1
+    with SQLiteDatabase(db_path, '', '', '') as db:
+        db.fetch_data('users')
+        # The cursor is only wrapped for connections opened while timings are recorded
+        assert type(db.cursor) is sqlite3.Cursor
+
+
+def test_timings_written_as_otel_spans(db_path, tmp_path):
+    pytest.importorskip('opentelemetry.sdk')
+    otel_file = str(tmp_path / 'spans.jsonl')
+    with record_timings(otel_file):
+        peep_db('sqlite', db_path, '', '', '', table='users')
+
+    with open(otel_file) as f:
+        spans = [json.loads(line) for line in f if line.strip()]
+    by_name = {span['name']: span for span in spans}
+    assert by_name['fetch_data']['attributes']['peepdb.rows'] == 3
+    assert by_name['fetch_data']['parent_id'] == by_name['fetch']['context']['span_id']
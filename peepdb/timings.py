@@ -0,0 +1,235 @@
+import functools
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+# The recorder of the running command, None when timings are not being recorded
+_recorder: ContextVar[Optional['Timings']] = ContextVar('peepdb_timings', default=None)
+_depth: ContextVar[int] = ContextVar('peepdb_timings_depth', default=0)
+
+# Longest query text kept per phase
+MAX_QUERY_LENGTH = 500
+
+
+class Timings:
+    """
+    Collects the wall time of each phase of a command, with optional rows, bytes and query
+    text, in the order the phases started.
+
+    When otel_file is given, every phase is also exported as an OpenTelemetry span, one JSON
+    object per line, to that file. This requires opentelemetry-sdk.
+    """
+
+    def __init__(self, otel_file: Optional[str] = None):
+        self.phases: List[Dict[str, Any]] = []
+        self.lock = threading.Lock()
+        self.started = time.perf_counter()
+        self.finished = None
+        self.tracer = None
+        self.provider = None
+        self.otel_output = None
+        if otel_file:
+            self._setup_otel(otel_file)
+
+    def _setup_otel(self, otel_file: str) -> None:
+        try:
+            from opentelemetry.sdk.resources import Resource
+            from opentelemetry.sdk.trace import TracerProvider
+            from opentelemetry.sdk.trace.export import ConsoleSpanExporter, SimpleSpanProcessor
+        except ImportError:
+            raise ImportError("OpenTelemetry spans require opentelemetry-sdk. "
+                              "Install it with: pip install peepdb[otel]")
+        self.otel_output = open(otel_file, 'a', encoding='utf-8')
+        exporter = ConsoleSpanExporter(out=self.otel_output,
+                                       formatter=lambda span: span.to_json(indent=None) + os.linesep)
+        # A provider of our own, so the global OpenTelemetry setup of an application is left alone
+        self.provider = TracerProvider(resource=Resource.create({'service.name': 'peepdb'}))
+        self.provider.add_span_processor(SimpleSpanProcessor(exporter))
+        self.tracer = self.provider.get_tracer('peepdb')
+
+    def start(self, name: str, depth: int = 0) -> Dict[str, Any]:
+        # Phases are listed in the order they started, so a parent comes before its children
+        entry = {'phase': name, 'seconds': None, 'depth': depth}
+        with self.lock:
+            self.phases.append(entry)
+        return entry
+
+    def close(self) -> None:
+        self.finished = time.perf_counter()
+        if self.provider is not None:
+            self.provider.shutdown()
+            self.otel_output.close()
+            self.provider = None
+
+    @property
+    def total_seconds(self) -> float:
+        return (self.finished or time.perf_counter()) - self.started
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {'total_seconds': self.total_seconds, 'phases': [dict(entry) for entry in self.phases]}
+
+    def rows(self) -> List[Dict[str, Any]]:
+        """
+        Returns one row per phase for display, nested phases indented below their parent.
+        """
+        return [{
+            'phase': '  ' * entry['depth'] + entry['phase'],
+            'ms': None if entry['seconds'] is None else round(entry['seconds'] * 1000, 3),
+            'rows': entry.get('rows'),
+            'bytes': entry.get('bytes'),
+            'query': entry.get('query')
+        } for entry in self.phases]
+
+
+def current() -> Optional[Timings]:
+    return _recorder.get()
+
+
+@contextmanager
+def record_timings(otel_file: Optional[str] = None) -> Iterator[Timings]:
+    """
+    Records the phases of everything run inside the block.
+
+    Example:
+        with record_timings() as timings:
+            peep_db('sqlite', 'app.db', '', '', '', table='users')
+        print(timings.as_dict())
+    """
+    timings = Timings(otel_file)
+    token = _recorder.set(timings)
+    try:
+        yield timings
+    finally:
+        _recorder.reset(token)
+        timings.close()
+
+
+@contextmanager
+def phase(name: str, **attributes) -> Iterator[Dict[str, Any]]:
+    """
+    Times the block as one phase when timings are recorded. The yielded dict can be updated
+    with rows, bytes or query of the phase.
+    """
+    timings = _recorder.get()
+    if timings is None:
+        yield attributes
+        return
+
+    depth = _depth.get()
+    entry = timings.start(name, depth)
+    token = _depth.set(depth + 1)
+    span = timings.tracer.start_as_current_span(name) if timings.tracer else None
+    started = time.perf_counter()
+    try:
+        if span is None:
+            yield attributes
+        else:
+            with span as otel_span:
+                yield attributes
+                for key, value in attributes.items():
+                    if value is not None:
+                        otel_span.set_attribute(f"peepdb.{key}", value)
+    finally:
+        entry['seconds'] = time.perf_counter() - started
+        _depth.reset(token)
+        if attributes.get('query'):
+            attributes['query'] = attributes['query'][:MAX_QUERY_LENGTH]
+        entry.update((key, value) for key, value in attributes.items() if value is not None)
+
+
+def timed(name: str, measure: Optional[Callable[[Any], Dict[str, Any]]] = None):
+    """
+    Decorator recording each call of a function as a phase. measure maps the return value to
+    extra attributes such as rows.
+    """
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if _recorder.get() is None:
+                return function(*args, **kwargs)
+            with phase(name) as attributes:
+                result = function(*args, **kwargs)
+                if measure is not None:
+                    attributes.update(measure(result))
+                return result
+        return wrapper
+    return decorator
+
+
+def result_size(result: Any) -> Dict[str, Any]:
+    """
+    Rows and approximate bytes of a fetch_data or fetch_arrow result, or rows of a list.
+    """
+    if isinstance(result, dict) and 'data' in result:
+        rows = result['data']
+        if hasattr(rows, 'nbytes'):
+            # A pyarrow.Table from fetch_arrow
+            return {'rows': rows.num_rows, 'bytes': rows.nbytes}
+        return {'rows': len(rows),
+                'bytes': sum(len(str(value)) for row in rows for value in row.values())}
+    if isinstance(result, (list, tuple)):
+        return {'rows': len(result)}
+    return {}
+
+
+class TimedCursor:
+    """
+    Wraps a DB-API cursor so that each statement it executes is recorded as a query phase.
+    """
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def execute(self, query, *args, **kwargs):
+        with phase('query', query=str(query)):
+            return self._cursor.execute(query, *args, **kwargs)
+
+    def fetchall(self):
+        with phase('fetch rows') as attributes:
+            rows = self._cursor.fetchall()
+            attributes['rows'] = len(rows)
+            return rows
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+# Attributes recorded for the result of instrumented backend methods
+METHOD_MEASURES = {
+    'fetch_data': result_size,
+    'fetch_arrow': result_size,
+    'fetch_sample': result_size,
+    'fetch_tables': result_size,
+    'count_rows': lambda result: {'rows': result[0]},
+}
+
+
+def instrument_method(name: str, method: Callable) -> Callable:
+    """
+    Wraps a backend method so its calls are recorded as phases named after the method.
+
+    After connect, the backend's cursor is wrapped so the text and time of its queries are
+    recorded too.
+    """
+    measure = METHOD_MEASURES.get(name)
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if _recorder.get() is None:
+            return method(self, *args, **kwargs)
+        with phase(name) as attributes:
+            result = method(self, *args, **kwargs)
+            if measure is not None:
+                attributes.update(measure(result))
+        if name == 'connect' and getattr(self, 'cursor', None) is not None \
+                and not isinstance(self.cursor, TimedCursor):
+            self.cursor = TimedCursor(self.cursor)
+        return result
+
+    return wrapper
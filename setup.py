@@ -18,7 +18,6 @@ setup(
         "psycopg2-binary>=2.9.9",
         "pymysql>=1.1.1",
         "cryptography>=43.0.0",
-        "tabulate>=0.8.9",
         "click>=8.0.0",
         "mariadb",
         "cachetools>=5.5.0",
@@ -31,8 +30,14 @@ setup(
             'coverage>=7.6.1',
             'pytest>=8.3.2',
             'pytest-cov>=5.0.0',
+            # The render tests compare render_grid with tabulate
+            'tabulate>=0.8.9',
         ],
         'system': ['libmariadb3', 'libmariadb-dev'],
+        'parquet': ['pyarrow>=14.0.0'],
+        'async': ['asyncpg>=0.29.0', 'aiomysql>=0.2.0', 'motor>=3.5.0', 'aiosqlite>=0.20.0'],
+        'otel': ['opentelemetry-sdk>=1.20.0'],
+        'fast': ['orjson>=3.9.0'],
     },
     classifiers=[
         "Development Status :: 3 - Alpha",